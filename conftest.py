@@ -99,6 +99,9 @@ def pytest_configure(config):
                                                          config.getvalue("transformer") != "cpu",
                                                          reason="Only Hetr/CPU and CPU transformers supported",
                                                          strict=True)
+    config.cpu_enabled_only = pytest.mark.xfail(config.getvalue("transformer") != "cpu",
+                                                reason="Only CPU transformer supported",
+                                                strict=True)
     config.flex_skip = pytest.mark.skipif(config.getvalue("transformer") == "flexgpu",
                                           reason="Randomly failing test for Flex")
     config.argon_skip = pytest.mark.skipif(config.getvalue("transformer") == "argon")
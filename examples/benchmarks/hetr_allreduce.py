@@ -0,0 +1,81 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+"""
+Times data parallel training steps of a model with many small layers under HeTr, with and
+without grouping the gradient allreduces into buckets.
+
+Example:
+    python examples/benchmarks/hetr_allreduce.py --layers 32 --hidden 64 --bucket_sizes 0 4194304
+"""
+from __future__ import division
+from __future__ import print_function
+from contextlib import closing
+import os
+import time
+import numpy as np
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.frontends.neon import Affine, Sequential, GaussianInit, Rectlin, \
+    GradientDescentMomentum, NgraphArgparser
+
+
+def build_model(n_layers, n_hidden, batch_size, device_ids):
+    F = ng.make_axis(length=n_hidden, name='F')
+    N = ng.make_axis(length=batch_size, name='N')
+    x = ng.placeholder([F, N])
+    y = ng.placeholder([F, N])
+    with ng.metadata(device_id=device_ids, parallel=N):
+        model = Sequential([Affine(nout=n_hidden, weight_init=GaussianInit(),
+                                   activation=Rectlin())
+                            for _ in range(n_layers)])
+        hidden = model(x)
+        loss = ng.squared_L2(ng.cast_axes(hidden, y.axes) - y)
+        optimizer = GradientDescentMomentum(0.01, 0.9)
+        batch_cost = ng.sequential([optimizer(loss), ng.mean(loss, out_axes=())])
+    return batch_cost, x, y
+
+
+def time_steps(bucket_size, args):
+    os.environ['HETR_ALLREDUCE_BUCKET_SIZE'] = str(bucket_size)
+    batch_cost, x, y = build_model(args.layers, args.hidden, args.batch_size,
+                                   tuple(str(i) for i in range(args.devices)))
+    x_value = np.random.uniform(-1, 1, x.axes.lengths)
+    y_value = np.random.uniform(-1, 1, y.axes.lengths)
+    with closing(ngt.make_transformer_factory('hetr', device='cpu')()) as transformer:
+        train = transformer.computation(batch_cost, x, y)
+        for _ in range(args.warmup):
+            train(x_value, y_value)
+        start = time.time()
+        for _ in range(args.steps):
+            train(x_value, y_value)
+        return (time.time() - start) / args.steps
+
+
+if __name__ == '__main__':
+    parser = NgraphArgparser(description='Benchmark bucketed HeTr allreduce')
+    parser.add_argument('--layers', type=int, default=32, help='number of affine layers')
+    parser.add_argument('--hidden', type=int, default=64, help='width of each layer')
+    parser.add_argument('--devices', type=int, default=2, help='number of data parallel workers')
+    parser.add_argument('--steps', type=int, default=50, help='number of timed steps')
+    parser.add_argument('--warmup', type=int, default=5, help='number of untimed steps')
+    parser.add_argument('--bucket_sizes', type=int, nargs='+', default=[0, 4 * 1024 * 1024],
+                        help='bucket sizes in bytes to compare, 0 disables bucketing')
+    args = parser.parse_args()
+
+    np.random.seed(args.rng_seed)
+    for bucket_size in args.bucket_sizes:
+        step_time = time_steps(bucket_size, args)
+        print('bucket size {:>9d} bytes: {:.3f} ms/step'.format(bucket_size, step_time * 1e3))
@@ -0,0 +1,90 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+"""
+Time to find every op referenced by a large graph, which serialization and hetr do before
+shipping a graph, and to serialize it.
+
+The graph is a chain of elementwise layers over a variable, with a gradient descent update
+of the variable so that the graph also has derivative, sequential and assignment ops.
+
+Example:
+    python -m examples.benchmarks.op_references_benchmark --ops 100000
+"""
+from __future__ import division
+from __future__ import print_function
+from collections import OrderedDict
+import argparse
+import json
+import time
+import ngraph as ng
+from ngraph.op_graph.op_graph import Op
+import ngraph.op_graph.serde.serde as ser
+
+
+def make_graph(ops):
+    """
+    Returns:
+        The root of a graph with about ops ops.
+    """
+    A = ng.make_axis(length=8, name='A')
+    x = ng.placeholder([A])
+    w = ng.variable([A], initial_value=0.5)
+    h = x
+    # each layer is about 8 ops, and about as many again are made by the derivative
+    for _ in range(max(1, ops // 16)):
+        h = ng.tanh(h * w + 1.0)
+    cost = ng.sum(h, out_axes=())
+    return ng.sequential([ng.assign(w, w - 0.01 * ng.deriv(cost, w)), cost])
+
+
+def timed(f, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        result = f()
+        times.append(time.time() - start)
+    return result, min(times)
+
+
+def run(ops, repeat):
+    start = time.time()
+    root = make_graph(ops)
+    construct_time = time.time() - start
+    all_ops, references_time = timed(lambda: Op.all_op_references([root]), repeat)
+    graph_def, serialize_time = timed(lambda: ser._serialize_graph([root]), repeat)
+    return OrderedDict([('ops', len(all_ops)),
+                        ('edges', len(graph_def.edges)),
+                        ('construct_s', construct_time),
+                        ('references_s', references_time),
+                        ('references_ops_per_s', len(all_ops) / references_time),
+                        ('serialize_s', serialize_time),
+                        ('serialize_ops_per_s', len(all_ops) / serialize_time)])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark op reference traversal')
+    parser.add_argument('--ops', type=int, default=100000, help='approximate number of ops')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs')
+    parser.add_argument('--output', default=None, help='file to write the JSON results to')
+    args = parser.parse_args()
+
+    result = run(args.ops, args.repeat)
+    for name, value in result.items():
+        print('{:>22} {:.3f}'.format(name, value) if isinstance(value, float)
+              else '{:>22} {}'.format(name, value))
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,147 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+"""
+Throughput of graph serialization and deserialization.
+
+The graph is either a frozen TensorFlow model imported with the TF importer, or, without one,
+a deep MLP whose weights are constants, as in an imported frozen model. Each is serialized with
+its tensors inline, out of line in an in-memory blob store and out of line in a directory of
+memory-mapped blobs, and the time, ops/s, MB/s and sizes are reported for each.
+
+Example:
+    python -m examples.benchmarks.serde_benchmark --layers 64 --width 512
+    python -m examples.benchmarks.serde_benchmark --tf_model frozen.pb --tf_outputs softmax
+"""
+from __future__ import division
+from __future__ import print_function
+from collections import OrderedDict
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import numpy as np
+import ngraph as ng
+from ngraph.op_graph.op_graph import Op
+import ngraph.op_graph.serde.serde as ser
+
+
+def synthetic_model(layers, width, batch_size=32):
+    """
+    An MLP with constant weights and a bias per layer.
+    """
+    F = ng.make_axis(length=width, name='F')
+    G = ng.make_axis(length=width, name='G')
+    N = ng.make_axis(length=batch_size, name='N')
+    rng = np.random.RandomState(0)
+    h = ng.placeholder([F, N])
+    for _ in range(layers):
+        W = ng.constant(rng.uniform(-0.1, 0.1, (width, width)).astype(np.float32), [G, F])
+        b = ng.constant(rng.uniform(-0.1, 0.1, width).astype(np.float32), [F])
+        h = ng.tanh(ng.cast_axes(ng.dot(W, h), [F, N]) + b)
+    return [h]
+
+
+def tf_model(filename, outputs):
+    from ngraph.frontends.tensorflow.tf_importer.importer import TFImporter
+
+    importer = TFImporter()
+    importer.import_protobuf(filename)
+    return [importer.get_op_handle_by_name(name) for name in outputs]
+
+
+def tensor_bytes(ops):
+    return sum(op.const.nbytes for op in ops
+               if op.__class__.__name__ == 'AssignableTensorOp' and op.const is not None)
+
+
+def run(ops, repeat, threshold):
+    """
+    Serializes and deserializes ops repeat times with each kind of blob store and returns the
+    best times.
+    """
+    all_ops = Op.all_op_references(ops)
+    payload = tensor_bytes(all_ops)
+    results = []
+    blob_dir = tempfile.mkdtemp()
+    try:
+        stores = OrderedDict([('inline', lambda: None),
+                              ('blob', lambda: ser.BlobStore(threshold)),
+                              ('blob_dir', lambda: ser.DirectoryBlobStore(
+                                  tempfile.mkdtemp(dir=blob_dir), threshold))])
+        for name, make_store in stores.items():
+            serialize_times, deserialize_times = [], []
+            for _ in range(repeat):
+                blob_store = make_store()
+                start = time.time()
+                ser_string = ser.serialize_graph(ops, blob_store=blob_store)
+                serialize_times.append(time.time() - start)
+                start = time.time()
+                ser.deserialize_graph(ser_string, blob_store)
+                deserialize_times.append(time.time() - start)
+            serialize_time, deserialize_time = min(serialize_times), min(deserialize_times)
+            results.append(OrderedDict([
+                ('store', name),
+                ('ops', len(all_ops)),
+                ('tensor_mb', payload / 1e6),
+                ('message_mb', len(ser_string) / 1e6),
+                ('blobs', 0 if blob_store is None else len(blob_store)),
+                ('serialize_s', serialize_time),
+                ('serialize_ops_per_s', len(all_ops) / serialize_time),
+                ('serialize_mb_per_s', payload / 1e6 / serialize_time),
+                ('deserialize_s', deserialize_time),
+                ('deserialize_ops_per_s', len(all_ops) / deserialize_time),
+            ]))
+    finally:
+        shutil.rmtree(blob_dir)
+    return results
+
+
+def print_results(results):
+    columns = ['store', 'ops', 'tensor_mb', 'message_mb', 'blobs', 'serialize_s',
+               'serialize_ops_per_s', 'serialize_mb_per_s', 'deserialize_s',
+               'deserialize_ops_per_s']
+    print(' '.join('{:>12}'.format(column[:12]) for column in columns))
+    for result in results:
+        print(' '.join('{:>12.3f}'.format(result[column]) if isinstance(result[column], float)
+                       else '{:>12}'.format(result[column]) for column in columns))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark graph serialization')
+    parser.add_argument('--tf_model', default=None,
+                        help='frozen TensorFlow GraphDef to import instead of the MLP')
+    parser.add_argument('--tf_outputs', nargs='+', default=[],
+                        help='names of the output nodes of the TensorFlow model')
+    parser.add_argument('--layers', type=int, default=64, help='number of MLP layers')
+    parser.add_argument('--width', type=int, default=512, help='width of the MLP layers')
+    parser.add_argument('--threshold', type=int, default=1024,
+                        help='size in bytes from which tensors are stored as blobs')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed runs')
+    parser.add_argument('--output', default=None, help='file to write the JSON results to')
+    args = parser.parse_args()
+
+    if args.tf_model is not None:
+        if not args.tf_outputs:
+            parser.error('--tf_outputs is required with --tf_model')
+        ops = tf_model(args.tf_model, args.tf_outputs)
+    else:
+        ops = synthetic_model(args.layers, args.width)
+    results = run(ops, args.repeat, args.threshold)
+    print_results(results)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,333 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+"""
+Benchmark suite over the example models, fed with fake data.
+
+For each model this records the time to construct the graph, the time spent in each
+transformer pass and in code generation, the distribution of steady-state training step
+times, the time spent in each kind of op, and the sizes of the temporary and persistent
+memory pools. Results are written as JSON and can be compared against a stored baseline.
+
+Example:
+    python -m examples.benchmarks.suite --models mnist_lenet char_rnn --output results.json
+    python -m examples.benchmarks.suite --baseline results.json --tolerance 0.1
+"""
+from __future__ import division
+from __future__ import print_function
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+import json
+import os
+import sys
+import time
+import numpy as np
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.frontends.neon import Affine, Convolution, Pooling, Preprocess, Recurrent, Sequential
+from ngraph.frontends.neon import GaussianInit, UniformInit, XavierInit
+from ngraph.frontends.neon import Rectlin, Softmax, Tanh, GradientDescentMomentum, RMSProp
+from ngraph.frontends.neon import ax, NgraphArgparser
+from examples.benchmarks.fake_data_generator import FakeDataIterator
+
+
+def image_dataset(batch_size, channels, image_size, n_classes):
+    return FakeDataIterator({'image': {'axes': [('C', channels),
+                                                ('H', image_size),
+                                                ('W', image_size)]},
+                             'label': {'axes': [],
+                                       'random': lambda s: np.random.randint(0, n_classes, s),
+                                       'dtype': np.int32}},
+                            batch_size)
+
+
+def classifier_cost(model, inputs, optimizer):
+    prob = model(inputs['image'])
+    loss = ng.cross_entropy_multi(prob, ng.one_hot(inputs['label'], axis=ax.Y))
+    return ng.sequential([optimizer(loss), ng.mean(loss, out_axes=())])
+
+
+def mnist_lenet(batch_size=128):
+    """
+    The LeNet of examples/mnist/mnist_lenet.py.
+    """
+    dataset = image_dataset(batch_size, 1, 28, 10)
+    inputs = dataset.make_placeholders()
+    ax.Y.length = 10
+    init_xav = XavierInit()
+    model = Sequential([Preprocess(functor=lambda x: x / 255.),
+                        Convolution((5, 5, 16), filter_init=init_xav, activation=Rectlin()),
+                        Pooling((2, 2), strides=2),
+                        Convolution((5, 5, 32), filter_init=init_xav, activation=Rectlin()),
+                        Pooling((2, 2), strides=2),
+                        Affine(nout=500, weight_init=init_xav, activation=Rectlin()),
+                        Affine(axes=ax.Y, weight_init=init_xav, activation=Softmax())])
+    return dataset, inputs, classifier_cost(model, inputs, GradientDescentMomentum(0.01, 0.9))
+
+
+def cifar10_msra(batch_size=64, stage_depth=2):
+    """
+    The residual network of examples/cifar10/cifar10_msra.py.
+    """
+    from examples.cifar10.cifar10_msra import residual_network
+
+    dataset = image_dataset(batch_size, 3, 32, 10)
+    inputs = dataset.make_placeholders()
+    ax.Y.length = 10
+    model = residual_network(stage_depth)
+    optimizer = GradientDescentMomentum(0.1, 0.9, wdecay=0.0001)
+    return dataset, inputs, classifier_cost(model, inputs, optimizer)
+
+
+def alexnet(batch_size=128, image_size=224):
+    """
+    The AlexNet of examples/convnet-benchmarks/alexnet.py.
+    """
+    dataset = image_dataset(batch_size, 3, image_size, 1000)
+    inputs = dataset.make_placeholders()
+    ax.Y.length = 1000
+    init = UniformInit(low=-0.08, high=0.08)
+
+    def conv(fshape, std, **kwargs):
+        return Convolution(fshape, filter_init=GaussianInit(std=std), bias_init=init,
+                           activation=Rectlin(), **kwargs)
+
+    def affine(std, **kwargs):
+        return Affine(weight_init=GaussianInit(std=std), bias_init=init, **kwargs)
+
+    model = Sequential([conv((11, 11, 64), 0.01, padding=3, strides=4),
+                        Pooling((3, 3), strides=2),
+                        conv((5, 5, 192), 0.01, padding=2),
+                        Pooling((3, 3), strides=2),
+                        conv((3, 3, 384), 0.03, padding=1),
+                        conv((3, 3, 256), 0.03, padding=1),
+                        conv((3, 3, 256), 0.03, padding=1),
+                        Pooling((3, 3), strides=2),
+                        affine(0.01, nout=4096, activation=Rectlin()),
+                        affine(0.01, nout=4096, activation=Rectlin()),
+                        affine(0.01, axes=ax.Y, activation=Softmax())])
+    optimizer = GradientDescentMomentum(0.01, 0.0, wdecay=0.0005)
+    return dataset, inputs, classifier_cost(model, inputs, optimizer)
+
+
+def char_rnn(batch_size=50, time_steps=150, hidden_size=500, vocab_size=50):
+    """
+    The character level RNN of examples/ptb/char_rnn.py.
+    """
+    def tokens(shape):
+        return np.random.randint(0, vocab_size, shape)
+
+    dataset = FakeDataIterator({name: {'axes': [('REC', time_steps)],
+                                       'random': tokens,
+                                       'dtype': np.int32}
+                                for name in ('inp_txt', 'tgt_txt')},
+                               batch_size)
+    inputs = dataset.make_placeholders()
+    ax.Y.length = vocab_size
+    init = UniformInit(low=-0.08, high=0.08)
+    model = Sequential([Preprocess(functor=lambda x: ng.one_hot(x, axis=ax.Y)),
+                        Recurrent(hidden_size, init, activation=Tanh()),
+                        Affine(init, activation=Softmax(), bias_init=init, axes=(ax.Y,))])
+    prob = model(inputs['inp_txt'])
+    loss = ng.cross_entropy_multi(prob, ng.one_hot(inputs['tgt_txt'], axis=ax.Y), usebits=True)
+    batch_cost = ng.sequential([RMSProp()(loss), ng.mean(loss, out_axes=())])
+    return dataset, inputs, batch_cost
+
+
+models = OrderedDict([('mnist_lenet', mnist_lenet),
+                      ('cifar10_msra', cifar10_msra),
+                      ('alexnet', alexnet),
+                      ('char_rnn', char_rnn)])
+
+
+@contextmanager
+def op_tracing():
+    """
+    Generates code that records the start and end of every exop while in the context.
+    """
+    tracing = os.environ.get('TRACING')
+    os.environ['TRACING'] = '1'
+    try:
+        yield
+    finally:
+        if tracing is None:
+            del os.environ['TRACING']
+        else:
+            os.environ['TRACING'] = tracing
+
+
+def step_statistics(times):
+    times = np.array(times) * 1000.0
+    return OrderedDict([('steps', len(times)),
+                        ('mean', float(times.mean())),
+                        ('stdev', float(times.std())),
+                        ('min', float(times.min())),
+                        ('median', float(np.median(times))),
+                        ('p90', float(np.percentile(times, 90))),
+                        ('p99', float(np.percentile(times, 99))),
+                        ('max', float(times.max()))])
+
+
+def profile_ops(computation, args, steps):
+    """
+    Runs a computation compiled with op tracing and returns the mean time per step, in ms,
+    spent in each kind of op, most expensive first.
+    """
+    executor = computation.executor
+    computation.transformer.host_to_device(computation, computation.computation_op.parameters,
+                                           args)
+    executor()
+    del executor.__profiler_start__[:]
+    del executor.__profiler_stop__[:]
+    for _ in range(steps):
+        executor()
+
+    exops = list(computation.computation_decl.exop_block)
+    durations = np.array(executor.__profiler_stop__) - np.array(executor.__profiler_start__)
+    durations = durations.reshape(steps, len(exops)).mean(axis=0) * 1000.0
+    ops = OrderedDict()
+    for exop, duration in zip(exops, durations):
+        name = type(exop.op).__name__
+        count, total = ops.get(name, (0, 0.0))
+        ops[name] = (count + 1, total + duration)
+    return [OrderedDict([('op', name), ('count', count), ('ms', total)])
+            for name, (count, total) in sorted(ops.items(), key=lambda x: -x[1][1])]
+
+
+def run_model(name, steps=20, warmup=2, op_steps=5, **config):
+    """
+    Benchmarks one of the models.
+
+    Arguments:
+        name (str): A key of models.
+        steps (int): Number of timed training steps.
+        warmup (int): Number of untimed steps run first.
+        op_steps (int): Number of steps to average the per-op times over, 0 to skip.
+        config: Keyword arguments for the model, such as batch_size.
+
+    Returns:
+        An OrderedDict of results that can be written as JSON.
+    """
+    start = time.time()
+    dataset, inputs, batch_cost = models[name](**config)
+    placeholders = [inputs[key] for key in sorted(inputs)]
+    train_computation = ng.computation(batch_cost, *placeholders)
+    construction = time.time() - start
+
+    data = next(dataset)
+    feed = [data[key] for key in sorted(inputs)]
+
+    result = OrderedDict([('model', name), ('config', config)])
+    result['construction_seconds'] = construction
+    with closing(ngt.make_transformer()) as transformer:
+        computation = transformer.add_computation(train_computation)
+        computation_decl = computation.computation_decl
+        result['compile_seconds'] = computation.compile_times
+        result['pass_seconds'] = [[pass_name, seconds]
+                                  for pass_name, seconds in computation_decl.pass_times]
+        result['memory_bytes'] = OrderedDict([
+            ('temporary_max_allocated', computation_decl.temporary_max_allocated),
+            ('persistent_max_allocated', computation_decl.persistent_max_allocated)])
+
+        for _ in range(warmup):
+            computation(*feed)
+        times = []
+        for _ in range(steps):
+            start = time.time()
+            computation(*feed)
+            times.append(time.time() - start)
+        result['step_ms'] = step_statistics(times)
+
+    if op_steps > 0:
+        with op_tracing(), closing(ngt.make_transformer()) as transformer:
+            computation = transformer.add_computation(train_computation)
+            result['op_ms'] = profile_ops(computation, feed, op_steps)
+    return result
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compares results against baseline results.
+
+    Arguments:
+        results: A list of results from run_model.
+        baseline: A list of results from run_model to compare against.
+        tolerance (float): Allowed fractional increase of the median step time and of the
+            total compile time. Memory sizes may not increase at all.
+
+    Returns:
+        A list of descriptions of the regressions.
+    """
+    baseline = {result['model']: result for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline.get(result['model'])
+        if reference is None:
+            continue
+        checks = [('median step ms', result['step_ms']['median'],
+                   reference['step_ms']['median'], tolerance),
+                  ('compile seconds', sum(result['compile_seconds'].values()),
+                   sum(reference['compile_seconds'].values()), tolerance)]
+        checks.extend((key, result['memory_bytes'][key], reference['memory_bytes'][key], 0)
+                      for key in result['memory_bytes'])
+        for key, value, reference_value, allowed in checks:
+            if value > reference_value * (1 + allowed):
+                regressions.append('{}: {} increased from {:.6g} to {:.6g}'.format(
+                    result['model'], key, reference_value, value))
+    return regressions
+
+
+def print_results(results):
+    formatter = '{:<14} {:>12} {:>12} {:>12} {:>12} {:>14}'
+    print(formatter.format('model', 'build s', 'compile s', 'median ms', 'p90 ms', 'peak MiB'))
+    for result in results:
+        peak = sum(result['memory_bytes'].values()) / 2**20
+        print(formatter.format(result['model'],
+                               '{:.3f}'.format(result['construction_seconds']),
+                               '{:.3f}'.format(sum(result['compile_seconds'].values())),
+                               '{:.3f}'.format(result['step_ms']['median']),
+                               '{:.3f}'.format(result['step_ms']['p90']),
+                               '{:.1f}'.format(peak)))
+
+
+if __name__ == '__main__':
+    parser = NgraphArgparser(description='Benchmark the example models on fake data')
+    parser.add_argument('--models', nargs='+', default=list(models), choices=list(models),
+                        help='models to benchmark')
+    parser.add_argument('--steps', type=int, default=20, help='number of timed steps')
+    parser.add_argument('--warmup', type=int, default=2, help='number of untimed steps')
+    parser.add_argument('--op_steps', type=int, default=5,
+                        help='number of steps to average per-op times over, 0 to skip')
+    parser.add_argument('--output', default=None, help='file to write the JSON results to')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results to compare against, exits with 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed fractional increase in step and compile time')
+    args = parser.parse_args()
+
+    np.random.seed(args.rng_seed)
+    results = [run_model(name, steps=args.steps, warmup=args.warmup, op_steps=args.op_steps)
+               for name in args.models]
+    print_results(results)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), tolerance=args.tolerance)
+        for regression in regressions:
+            print(regression)
+        sys.exit(1 if regressions else 0)
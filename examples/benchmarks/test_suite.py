@@ -0,0 +1,62 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+import copy
+import json
+
+import pytest
+
+from examples.benchmarks import suite
+
+tiny_configs = {
+    'mnist_lenet': dict(batch_size=4),
+    'char_rnn': dict(batch_size=4, time_steps=3, hidden_size=8, vocab_size=10),
+}
+
+
+@pytest.mark.parametrize('name', sorted(tiny_configs))
+def test_run_model(name):
+    result = suite.run_model(name, steps=3, warmup=1, op_steps=2, **tiny_configs[name])
+    result = json.loads(json.dumps(result))
+
+    assert result['step_ms']['steps'] == 3
+    assert result['step_ms']['min'] <= result['step_ms']['median'] <= result['step_ms']['max']
+    assert list(result['compile_seconds']) == ['execution_graph', 'passes', 'codegen']
+    pass_names = [pass_name for pass_name, _ in result['pass_seconds']]
+    assert 'LivenessPass' in pass_names and 'MemLayoutPass' in pass_names
+    assert result['memory_bytes']['temporary_max_allocated'] > 0
+    assert result['memory_bytes']['persistent_max_allocated'] > 0
+    assert sum(op['count'] for op in result['op_ms']) > 0
+
+
+def test_compare():
+    result = {'model': 'mnist_lenet',
+              'step_ms': {'median': 10.0},
+              'compile_seconds': {'passes': 1.0, 'codegen': 1.0},
+              'memory_bytes': {'temporary_max_allocated': 1024,
+                               'persistent_max_allocated': 2048}}
+    assert suite.compare([result], [result]) == []
+
+    slower = copy.deepcopy(result)
+    slower['step_ms']['median'] = 10.5
+    assert suite.compare([slower], [result], tolerance=0.1) == []
+    slower['step_ms']['median'] = 12.0
+    assert len(suite.compare([slower], [result], tolerance=0.1)) == 1
+
+    larger = copy.deepcopy(result)
+    larger['memory_bytes']['temporary_max_allocated'] = 1025
+    assert len(suite.compare([larger], [result])) == 1
+
+    assert suite.compare([result], []) == []
@@ -1,6 +1,6 @@
 from __future__ import division
-import random
-from collections import deque
+import itertools
+import numbers
 
 import ngraph as ng
 import numpy as np
@@ -370,40 +370,329 @@ class Agent(object):
         if len(self.memory) <= self.batch_size + 1:
             return
 
-        states = []
-        targets = []
-        samples = self.memory.sample(self.batch_size)
+        batch = self.memory.sample(self.batch_size)
 
         # batch axis is the last axis
-        states = np.stack([sample['state'] for sample in samples], axis=-1)
-        next_states = np.stack([sample['next_state'] for sample in samples],
-                               axis=-1)
+        states = np.moveaxis(batch['state'], 0, -1)
+        next_states = np.moveaxis(batch['next_state'], 0, -1)
 
         targets = self.model_wrapper.predict(states)
         next_values = self.model_wrapper.predict_target(next_states)
 
-        for i, sample in enumerate(samples):
-            target = sample['reward']
+        values = batch['reward'] + np.where(
+            batch['done'], 0, self.gamma * np.amax(next_values, axis=0)
+        )
 
-            if not sample['done']:
-                target += self.gamma * np.amax(next_values[:, i])
+        # scaling the error of each sample by its importance sampling weight
+        # scales its gradient in the squared loss by the same weight
+        samples = np.arange(self.batch_size)
+        errors = values - targets[batch['action'], samples]
+        targets[batch['action'], samples] += batch['weights'] * errors
 
-            targets[sample['action'], i] = target
+        self.memory.update_priorities(batch['indices'], errors)
 
         self.model_wrapper.train(states, targets)
 
 
-class Memory(deque):
+class SumTree(object):
+    """
+    A binary tree whose nodes hold the sum of their children, for sampling leaves in
+    proportion to their values in O(log n).
+
+    Arguments:
+        capacity (integer): the number of leaves.
+    """
+
+    def __init__(self, capacity):
+        super(SumTree, self).__init__()
+
+        self.capacity = capacity
+        # leaves start at index `leaf_start`, the root is at index 1
+        self.depth = int(np.ceil(np.log2(max(capacity, 2))))
+        self.leaf_start = 2 ** self.depth
+        self.tree = np.zeros(2 * self.leaf_start)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.leaf_start + np.asarray(indices)]
+
+    def update(self, indices, values):
+        """
+        Set the leaves at `indices` to `values` and update the sums above them.
+        """
+        nodes = self.leaf_start + np.asarray(indices)
+        self.tree[nodes] = values
+
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        """
+        Return the indices of the leaves in which each of `values`, taken as a
+        cumulative sum over the leaves, falls.  Leaves of value 0 are never
+        returned.
+        """
+        values = np.array(values, dtype=self.tree.dtype)
+        nodes = np.ones(len(values), dtype=np.int64)
+
+        for _ in range(self.depth):
+            left = 2 * nodes
+            # never descend into an empty subtree, even through rounding errors
+            go_right = ((values >= self.tree[left]) & (self.tree[left + 1] > 0)) | \
+                (self.tree[left] <= 0)
+            values -= np.where(go_right, self.tree[left], 0)
+            nodes = left + go_right
+
+        return nodes - self.leaf_start
+
+
+class Memory(object):
     """
     Memory is used to keep track of what is happened in the past so that
     we can sample from it and learn.
 
+    Transitions are stored in preallocated circular arrays which are allocated
+    on the first append.  When `history_length` is more than 1, states are
+    stacks of that many frames along their first axis, and only the newest
+    frame of each state is stored.  Stacked states are rebuilt by indexing the
+    `history_length` consecutive frames which end at a transition, so each
+    episode starts with the older frames of its first state and the next state
+    of a transition is the state of the one after it.
+
+    In prioritized mode, transitions are sampled in proportion to their
+    priority, kept in a sum tree, and `update_priorities` should be called
+    with the errors of each sampled batch.
+
     Arguments:
-        maxlen (integer): the maximum number of memories to record.
+        maxlen (integer): the maximum number of frames to record.
+        history_length (integer): the number of frames stacked in a state.
+        prioritized (bool): sample in proportion to priority rather than
+            uniformly.
+        alpha (float): how much the priorities are raised to the power of.
+        beta (float or generator): the exponent of the importance sampling
+            weights of prioritized samples, or a generator of them such as
+            `linear_generator`.
+        epsilon (float): added to errors so that no priority is 0.
     """
 
-    def __init__(self, **kwargs):
-        super(Memory, self).__init__(**kwargs)
+    def __init__(
+            self,
+            maxlen,
+            history_length=1,
+            prioritized=False,
+            alpha=0.6,
+            beta=0.4,
+            epsilon=1e-6,
+    ):
+        super(Memory, self).__init__()
+
+        if maxlen <= history_length:
+            raise ValueError((
+                'maxlen must be more than history_length. found {} and {}'
+            ).format(maxlen, history_length))
+
+        self.maxlen = maxlen
+        self.history_length = history_length
+        self.prioritized = prioritized
+        self.alpha = alpha
+        if isinstance(beta, numbers.Number):
+            beta = itertools.repeat(beta)
+        self.beta = beta
+        self.epsilon = epsilon
+
+        # the arrays are allocated once the first state's shape is known
+        self.frames = None
+        self.actions = np.zeros(maxlen, dtype=np.int64)
+        self.rewards = np.zeros(maxlen, dtype=np.float32)
+        self.dones = np.zeros(maxlen, dtype=bool)
+        # transitions whose state and next state are stored
+        self.valid = np.zeros(maxlen, dtype=bool)
+        self.num_valid = 0
+
+        if prioritized:
+            self.priorities = np.zeros(maxlen)
+            self.max_priority = 1.0
+            self.sum_tree = SumTree(maxlen)
+
+        self.cursor = 0
+        self.rows = 0
+        # the last transition, which is waiting for its next state
+        self.pending = None
+        self.next_state = None
+        self.next_state_array = None
+
+    def __len__(self):
+        return self.num_valid
+
+    def _frame(self, state):
+        if self.history_length == 1:
+            return state
+
+        if len(state) != self.history_length:
+            raise ValueError((
+                'Memory received a state of {} frames, expected {}'
+            ).format(len(state), self.history_length))
+
+        return state[-1]
+
+    def _set_valid(self, indices, valid):
+        indices = np.asarray(indices)
+        changed = indices[self.valid[indices] != valid]
+        self.valid[changed] = valid
+        self.num_valid += len(changed) if valid else -len(changed)
+
+        if self.prioritized and len(changed):
+            self.sum_tree.update(changed, self.priorities[changed] if valid else 0)
+
+    def _write(self, frame, action=0, reward=0, done=False):
+        """
+        Write a frame, and the transition from it if any, over the oldest row.
+        """
+        index = self.cursor
+
+        # the stacks of the rows after the overwritten one lose their oldest frames
+        if self.rows == self.maxlen:
+            self._set_valid((index + np.arange(self.history_length)) % self.maxlen, False)
+
+        self.frames[index] = frame
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.dones[index] = done
+        if self.prioritized:
+            self.priorities[index] = self.max_priority
+
+        self.cursor = (index + 1) % self.maxlen
+        self.rows = min(self.rows + 1, self.maxlen)
+
+        return index
+
+    def append(self, transition):
+        """
+        Record a transition, a dict of state, action, reward, next_state and
+        done.
+        """
+        state = transition['state']
+
+        if self.pending is not None and (
+                state is self.next_state or
+                np.array_equal(np.asarray(state), self.next_state_array)):
+            # the episode continues, and this state is the pending next state
+            index = self._write(
+                self._frame(self.next_state_array), transition['action'],
+                transition['reward'], transition['done'],
+            )
+            self._set_valid([self.pending], True)
+        else:
+            state = np.asarray(state)
+            frame = self._frame(state)
+
+            if self.frames is None:
+                self.frames = np.zeros((self.maxlen, ) + frame.shape, dtype=frame.dtype)
+
+            if self.pending is not None:
+                # end the previous episode with the next state it was left in
+                self._write(self._frame(self.next_state_array))
+                self._set_valid([self.pending], True)
+
+            # start a new episode with the older frames of its first state
+            for older_frame in state[:self.history_length - 1]:
+                self._write(older_frame)
+
+            index = self._write(
+                frame, transition['action'],
+                transition['reward'], transition['done'],
+            )
+
+        if transition['done']:
+            # the next state of a terminal transition is never used
+            self._set_valid([index], True)
+            self.pending = None
+            self.next_state = None
+            self.next_state_array = None
+        else:
+            self.pending = index
+            self.next_state = transition['next_state']
+            self.next_state_array = np.array(self.next_state)
+
+    def _stack(self, indices):
+        """
+        Return the states ending at the frames at `indices`.
+        """
+        if self.history_length == 1:
+            return self.frames[indices]
+
+        offsets = np.arange(1 - self.history_length, 1)
+        return self.frames[(indices[:, None] + offsets) % self.maxlen]
+
+    def _sample_uniform(self, batch_size):
+        if 2 * self.num_valid < self.rows:
+            candidates = np.flatnonzero(self.valid[:self.rows])
+            return candidates[np.random.randint(len(candidates), size=batch_size)]
+
+        # most rows are valid, so draw again the few samples that are not
+        indices = np.random.randint(self.rows, size=batch_size)
+        invalid = ~self.valid[indices]
+        while invalid.any():
+            indices[invalid] = np.random.randint(self.rows, size=invalid.sum())
+            invalid = ~self.valid[indices]
+
+        return indices
+
+    def _sample_prioritized(self, batch_size):
+        # one sample from each of `batch_size` equal ranges of the total priority
+        total = self.sum_tree.total
+        values = (np.arange(batch_size) + np.random.rand(batch_size)) * (total / batch_size)
+        indices = self.sum_tree.find(np.minimum(values, total))
+
+        probabilities = self.sum_tree.get(indices) / total
+        weights = (self.num_valid * probabilities) ** -next(self.beta)
+
+        return indices, (weights / weights.max()).astype(np.float32)
 
     def sample(self, batch_size):
-        return random.sample(self, batch_size)
+        """
+        Sample a batch of transitions, with replacement.
+
+        Returns a dict of arrays whose first axis is the batch: state, action,
+        reward, next_state and done, the indices of the transitions for
+        `update_priorities`, and their importance sampling weights, which are
+        all 1 unless prioritized.
+        """
+        if self.num_valid == 0:
+            raise ValueError('Cannot sample from an empty memory')
+
+        if self.prioritized:
+            indices, weights = self._sample_prioritized(batch_size)
+        else:
+            indices = self._sample_uniform(batch_size)
+            weights = np.ones(batch_size, dtype=np.float32)
+
+        return {
+            'state': self._stack(indices),
+            'action': self.actions[indices],
+            'reward': self.rewards[indices],
+            'next_state': self._stack((indices + 1) % self.maxlen),
+            'done': self.dones[indices],
+            'indices': indices,
+            'weights': weights,
+        }
+
+    def update_priorities(self, indices, errors):
+        """
+        Set the priorities of the transitions at `indices` from their errors.
+        """
+        if not self.prioritized:
+            return
+
+        priorities = (np.abs(errors) + self.epsilon) ** self.alpha
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, priorities.max())
+
+        # transitions overwritten since they were sampled keep a priority of 0
+        indices = np.asarray(indices)
+        valid = indices[self.valid[indices]]
+        self.sum_tree.update(valid, self.priorities[valid])
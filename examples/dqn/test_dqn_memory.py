@@ -0,0 +1,138 @@
+from ngraph.examples.dqn import dqn
+import pytest
+import numpy as np
+
+
+def run_episode(memory, states, done=True, action=1):
+    """append the transitions between consecutive states"""
+    for i in range(len(states) - 1):
+        memory.append({
+            'state': states[i],
+            'action': action,
+            'reward': float(i),
+            'next_state': states[i + 1],
+            'done': done and i == len(states) - 2,
+        })
+
+
+def stacked_states(frames, history_length):
+    """states of `history_length` consecutive frames, as a frame stacking wrapper"""
+    padded = [frames[0]] * (history_length - 1) + list(frames)
+    return [np.stack(padded[i:i + history_length]) for i in range(len(frames))]
+
+
+def test_memory_sample():
+    memory = dqn.Memory(maxlen=100)
+    states = [np.full((2, ), i, dtype=np.float32) for i in range(11)]
+    run_episode(memory, states)
+
+    assert len(memory) == 10
+
+    batch = memory.sample(32)
+    np.testing.assert_equal(batch['state'][:, 0], batch['reward'])
+    np.testing.assert_equal(batch['done'], batch['reward'] == 9)
+    # the next state of the terminal transition is not stored
+    not_done = ~batch['done']
+    np.testing.assert_equal(batch['next_state'][not_done, 0], batch['reward'][not_done] + 1)
+    np.testing.assert_equal(batch['action'], 1)
+    np.testing.assert_equal(batch['weights'], 1)
+
+
+def test_memory_sample_empty():
+    memory = dqn.Memory(maxlen=100)
+
+    with pytest.raises(ValueError):
+        memory.sample(1)
+
+
+def test_memory_pending_next_state():
+    memory = dqn.Memory(maxlen=100)
+    states = [np.full((1, ), i) for i in range(4)]
+    run_episode(memory, states, done=False)
+
+    # the last transition is only sampled once its next state is known
+    assert len(memory) == 2
+
+    run_episode(memory, [np.full((1, ), i) for i in range(10, 13)])
+
+    assert len(memory) == 5
+    batch = memory.sample(100)
+    not_done = ~batch['done']
+    np.testing.assert_equal(batch['next_state'][not_done] - batch['state'][not_done], 1)
+
+
+def test_memory_frame_stacking():
+    history_length = 4
+    memory = dqn.Memory(maxlen=100, history_length=history_length)
+    frames = np.arange(12, dtype=np.uint8).reshape(6, 2)
+    states = stacked_states(frames, history_length)
+    run_episode(memory, states)
+
+    # only one frame is stored for each state, after the older frames of the first
+    assert memory.rows == len(frames) - 1 + history_length - 1
+
+    batch = memory.sample(64)
+    for i, reward in enumerate(batch['reward'].astype(int)):
+        np.testing.assert_equal(batch['state'][i], states[reward])
+        if not batch['done'][i]:
+            np.testing.assert_equal(batch['next_state'][i], states[reward + 1])
+
+
+def test_memory_frame_stacking_wrong_length():
+    memory = dqn.Memory(maxlen=100, history_length=4)
+
+    with pytest.raises(ValueError):
+        run_episode(memory, [np.zeros((3, 2)), np.zeros((3, 2))])
+
+
+def test_memory_circular():
+    history_length = 2
+    memory = dqn.Memory(maxlen=16, history_length=history_length)
+    for episode in range(10):
+        frames = np.arange(5) + 100 * episode
+        run_episode(memory, stacked_states(frames[:, None], history_length))
+
+    assert memory.rows == 16
+
+    # the overwritten and the oldest of the remaining transitions can not be sampled
+    batch = memory.sample(256)
+    states = batch['state'][:, :, 0]
+    assert np.all(states[:, 0] // 100 >= 7)
+    assert np.all(states[:, 1] - states[:, 0] <= 1)
+    np.testing.assert_equal(states[:, 1] % 100, batch['reward'])
+
+
+def test_sum_tree():
+    tree = dqn.SumTree(5)
+    tree.update([0, 1, 3, 4], [1, 2, 0, 3])
+
+    assert tree.total == 6
+    np.testing.assert_equal(tree.find([0, 0.5, 1, 2.9, 3, 5.9, 6]), [0, 0, 1, 1, 4, 4, 4])
+
+    tree.update([4], [0])
+    assert tree.total == 3
+    np.testing.assert_equal(tree.find([3]), [1])
+
+
+def test_memory_prioritized():
+    np.random.seed(0)
+    memory = dqn.Memory(maxlen=100, prioritized=True, alpha=1, beta=1, epsilon=0)
+    states = [np.full((1, ), i) for i in range(11)]
+    run_episode(memory, states)
+
+    errors = np.zeros(10)
+    errors[3] = 4
+    errors[7] = 1
+    memory.update_priorities(np.arange(10), errors)
+    batch = memory.sample(1000)
+    counts = np.bincount(batch['indices'], minlength=10)
+
+    assert set(np.flatnonzero(counts)) == {3, 7}
+    assert 700 < counts[3] < 900
+    np.testing.assert_allclose(batch['weights'][batch['indices'] == 3], 0.25)
+    np.testing.assert_allclose(batch['weights'][batch['indices'] == 7], 1)
+
+    # new transitions have the highest priority seen so far
+    run_episode(memory, states[:2])
+
+    assert memory.sum_tree.get(10) == 4
@@ -28,6 +28,7 @@ from ngraph.op_graph.convolution import convolution, deconvolution
 from ngraph.op_graph.pooling import pooling
 from ngraph.op_graph.lookuptable import lookuptable
 from ngraph.op_graph.ctc import ctc
+from ngraph.op_graph.scan import scan
 from ngraph.op_graph.debug import PrintOp
 from ngraph.op_graph.op_graph import *
 from ngraph.op_graph.op_graph import axes_with_order, \
@@ -70,6 +71,7 @@ __all__ = [
     'pooling',
     'reciprocal',
     'safelog',
+    'scan',
     'sequential',
     'sigmoid',
     'sign',
@@ -100,12 +102,3 @@ if os.environ.get('NGRAPH_LOG', None) in ('ERROR', 'WARNING', 'INFO', 'DEBUG', '
 # Optionally we can act like a 'good library citizen' and not have any defaults, forcing the user
 # to set everything up:
 # logging.getLogger(__name__).addHandler(NullHandler())
-
-try:
-    from ngraph.transformers.gputransform import GPUTransformer
-    try:
-        from ngraph.transformers.flexgputransform import FlexGPUTransformer
-    except UnsupportedTransformerException:
-        pass
-except UnsupportedTransformerException:
-    pass
@@ -26,7 +26,7 @@ class ArrayIterator(object):
 
     def __init__(self, data_arrays, batch_size,
                  total_iterations=None, tgt_key='label',
-                 shuffle=False):
+                 shuffle=False, partial_batches=False):
         """
         During initialization, the input data will be converted to backend tensor objects
         (e.g. CPUTensor or GPUTensor). If the backend uses the GPU, the data is copied over to the
@@ -40,6 +40,9 @@ class ArrayIterator(object):
                                     If not provided, it will cycle through all of the data once.
             tgt_key (str): name of the target (labels) key in data_arrays
             shuffle (bool): if true, shuffles the dataset at the beginning of every epoch.
+            partial_batches (bool): if true, the last minibatch of an epoch holds the
+                                    remaining examples instead of wrapping around to the
+                                    start of the data. Use with a BucketedComputation.
         """
         # Treat singletons like list so that iteration follows same syntax
         self.batch_size = batch_size
@@ -70,6 +73,7 @@ class ArrayIterator(object):
         if shuffle:
             self.shuffle_data()
         self.shuffle = shuffle
+        self.partial_batches = partial_batches
 
         self.total_iterations = self.nbatches if total_iterations is None else total_iterations
 
@@ -80,9 +84,9 @@ class ArrayIterator(object):
         """
         return -((-self.ndata) // self.batch_size)
 
-    def make_placeholders(self, include_iteration=False):
+    def make_placeholders(self, include_iteration=False, batch_size=None):
         placeholders = {}
-        ax.N.length = self.batch_size
+        ax.N.length = self.batch_size if batch_size is None else batch_size
         for k, axnm in self.axis_names.items():
             p_axes = ng.make_axes([ax.N])
             for i, sz in enumerate(self.data_arrays[k].shape[1:], 1):
@@ -139,7 +143,7 @@ class ArrayIterator(object):
         self.index += 1
 
         total, batch_bufs = self.get_at_most(self.batch_size)
-        while total < self.batch_size:
+        while total < self.batch_size and not self.partial_batches:
             bsz, next_batch_bufs = self.get_at_most(self.batch_size - total)
             batch_bufs = {k: np.concatenate([batch_bufs[k], next_batch_bufs[k]])
                           for k in batch_bufs}
@@ -255,8 +259,8 @@ class SequentialArrayIterator(object):
         """
         return ((self.ndata - self.start) // self.stride // self.batch_size)
 
-    def make_placeholders(self):
-        ax.N.length = self.batch_size
+    def make_placeholders(self, batch_size=None):
+        ax.N.length = self.batch_size if batch_size is None else batch_size
         ax.REC.length = self.seq_len
 
         p_axes = ng.make_axes([ax.N, ax.REC])
@@ -15,7 +15,6 @@
 # ******************************************************************************
 from __future__ import division, print_function, absolute_import
 
-import h5py
 import os
 import logging
 import time
@@ -62,6 +61,7 @@ class CallbackContainer(object):
         just store a list of callbacks
         '''
         self._callbacks = callback_list
+        import h5py
         if output_file is None:
             if hasattr(self, 'callback_data'):
                 del self.callback_data
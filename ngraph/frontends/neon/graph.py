@@ -3,7 +3,6 @@ from contextlib import contextmanager
 from collections import OrderedDict
 from six import string_types
 
-import parsel
 from cachetools import keys, cached
 from orderedset import OrderedSet
 
@@ -246,6 +245,7 @@ class ComputationalGraph(object):
             subgraph.select("[recurrent_step=3]")
         """
 
+        import parsel
         ops = list()
         for selected in parsel.Selector(self._to_xml()).css(css):
             op = self._selector_to_op(selected)
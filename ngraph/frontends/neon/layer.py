@@ -20,6 +20,8 @@ import itertools
 import six
 from contextlib import contextmanager
 
+import numpy as np
+
 import ngraph as ng
 from ngraph.frontends.common import utils
 from ngraph.frontends.common.utils import make_poolparams
@@ -231,10 +233,12 @@ class LookupTable(Layer):
         update (bool): if the word vectors get updated through training
         pad_idx (int): by knowing the pad value, the update will make sure always
                        have the vector representing pad value to be 0s.
+        memmap (bool): if the table is stored in a memory-mapped file, on transformers
+                       that support it, so that only the rows used are kept in memory.
     """
 
     def __init__(self, vocab_size, embed_dim, init, update=True, pad_idx=None,
-                 **kwargs):
+                 memmap=False, **kwargs):
         super(LookupTable, self).__init__(**kwargs)
 
         self.vocab_size = vocab_size
@@ -242,6 +246,7 @@ class LookupTable(Layer):
         self.init = init
         self.update = update
         self.pad_idx = pad_idx
+        self.memmap = memmap
         self.W = None
 
     def lut_init(self, axes, pad_word_axis, pad_idx):
@@ -287,10 +292,13 @@ class LookupTable(Layer):
         self.o_axes = ng.make_axes([self.lut_f_axis]) | in_axes[0].axes
 
         if not self.initialized:
+            metadata = {"label": LABELS["weight"]}
+            if self.memmap:
+                metadata["memmap"] = True
             self.W = ng.variable(axes=self.w_axes,
                                  initial_value=self.lut_init(
                                      self.w_axes, self.lut_v_axis, self.pad_idx),
-                                 metadata={"label": LABELS["weight"]},
+                                 metadata=metadata,
                                  ).named('LutW')
 
         lut_result = ng.lookuptable(self.W, in_obj, self.lut_o_axes, update=self.update,
@@ -1303,6 +1311,23 @@ class Dropout(Layer):
             return self.mask * in_obj
 
 
+def packed_init(init, count):
+    """
+    Initializer for count weights packed along a leading axis.
+
+    Each weight is initialized separately by init, so fan-in based initializers see the
+    axes of a single weight rather than the packed ones.
+    """
+    if not callable(init):
+        return init
+
+    def initializer(w_axes):
+        axes = w_axes[1:]
+        return np.stack([np.broadcast_to(init(axes), axes.lengths) for _ in range(count)])
+
+    return initializer
+
+
 def get_steps(x, time_axis, backward=False):
     """
     TODO: Document
@@ -1337,6 +1362,9 @@ class Recurrent(Layer):
                             set to False to be stateful.
         return_sequence (bool): default to be True to return the whole sequence output.
         backward (bool): default to be False to process the sequence left to right
+        unroll (bool): default to be True to create the ops of each step in the graph. If
+                       False, the step is built once and looped over with ng.scan, which
+                       keeps the graph size independent of the sequence length (CPU only).
         name (str, optional): name to refer to this layer as.
 
     Attributes:
@@ -1347,7 +1375,7 @@ class Recurrent(Layer):
         b (Tensor): Biases on output units (output_size, 1)
     """
     def __init__(self, nout, init, init_inner=None, activation=None, batch_norm=False,
-                 reset_cells=True, return_sequence=True, backward=False, **kwargs):
+                 reset_cells=True, return_sequence=True, backward=False, unroll=True, **kwargs):
         super(Recurrent, self).__init__(**kwargs)
 
         self.nout = nout
@@ -1357,6 +1385,7 @@ class Recurrent(Layer):
         self.reset_cells = reset_cells
         self.return_sequence = return_sequence
         self.backward = backward
+        self.unroll = unroll
         self.batch_norm = BatchNorm() if batch_norm is True else None
         self.w_in_axes = None
 
@@ -1395,6 +1424,21 @@ class Recurrent(Layer):
             self.w_in_axes = temp_out_axes + self.in_feature_axes
             self.w_re_axes = temp_out_axes + self.out_feature_axes
 
+    def _scan(self, step, sequences, init_states):
+        """
+        Loops step over the recurrent axis with ng.scan instead of unrolling it.
+
+        Returns:
+            list of (sequence, last) pairs, one for each state. The sequence is indexed by
+            time and last is the state after the final step.
+        """
+        outputs = ng.scan(step, sequences, init_states,
+                          recurrent_axis=self.recurrent_axis,
+                          backward=self.backward,
+                          pos=self.recurrent_axis_idx)
+        last = 0 if self.backward else self.recurrent_axis.length - 1
+        return [(out, ng.slice_along_axis(out, self.recurrent_axis, last)) for out in outputs]
+
     def _step(self, h_ff, states):
         h_ff = ng.cast_role(h_ff, self.out_axes)
         h_rec = ng.cast_role(ng.dot(self.W_recur, states), self.out_axes)
@@ -1455,27 +1499,32 @@ class Recurrent(Layer):
         if self.batch_norm is not None:
             h_ff = self.batch_norm(h_ff)
 
-        # slice the weighted inputs into time slices
-        in_s = get_steps(h_ff, self.recurrent_axis, self.backward)
-
-        # unrolling computations
-        for i in range(self.recurrent_axis.length):
-            with ng.metadata(recurrent_step=str(i)):
-                h = self._step(in_s[i], h)
-                h_list.append(h)
-
-        if self.return_sequence is True:
-            # only when returning a sequence, need to reverse the output
-            h_list = h_list[::-1] if self.backward else h_list
-            rnn_out = ng.stack(h_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
+        if not self.unroll:
+            [(h_stack, h)] = self._scan(lambda h_ff, states: [self._step(h_ff[0], states[0])],
+                                        [h_ff], [self.h_init])
+            rnn_out = h_stack if self.return_sequence is True else h
         else:
-            rnn_out = h_list[-1]
+            # slice the weighted inputs into time slices
+            in_s = get_steps(h_ff, self.recurrent_axis, self.backward)
+
+            # unrolling computations
+            for i in range(self.recurrent_axis.length):
+                with ng.metadata(recurrent_step=str(i)):
+                    h = self._step(in_s[i], h)
+                    h_list.append(h)
+
+            if self.return_sequence is True:
+                # only when returning a sequence, need to reverse the output
+                h_list = h_list[::-1] if self.backward else h_list
+                rnn_out = ng.stack(h_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
+            else:
+                rnn_out = h
 
         if self.reset_cells is True:
             return rnn_out
         else:
             return ng.sequential([
-                ng.assign(self.h_init, h_list[-1]),
+                ng.assign(self.h_init, h),
                 rnn_out
             ])
 
@@ -1602,6 +1651,12 @@ class LSTM(Recurrent):
                             set to False to be stateful.
         return_sequence (bool): default to be True to return the whole sequence output.
         backward (bool): default to be False to process the sequence left to right
+        unroll (bool): default to be True to create the ops of each step in the graph. If
+                       False, the step is built once and looped over with ng.scan (CPU only).
+        fused_gates (bool): default to be False to keep separate weights for each gate. If
+                            True, the weights of all gates are packed along gate_axis, so
+                            the input projection is one dot over the whole sequence and each
+                            step computes all gates with one dot.
         name (str, optional): name to refer to this layer as.
     Attributes:
         W_input (Tensor): weights from inputs to output units
@@ -1609,6 +1664,8 @@ class LSTM(Recurrent):
         W_recur (Tensor): weights for recurrent connections
             (output_size, output_size)
         b (Tensor): Biases on output units (output_size, 1)
+        gate_axis (Axis): With fused_gates, the leading axis of the packed W_input, W_recur
+            and b, in the order of metadata['gates'].
 
     Gates: i - input gate, f - forget gate, o - output gate, g - input modulation
     """
@@ -1616,13 +1673,19 @@ class LSTM(Recurrent):
 
     def __init__(self, nout, init, init_inner=None, activation=None, gate_activation=None,
                  batch_norm=False, reset_cells=True, return_sequence=True, backward=False,
-                 **kwargs):
+                 unroll=True, fused_gates=False, **kwargs):
         super(LSTM, self).__init__(nout, init, init_inner=init_inner, activation=activation,
                                    reset_cells=reset_cells, return_sequence=return_sequence,
-                                   backward=backward, **kwargs)
+                                   backward=backward, unroll=unroll, **kwargs)
 
+        self.fused_gates = fused_gates
         if batch_norm is True:
-            self.batch_norm = {k: BatchNorm() for k in self.metadata["gates"]}
+            # Statistics are per feature, so one batch norm over the packed gates is the same
+            # as one per gate
+            if fused_gates:
+                self.batch_norm = BatchNorm()
+            else:
+                self.batch_norm = {k: BatchNorm() for k in self.metadata["gates"]}
         else:
             self.batch_norm = None
         self.gate_activation = gate_activation if gate_activation is not None else self.activation
@@ -1645,6 +1708,30 @@ class LSTM(Recurrent):
         h = ng.cast_role(h, self.out_axes)
         return [h, c]
 
+    def _fused_step(self, h_ff, states):
+        h_state = states[0]
+        c_state = states[1]
+        gate_out_axes = self.gate_axis + self.out_axes
+        ifog = sum([ng.cast_role(h_ff, gate_out_axes),
+                    ng.cast_role(ng.dot(self.W_recur, h_state), gate_out_axes),
+                    self.b,
+                    ])
+
+        # The input modulation g is the last gate, so the other gates are activated together
+        pos = ifog.axes.index(self.gate_axis)
+        n_gates = self.gate_axis.length - 1
+        ifo = ng.tensor_slice(ifog, [slice(0, n_gates) if i == pos else slice(None)
+                                     for i in range(len(ifog.axes))])
+        ifo_act = self.gate_activation(ifo)
+        ifog_act = {k: ng.slice_along_axis(ifo_act, ifo.axes[pos], i)
+                    for i, k in enumerate(self.metadata['gates'][:n_gates])}
+        ifog_act['g'] = self.activation(ng.slice_along_axis(ifog, self.gate_axis, n_gates))
+
+        c = ifog_act['f'] * c_state + ifog_act['i'] * ifog_act['g']
+        h = ifog_act['o'] * self.activation(c)
+        h = ng.cast_role(h, self.out_axes)
+        return [h, c]
+
     @SubGraph.scope_op_creation
     def __call__(self, in_obj, init_state=None, return_cell_state=False, **kwargs):
         """
@@ -1690,22 +1777,11 @@ class LSTM(Recurrent):
                     self.c_init = ng.variable(initial_value=0,
                                               axes=self.out_axes).named('c_init')
 
-            # params are dictionary for i, f, o, g
-            gates = self.metadata["gates"]
-            self.W_input = {k: ng.variable(axes=self.w_in_axes,
-                                           initial_value=self.init,
-                                           metadata={"label": LABELS["weight"]},
-                                           ).named("W_in_{}".format(k)) for k in gates}
-
-            self.W_recur = {k: ng.variable(axes=self.w_re_axes,
-                                           initial_value=self.init_inner,
-                                           metadata={"label": LABELS["weight"]},
-                                           ).named("W_re_{}".format(k)) for k in gates}
-
-            self.b = {k: ng.variable(axes=self.out_feature_axes,
-                                     initial_value=0,
-                                     metadata={"label": LABELS["bias"]},
-                                     ).named("bias_{}".format(k)) for k in gates}
+            if self.fused_gates:
+                self._init_fused_params()
+            else:
+                # params are dictionary for i, f, o, g
+                self._init_gate_params()
 
         h = self.h_init
         c = self.c_init
@@ -1716,49 +1792,110 @@ class LSTM(Recurrent):
         # Compute feed forward weighted inputs
         # Batch norm is computed only on the weighted inputs
         # as in https://arxiv.org/abs/1510.01378
-        h_ff = dict()
-        for k in self.metadata["gates"]:
-            h_ff[k] = ng.dot(self.W_input[k], in_obj)
+        if self.fused_gates:
+            step = self._fused_step
+            h_ff = ng.dot(self.W_input, in_obj)
             if self.batch_norm is not None:
-                h_ff[k] = self.batch_norm[k](h_ff[k])
+                h_ff = self.batch_norm(h_ff)
+        else:
+            step = self._step
+            h_ff = dict()
+            for k in self.metadata["gates"]:
+                h_ff[k] = ng.dot(self.W_input[k], in_obj)
+                if self.batch_norm is not None:
+                    h_ff[k] = self.batch_norm[k](h_ff[k])
+
+        if not self.unroll:
+            gates = self.metadata["gates"]
+            if self.fused_gates:
+                sequences = [h_ff]
 
-            # slice the weighted inputs into time slices
-        h_ff = get_steps(h_ff, self.recurrent_axis, self.backward)
+                def scan_step(h_ff, states):
+                    return step(h_ff[0], states)
+            else:
+                sequences = [h_ff[k] for k in gates]
+
+                def scan_step(h_ff, states):
+                    return step(dict(zip(gates, h_ff)), states)
 
-        # recurrent computation
-        for i in range(self.recurrent_axis.length):
-            with ng.metadata(recurrent_step=str(i)):
-                [h, c] = self._step(h_ff[i], [h, c])
-                h_list.append(h)
-                c_list.append(c)
+            [(h_stack, h), (c_stack, c)] = self._scan(scan_step, sequences,
+                                                      [self.h_init, self.c_init])
+        else:
+            # slice the weighted inputs into time slices
+            h_ff = get_steps(h_ff, self.recurrent_axis, self.backward)
+
+            # recurrent computation
+            for i in range(self.recurrent_axis.length):
+                with ng.metadata(recurrent_step=str(i)):
+                    [h, c] = step(h_ff[i], [h, c])
+                    h_list.append(h)
+                    c_list.append(c)
+
+            if self.return_sequence is True:
+                if self.backward:
+                    h_list = h_list[::-1]
+                    c_list = c_list[::-1]
+                h_stack = ng.stack(h_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
+                if return_cell_state:
+                    c_stack = ng.stack(c_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
 
         if self.return_sequence is True:
-            if self.backward:
-                h_list = h_list[::-1]
-                c_list = c_list[::-1]
-            h_stack = ng.stack(h_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
             if return_cell_state:
-                c_stack = ng.stack(c_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
                 lstm_out = (h_stack, c_stack)
             else:
                 lstm_out = h_stack
         else:
             if return_cell_state:
-                lstm_out = (h_list[-1], c_list[-1])
+                lstm_out = (h, c)
             else:
-                lstm_out = h_list[-1]
+                lstm_out = h
 
         if self.reset_cells is True:
             return lstm_out
         else:
             return ng.sequential([
                 ng.doall([
-                    ng.assign(self.h_init, h_list[-1]),
-                    ng.assign(self.c_init, c_list[-1])
+                    ng.assign(self.h_init, h),
+                    ng.assign(self.c_init, c)
                 ]),
                 lstm_out
             ])
 
+    def _init_gate_params(self):
+        gates = self.metadata["gates"]
+        self.W_input = {k: ng.variable(axes=self.w_in_axes,
+                                       initial_value=self.init,
+                                       metadata={"label": LABELS["weight"]},
+                                       ).named("W_in_{}".format(k)) for k in gates}
+
+        self.W_recur = {k: ng.variable(axes=self.w_re_axes,
+                                       initial_value=self.init_inner,
+                                       metadata={"label": LABELS["weight"]},
+                                       ).named("W_re_{}".format(k)) for k in gates}
+
+        self.b = {k: ng.variable(axes=self.out_feature_axes,
+                                 initial_value=0,
+                                 metadata={"label": LABELS["bias"]},
+                                 ).named("bias_{}".format(k)) for k in gates}
+
+    def _init_fused_params(self):
+        gates = self.metadata["gates"]
+        self.gate_axis = ng.make_axis(length=len(gates), name="gates")
+        self.W_input = ng.variable(axes=self.gate_axis + self.w_in_axes,
+                                   initial_value=packed_init(self.init, len(gates)),
+                                   metadata={"label": LABELS["weight"]},
+                                   ).named("W_in")
+
+        self.W_recur = ng.variable(axes=self.gate_axis + self.w_re_axes,
+                                   initial_value=packed_init(self.init_inner, len(gates)),
+                                   metadata={"label": LABELS["weight"]},
+                                   ).named("W_re")
+
+        self.b = ng.variable(axes=self.gate_axis + self.out_feature_axes,
+                             initial_value=0,
+                             metadata={"label": LABELS["bias"]},
+                             ).named("bias")
+
 
 def _cells_state_info(cells):
     """
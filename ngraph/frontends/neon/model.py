@@ -16,6 +16,8 @@
 from __future__ import division
 
 from operator import itemgetter
+import numpy as np
+from ngraph.frontends.neon.axis import ax
 from ngraph.frontends.neon.graph import SubGraph
 import ngraph as ng
 
@@ -170,6 +172,124 @@ class BoundComputation(object):
         return result_dict
 
 
+class BucketedComputation(object):
+    """
+    Callable object that runs a computation on batches of any size up to its largest bucket.
+
+    The batch axis of the inputs is bucketed. The computation is built and compiled once for
+    each bucket batch size, the first time a batch needs it, and a batch is padded to the
+    smallest bucket that holds it by repeating its last example. Outputs with a batch axis
+    are trimmed back to the size of the batch, so partial batches and requests of varying
+    sizes do not need a graph of their own.
+
+    Layers called by make_outputs reuse their variables, so all of the buckets share the
+    weights. Anything else make_outputs creates, such as optimizer state, is made for each
+    bucket, and reductions over the batch axis, such as a mean cost, include the padding.
+
+    Arguments:
+        transformer (object): Transformer object defined in the model
+        make_placeholders (callable): Returns the dict of input placeholders for a batch_size
+            keyword argument, e.g. ArrayIterator.make_placeholders
+        make_outputs (callable): Returns the dict of outputs wanted for the computation from
+            a dict of input placeholders
+        buckets (list): Batch sizes to compile the computation for
+
+    Example:
+        .. code-block:: python
+        def make_outputs(inputs):
+            with Layer.inference_mode_on():
+                return {'prob': seq1(inputs['image'])}
+        inference = BucketedComputation(transformer, train_set.make_placeholders,
+                                        make_outputs, buckets=[1, 8, 32, 128])
+        output_dict = inference({'image': images})
+    """
+    def __init__(self, transformer, make_placeholders, make_outputs, buckets):
+        if not buckets:
+            raise ValueError("At least one bucket is needed")
+        self.transformer = transformer
+        self.make_placeholders = make_placeholders
+        self.make_outputs = make_outputs
+        self.buckets = sorted(set(buckets))
+        self.computations = dict()
+        self.input_positions = None
+
+    def bucket(self, batch_size):
+        """
+        Returns the smallest bucket that holds batch_size examples.
+        """
+        for bucket in self.buckets:
+            if bucket >= batch_size:
+                return bucket
+        raise ValueError("Batch of {} examples is larger than the largest bucket {}"
+                         .format(batch_size, self.buckets[-1]))
+
+    def computation(self, bucket):
+        """
+        Returns the BoundComputation for a bucket and the position of the batch axis in each
+        of its outputs, building and compiling it if needed.
+        """
+        computation = self.computations.get(bucket)
+        if computation is None:
+            # Batch axis lengths are read when the computation is compiled, so each bucket
+            # is compiled right after its placeholders are made, and any batch axis length
+            # set before make_placeholders is restored afterwards
+            batch_length = ax.N.length
+            try:
+                named_inputs = self.make_placeholders(batch_size=bucket)
+                named_outputs = self.make_outputs(named_inputs)
+                computation = (BoundComputation(self.transformer, named_outputs, named_inputs),
+                               {k: _batch_axis_position(v) for k, v in named_outputs.items()})
+            finally:
+                if batch_length is not None:
+                    ax.N.length = batch_length
+            if self.input_positions is None:
+                self.input_positions = {k: _batch_axis_position(v)
+                                        for k, v in named_inputs.items()}
+            self.computations[bucket] = computation
+        return computation
+
+    def __call__(self, named_buffers):
+        if self.input_positions is None:
+            # the batch axis positions of the inputs are those of the first bucket's
+            self.computation(self.buckets[0])
+        batch_sizes = set(np.shape(named_buffers[k])[position]
+                          for k, position in self.input_positions.items()
+                          if position is not None)
+        if len(batch_sizes) != 1:
+            raise ValueError("Inputs must have one batch size, got {}".format(batch_sizes))
+        batch_size = batch_sizes.pop()
+        bucket = self.bucket(batch_size)
+        bound_computation, output_positions = self.computation(bucket)
+        if bucket == batch_size:
+            return bound_computation(named_buffers)
+
+        padded = dict(named_buffers)
+        for k, position in self.input_positions.items():
+            if position is not None:
+                padded[k] = _pad_batch(named_buffers[k], position, bucket)
+        results = bound_computation(padded)
+        for k, position in output_positions.items():
+            if position is not None:
+                results[k] = np.take(results[k], np.arange(batch_size), axis=position)
+        return results
+
+
+def _batch_axis_position(op):
+    for position, axis in enumerate(op.axes):
+        if axis.is_batch:
+            return position
+    return None
+
+
+def _pad_batch(array, position, batch_size):
+    """
+    Pads array along its batch axis at position to batch_size by repeating the last example.
+    """
+    array = np.asarray(array)
+    indices = np.minimum(np.arange(batch_size), array.shape[position] - 1)
+    return np.take(array, indices, axis=position)
+
+
 def make_bound_computation(transformer, named_outputs, named_inputs):
     """
     Creates a `BoundComputation` instance that takes named input arrays
@@ -0,0 +1,89 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.frontends.neon import Affine, ArrayIterator, BucketedComputation, GaussianInit, \
+    Layer, ax
+
+
+def make_dataset(ndata=10, nfeatures=4, batch_size=4):
+    data = {'X': {'data': np.random.uniform(-1, 1, (ndata, nfeatures)).astype(np.float32),
+                  'axes': ('N', 'F')},
+            'y': {'data': np.arange(ndata, dtype=np.float32),
+                  'axes': ('N',)}}
+    return ArrayIterator(data, batch_size, partial_batches=True)
+
+
+def test_partial_batches():
+    dataset = make_dataset()
+    batches = [batch['X'] for batch in dataset]
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    np.testing.assert_array_equal(np.concatenate(batches), dataset.data_arrays['X'])
+
+
+def test_bucketed_computation(transformer_factory):
+    dataset = make_dataset()
+    ax.Y.length = 3
+    layer = Affine(weight_init=GaussianInit(), bias_init=GaussianInit(), axes=ax.Y)
+
+    def make_outputs(inputs):
+        with Layer.inference_mode_on():
+            return {'out': layer(inputs['X']), 'total': ng.sum(inputs['y'], out_axes=())}
+
+    with closing(ngt.make_transformer()) as transformer:
+        computation = BucketedComputation(transformer, dataset.make_placeholders,
+                                          make_outputs, buckets=[4, 2])
+        x = dataset.data_arrays['X']
+        y = dataset.data_arrays['y']
+        full = computation({'X': x[:4], 'y': y[:4]})
+        for batch_size in (1, 2, 3):
+            partial = computation({'X': x[:batch_size], 'y': y[:batch_size]})
+            # the output axes are (Y, N)
+            assert partial['out'].shape == (3, batch_size)
+            np.testing.assert_allclose(partial['out'], full['out'][:, :batch_size], rtol=1e-6)
+        assert sorted(computation.computations) == [2, 4]
+
+        # reductions over the batch include the padding, which repeats the last example
+        assert computation({'X': x[:3], 'y': y[:3]})['total'] == y[0] + y[1] + 2 * y[2]
+
+        with pytest.raises(ValueError):
+            computation({'X': x[:5], 'y': y[:5]})
+
+
+def test_bucketed_computation_batch_length(transformer_factory):
+    dataset = make_dataset()
+    ax.N.length = 7
+
+    def make_outputs(inputs):
+        return {'total': ng.sum(inputs['y'], out_axes=())}
+
+    with closing(ngt.make_transformer()) as transformer:
+        computation = BucketedComputation(transformer, dataset.make_placeholders,
+                                          make_outputs, buckets=[4, 2])
+        # no placeholders are made until a computation is needed
+        assert computation.input_positions is None
+        assert ax.N.length == 7
+
+        y = dataset.data_arrays['y']
+        assert computation({'X': dataset.data_arrays['X'][:3], 'y': y[:3]})['total'] == \
+            y[0] + y[1] + 2 * y[2]
+        assert computation.input_positions == {'X': 0, 'y': 0}
+        assert ax.N.length == 7
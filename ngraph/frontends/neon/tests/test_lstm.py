@@ -45,6 +45,7 @@ from ngraph.testing.random import RandomTensorGenerator
 pytestmark = [pytest.mark.transformer_dependent,
               pytest.config.flex_disabled(reason="#1955 - LSTM is not yet supported with Flex")]
 rng = RandomTensorGenerator()
+gates = ['i', 'f', 'o', 'g']
 
 delta = 1e-3
 rtol = atol = 1e-5
@@ -74,6 +75,22 @@ def test_ref_compare_rand(reflstmargs):
                    num_iter=num_iter)
 
 
+@pytest.config.cpu_enabled_only
+def test_ref_compare_scan(reflstmargs):
+    seq_len, input_size, hidden_size, batch_size, num_iter, reset_cells = reflstmargs
+    check_lstm(seq_len, input_size, hidden_size, batch_size,
+               GaussianInit(0.0, 0.1), reset_cells=reset_cells,
+               num_iter=num_iter, unroll=False)
+
+
+@pytest.config.argon_disabled(reason="#2219 - ArgonSim ValueError: axes don't match array")
+def test_ref_compare_fused(reflstmargs):
+    seq_len, input_size, hidden_size, batch_size, num_iter, reset_cells = reflstmargs
+    check_lstm(seq_len, input_size, hidden_size, batch_size,
+               GaussianInit(0.0, 0.1), reset_cells=reset_cells,
+               num_iter=num_iter, fused_gates=True)
+
+
 @pytest.config.argon_disabled(reason="#2219 - ArgonSim ValueError: axes don't match array")
 def test_ref_stacked(reflstmargs):
         seq_len, input_size, hidden_size, batch_size, num_iter, reset_cells = reflstmargs
@@ -82,6 +99,51 @@ def test_ref_stacked(reflstmargs):
                            num_iter=num_iter)
 
 
+@pytest.config.argon_disabled(reason="#2219 - ArgonSim ValueError: axes don't match array")
+@pytest.mark.parametrize("unroll", [True, pytest.config.cpu_enabled_only(False)])
+def test_fused_gates_deriv(unroll):
+    Cin = ng.make_axis(3, name='Feature')
+    REC = ng.make_axis(4, name='REC')
+    N = ng.make_axis(2, name='N')
+    inp_ng = ng.placeholder([Cin, REC, N])
+    input_value = rng.uniform(-1, 1, inp_ng.axes)
+
+    lstm_ng = LSTM(5, GaussianInit(0.0, 0.1), activation=Tanh(), gate_activation=Logistic())
+    cost = ng.sum(lstm_ng(inp_ng), out_axes=())
+
+    with ExecutorFactory() as ex:
+        params = ex.executor([lstm_ng.W_input[k] for k in gates] +
+                             [lstm_ng.W_recur[k] for k in gates] +
+                             [lstm_ng.b[k] for k in gates])()
+        params = [np.stack([p.copy() for p in params[i:i + 4]]) for i in range(0, 12, 4)]
+        grads = ex.executor([ng.deriv(cost, lstm_ng.W_input[k]) for k in gates] +
+                            [ng.deriv(cost, lstm_ng.W_recur[k]) for k in gates] +
+                            [ng.deriv(cost, lstm_ng.b[k]) for k in gates], inp_ng)(input_value)
+        grads = [np.stack([g.copy() for g in grads[i:i + 4]]) for i in range(0, 12, 4)]
+
+    # Initialize the packed weights with the separate weights, stacked along the gate axis
+    lstm_fused = LSTM(5, params[0], init_inner=params[1], activation=Tanh(),
+                      gate_activation=Logistic(), fused_gates=True, unroll=unroll)
+    cost_fused = ng.sum(lstm_fused(inp_ng), out_axes=())
+    with ExecutorFactory() as ex:
+        fused_grads = ex.executor([ng.deriv(cost_fused, p) for p in
+                                   (lstm_fused.W_input, lstm_fused.W_recur, lstm_fused.b)],
+                                  inp_ng)(input_value)
+
+    for fused_grad, grad in zip(fused_grads, grads):
+        ng.testing.assert_allclose(fused_grad, grad, rtol=rtol, atol=atol)
+
+
+def gate_params(lstm, name):
+    """
+    The weights of each gate, in the order of gates, whether or not they are packed.
+    """
+    param = getattr(lstm, name)
+    if lstm.fused_gates:
+        return [ng.slice_along_axis(param, lstm.gate_axis, i) for i in range(len(gates))]
+    return [param[k] for k in gates]
+
+
 def copier(f):
     def copy(x):
         return type(x)(_.copy() for _ in x)
@@ -97,7 +159,7 @@ def copier_T(f):
 # compare ngraph LSTM to reference LSTM implementation
 def check_lstm(seq_len, input_size, hidden_size,
                batch_size, init_func, return_seq=True, backward=False,
-               reset_cells=False, num_iter=2):
+               reset_cells=False, num_iter=2, unroll=True, fused_gates=False):
 
     Cin = ng.make_axis(input_size, name='Feature')
     REC = ng.make_axis(seq_len, name='REC')
@@ -110,16 +172,15 @@ def check_lstm(seq_len, input_size, hidden_size,
 
         lstm_ng = LSTM(hidden_size, init_func, activation=Tanh(), gate_activation=Logistic(),
                        reset_cells=reset_cells, return_sequence=return_seq,
-                       backward=backward)
+                       backward=backward, unroll=unroll, fused_gates=fused_gates)
 
         out_ng = lstm_ng(inp_ng)
 
         fprop_neon_fun = copier(ex.executor((out_ng, lstm_ng.h_init), inp_ng))
 
-        gates = ['i', 'f', 'o', 'g']
-        Wxh_neon_fun = copier_T(ex.executor(list(lstm_ng.W_input[k] for k in gates)))
-        Whh_neon_fun = copier_T(ex.executor(list(lstm_ng.W_recur[k] for k in gates)))
-        bh_neon_fun = copier(ex.executor(list(lstm_ng.b[k] for k in gates)))
+        Wxh_neon_fun = copier_T(ex.executor(gate_params(lstm_ng, 'W_input')))
+        Whh_neon_fun = copier_T(ex.executor(gate_params(lstm_ng, 'W_recur')))
+        bh_neon_fun = copier(ex.executor(gate_params(lstm_ng, 'b')))
 
         fprop_neon_list = []
         input_value_list = []
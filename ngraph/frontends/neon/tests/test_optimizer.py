@@ -338,6 +338,103 @@ def test_adagrad(random_learning_rate, epsilon, select_variables):
         compare_optimizer(adagrad, adagrad_ref)
 
 
+@pytest.mark.parametrize("make_optimizers", [
+    lambda: (GradientDescentMomentum(0.1, momentum_coef=0.9),
+             GDMReference(0.1, momentum_coef=0.9, wdecay=0, nesterov=False)),
+    lambda: (Adam(0.1), AdamReference(0.1, beta_1=0.9, beta_2=0.999, epsilon=1e-8)),
+])
+def test_accumulate_gradients(make_optimizers):
+    """
+    Accumulating over micro-batches and applying matches a step on the full batch
+    """
+    opt_ng, opt_ref = make_optimizers()
+    C = ng.make_axis(20)
+    N = ng.make_axis(16, name='N')
+    n_micro_batches = 2
+
+    data = ng.placeholder([C, N])
+    target = ng.placeholder([N])
+    np_W = np.random.rand(C.length)
+    W = ng.variable([C], initial_value=np_W)
+    cost = ng.sum(target - ng.dot(W, data), out_axis=())
+
+    with ExecutorFactory() as ex:
+        accumulate = ex.transformer.computation(opt_ng.accumulate(cost), data, target)
+        apply_accumulated = ex.transformer.computation(
+            ng.sequential([opt_ng.apply_accumulated(), W]))
+
+        for step in range(3):
+            batches = list(data_generator(n_micro_batches, C.length, N.length))
+            for x, y in batches:
+                accumulate(x, y)
+            ng_W = apply_accumulated()
+            np_W = opt_ref(np.concatenate([x for x, _ in batches], axis=1), np_W)
+            ng.testing.assert_allclose(np_W, ng_W, rtol=1e-3)
+
+
+@pytest.mark.parametrize("optimizer_class", optimizer_list)
+@pytest.mark.parametrize("weight_clip_value", [None, 0.5])
+def test_fused_update(optimizer_class, weight_clip_value):
+    """
+    Updating all variables through flat arenas matches updating them one by one
+    """
+    C = ng.make_axis(20)
+    D = ng.make_axis(3)
+    N = ng.make_axis(32, name='N')
+    data = ng.placeholder([C, N])
+    target = ng.placeholder([N])
+    initial_values = [np.random.rand(D.length, C.length), np.random.rand(D.length)]
+
+    results = []
+    for fused in [False, True]:
+        W = ng.variable([D, C], initial_value=initial_values[0])
+        b = ng.variable([D], initial_value=initial_values[1])
+        cost = ng.sum(ng.square(target - ng.sum(ng.dot(W, data) + b, out_axes=[N])),
+                      out_axis=())
+        optimizer = optimizer_class(learning_rate=0.01, gradient_clip_norm=1.0,
+                                    weight_clip_value=weight_clip_value, fused=fused)
+        with ExecutorFactory() as ex:
+            train = ex.transformer.computation(ng.sequential([optimizer(cost), W, b]),
+                                               data, target)
+            np.random.seed(0)
+            results.append([[value.copy() for value in train(x, y)]
+                            for x, y in data_generator(5, C.length, N.length)])
+
+    for unfused_values, fused_values in zip(*results):
+        for unfused_value, fused_value in zip(unfused_values, fused_values):
+            ng.testing.assert_allclose(fused_value, unfused_value, rtol=1e-5, atol=1e-6)
+
+
+def test_apply_without_accumulated_steps():
+    """
+    Applying again with nothing accumulated leaves the variables finite and unchanged
+    """
+    C = ng.make_axis(20)
+    N = ng.make_axis(16, name='N')
+    data = ng.placeholder([C, N])
+    target = ng.placeholder([N])
+    W = ng.variable([C], initial_value=np.random.rand(C.length))
+    cost = ng.sum(target - ng.dot(W, data), out_axis=())
+    optimizer = GradientDescentMomentum(0.1)
+
+    with ExecutorFactory() as ex:
+        accumulate = ex.transformer.computation(optimizer.accumulate(cost), data, target)
+        apply_accumulated = ex.transformer.computation(
+            ng.sequential([optimizer.apply_accumulated(), W]))
+
+        for x, y in data_generator(1, C.length, N.length):
+            accumulate(x, y)
+        W_applied = apply_accumulated().copy()
+        W_reapplied = apply_accumulated()
+        assert np.all(np.isfinite(W_reapplied))
+        ng.testing.assert_allclose(W_reapplied, W_applied)
+
+
+def test_apply_before_accumulate():
+    with pytest.raises(ValueError):
+        GradientDescentMomentum(0.1).apply_accumulated()
+
+
 @pytest.config.argon_disabled(reason="Argon Transformer error")  # TODO triage
 @pytest.config.flex_disabled(reason="Unknown problem yet")
 def test_learning_policy_step():
@@ -122,9 +122,10 @@ def make_weights(input_placeholder, hidden_size, weight_initializer, bias_initia
 @pytest.mark.parametrize("init_state", [True, False])
 @pytest.mark.parametrize("extra_axes", [0, 2])
 @pytest.mark.parametrize("backward", [True, False])
+@pytest.mark.parametrize("unroll", [True, pytest.config.cpu_enabled_only(False)])
 def test_rnn_fprop(sequence_length, input_size, hidden_size, batch_size,
                    return_sequence, weight_initializer, bias_initializer,
-                   init_state, extra_axes, backward):
+                   init_state, extra_axes, backward, unroll):
 
     assert batch_size == 1, "the recurrent reference implementation only support batch size 1"
 
@@ -150,7 +151,7 @@ def test_rnn_fprop(sequence_length, input_size, hidden_size, batch_size,
     # Generate ngraph RNN
     rnn_ng = Recurrent(hidden_size, init=W_in, init_inner=W_rec, activation=Tanh(),
                        reset_cells=True, return_sequence=return_sequence,
-                       backward=backward)
+                       backward=backward, unroll=unroll)
 
     # fprop ngraph RNN
     out_ng = rnn_ng(input_placeholder, init_state=init_state)
@@ -254,8 +255,9 @@ def test_rnn_deriv_ref(sequence_length, input_size, hidden_size, batch_size, ret
 @pytest.mark.parametrize("return_sequence", [True, False])
 @pytest.mark.parametrize("backward", [True, False])
 @pytest.mark.parametrize("init_state", [True, False])
+@pytest.mark.parametrize("unroll", [True, pytest.config.cpu_enabled_only(False)])
 def test_rnn_deriv_numerical(sequence_length, input_size, hidden_size, batch_size, return_sequence,
-                             weight_initializer, bias_initializer, backward, init_state):
+                             weight_initializer, bias_initializer, backward, init_state, unroll):
 
     # Get input placeholder and numpy array
     input_placeholder, input_value = make_placeholder(input_size, sequence_length, batch_size)
@@ -269,7 +271,7 @@ def test_rnn_deriv_numerical(sequence_length, input_size, hidden_size, batch_siz
     # Generate ngraph RNN
     rnn_ng = Recurrent(hidden_size, init=W_in, init_inner=W_rec, activation=Tanh(),
                        reset_cells=True, return_sequence=return_sequence,
-                       backward=backward)
+                       backward=backward, unroll=unroll)
 
     # fprop ngraph RNN
     out_ng = rnn_ng(input_placeholder, init_state=init_state)
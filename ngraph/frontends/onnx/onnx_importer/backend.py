@@ -19,9 +19,12 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import hashlib
+
 import ngraph as ng
 import onnx
 
+from cachetools import LRUCache
 from onnx.helper import make_tensor_value_info, make_graph, make_model
 from onnx.backend.base import Backend, BackendRep
 from ngraph.frontends.onnx.onnx_importer.importer import import_onnx_model
@@ -34,15 +37,84 @@ https://github.com/onnx/onnx/blob/master/docs/Implementing%20an%20ONNX%20backend
 """
 
 
+class PreparedModelCache(LRUCache):
+    """
+    LRU cache of compiled NgraphBackendRep objects.
+
+    Handles returned by `prepare` are shared with their callers, who may keep using them after
+    they are evicted, so their transformers are only released with their last reference.
+    Handles which only the cache holds, added with `add_owned`, have their transformer closed
+    when they are removed from the cache, which releases the memory pools and native resources
+    held by the compiled computation.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(PreparedModelCache, self).__init__(*args, **kwargs)
+        self.owned = dict()
+
+    def add_owned(self, key, backend_rep):
+        """Cache a handle which is closed when it is removed from the cache."""
+        self[key] = backend_rep
+        self.owned[key] = backend_rep
+
+    def __delitem__(self, key):
+        super(PreparedModelCache, self).__delitem__(key)
+        self._close_owned(key)
+
+    def popitem(self):
+        # Evictions go through popitem, which does not delete through __delitem__ in every
+        # version of cachetools
+        key, backend_rep = super(PreparedModelCache, self).popitem()
+        self._close_owned(key)
+        return key, backend_rep
+
+    def clear(self):
+        # Newer versions of cachetools empty the cache without deleting each key
+        while self:
+            self.popitem()
+
+    def _close_owned(self, key):
+        backend_rep = self.owned.pop(key, None)
+        if backend_rep is not None:
+            backend_rep.close()
+
+
+def _cache_key(serialized, device, **kwargs):
+    # type: (bytes, str, Dict) -> Tuple
+    """
+    Build a cache key from a serialized protobuf message, a device name and backend options.
+
+    :param serialized: serialized ONNX ModelProto or NodeProto
+    :param device: name of the device the model is prepared for
+    :param kwargs: additional backend options
+    :return: hashable cache key
+    """
+    digest = hashlib.sha1(serialized).hexdigest()
+    return (digest, device) + tuple(sorted((key, repr(value)) for key, value in kwargs.items()))
+
+
 class NgraphBackend(Backend):
     """Takes an ONNX model with inputs, perform a computation, and then return the output."""
 
+    # Process-wide cache of prepared models, keyed by a hash of the serialized model
+    cache = PreparedModelCache(maxsize=64)
+
     @classmethod
     def prepare(cls, onnx_model, device='CPU', **kwargs):
         # type: (onnx.ModelProto, str, Dict) -> NgraphBackendRep
         super(NgraphBackend, cls).prepare(onnx_model, device, **kwargs)
-        ng_model = import_onnx_model(onnx_model)[0]
-        return NgraphBackendRep(ng_model, device)
+        key = _cache_key(onnx_model.SerializeToString(), device, **kwargs)
+        backend_rep = cls.cache.get(key)
+        if backend_rep is None:
+            ng_model = import_onnx_model(onnx_model)[0]
+            backend_rep = NgraphBackendRep(ng_model, device)
+            cls.cache[key] = backend_rep
+        return backend_rep
+
+    @classmethod
+    def clear_cache(cls):  # type: () -> None
+        """Empty the prepared-model cache, closing the transformers only it holds."""
+        cls.cache.clear()
 
     @classmethod
     def supports_device(cls, device):  # type: (str) -> bool
@@ -56,6 +128,13 @@ class NgraphBackend(Backend):
     @classmethod
     def run_node(cls, onnx_node, inputs, device='CPU'):
         # type: (onnx.NodeProto, List[numpy.ndarray], str) -> List[numpy.ndarray]
+        # single-op kernels are reused for repeated node definitions and input shapes
+        input_shapes = tuple(value.shape for value in inputs)
+        key = _cache_key(onnx_node.SerializeToString(), device, input_shapes=input_shapes)
+        backend_rep = cls.cache.get(key)
+        if backend_rep is not None:
+            return backend_rep.run(inputs)
+
         input_tensors = [make_tensor_value_info(name, onnx.TensorProto.FLOAT, value.shape)
                          for name, value in zip(onnx_node.input, inputs)]
         output_tensors = [make_tensor_value_info(name, onnx.TensorProto.FLOAT, value.shape)
@@ -63,7 +142,10 @@ class NgraphBackend(Backend):
 
         graph = make_graph([onnx_node], 'compute_graph', input_tensors, output_tensors)
         model = make_model(graph, producer_name='NgraphBackend')
-        return cls.prepare(model).run(inputs)
+        backend_rep = NgraphBackendRep(import_onnx_model(model)[0], device)
+        # the kernel is never handed out, so the cache closes it on eviction
+        cls.cache.add_owned(key, backend_rep)
+        return backend_rep.run(inputs)
 
 
 class NgraphBackendRep(BackendRep):
@@ -79,3 +161,9 @@ class NgraphBackendRep(BackendRep):
     def run(self, inputs, **kwargs):  # type: (List[numpy.ndarray], Dict) -> List[numpy.ndarray]
         outputs = self.computation(*inputs)
         return [outputs]
+
+    def close(self):  # type: () -> None
+        """Close the transformer owned by this handle."""
+        if self.transformer is not None:
+            self.transformer.close()
+            self.transformer = None
@@ -0,0 +1,103 @@
+# ******************************************************************************
+# Copyright 2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+
+from __future__ import print_function, division
+
+import pytest
+import onnx
+
+import numpy as np
+
+from onnx.helper import make_node, make_graph, make_tensor_value_info, make_model
+from ngraph.frontends.onnx.onnx_importer.backend import NgraphBackend, PreparedModelCache
+
+
+def make_add_model(shape):
+    node = make_node('Add', ['X', 'Y'], ['Z'], name='test_node')
+    graph = make_graph([node], 'test_graph',
+                       [make_tensor_value_info('X', onnx.TensorProto.FLOAT, shape),
+                        make_tensor_value_info('Y', onnx.TensorProto.FLOAT, shape)],
+                       [make_tensor_value_info('Z', onnx.TensorProto.FLOAT, shape)])
+    return make_model(graph, producer_name='ngraph ONNXImporter')
+
+
+@pytest.fixture
+def empty_cache():
+    NgraphBackend.clear_cache()
+    yield NgraphBackend.cache
+    NgraphBackend.clear_cache()
+
+
+def test_prepare_reuses_compiled_model(empty_cache):
+    first = NgraphBackend.prepare(make_add_model([2, 3]))
+    second = NgraphBackend.prepare(make_add_model([2, 3]))
+    assert first is second
+    assert empty_cache.currsize == 1
+
+    third = NgraphBackend.prepare(make_add_model([3, 2]))
+    assert third is not first
+    assert empty_cache.currsize == 2
+
+
+def test_run_node_reuses_kernels_for_repeated_shapes(empty_cache):
+    node = make_node('Add', ['X', 'Y'], ['Z'])
+    a = np.ones([2, 3], dtype=np.float32)
+    b = np.full([2, 3], 2, dtype=np.float32)
+
+    assert np.allclose(NgraphBackend.run_node(node, [a, b])[0], a + b)
+    assert np.allclose(NgraphBackend.run_node(node, [b, b])[0], b + b)
+    assert empty_cache.currsize == 1
+
+    NgraphBackend.run_node(node, [a.reshape(3, 2), b.reshape(3, 2)])
+    assert empty_cache.currsize == 2
+
+
+def test_evicted_owned_models_are_closed():
+    cache = PreparedModelCache(maxsize=2)
+
+    class BackendRepStub(object):
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    first, second, third = BackendRepStub(), BackendRepStub(), BackendRepStub()
+    cache.add_owned('first', first)
+    cache['second'] = second
+    cache.add_owned('third', third)
+    assert first.closed
+    assert not second.closed
+
+    cache.clear()
+    assert not second.closed
+    assert third.closed
+    assert cache.currsize == 0
+    assert not cache.owned
+
+
+def test_prepared_model_outlives_eviction(empty_cache, monkeypatch):
+    monkeypatch.setattr(NgraphBackend, 'cache', PreparedModelCache(maxsize=1))
+    a = np.ones([2, 3], dtype=np.float32)
+
+    first = NgraphBackend.prepare(make_add_model([2, 3]))
+    NgraphBackend.prepare(make_add_model([3, 2]))
+    assert NgraphBackend.cache.currsize == 1
+
+    # the evicted handle is still held here, and still runs
+    assert np.allclose(first.run([a, a])[0], a + a)
+
+    NgraphBackend.clear_cache()
+    assert np.allclose(first.run([a, a])[0], a + a)
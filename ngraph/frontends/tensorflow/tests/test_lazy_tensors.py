@@ -0,0 +1,124 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import numpy as np
+import pytest
+import tensorflow as tf
+
+import ngraph as ng
+from ngraph.frontends.tensorflow.tf_importer.importer import TFImporter
+from ngraph.frontends.tensorflow.tf_importer.lazy_tensors import \
+    checkpoint_tensor_locations, memmap_tensor, read_graph_def
+from ngraph.testing.execution import ExecutorFactory
+
+pytestmark = pytest.mark.transformer_dependent
+
+
+@pytest.fixture(autouse=True)
+def reset_graph():
+    yield
+    tf.reset_default_graph()
+
+
+def write_graph(tmpdir, seed=0):
+    np.random.seed(seed)
+    large = np.random.randn(64, 32).astype(np.float32)
+    small = np.random.randn(32).astype(np.float32)
+    graph = tf.Graph()
+    with graph.as_default():
+        tf.add(tf.constant(large, name='large'), tf.constant(small, name='small'),
+               name='result')
+    pb_file = os.path.join(str(tmpdir), 'graph{}.pb'.format(seed))
+    with open(pb_file, 'wb') as f:
+        f.write(graph.as_graph_def().SerializeToString())
+    return pb_file, large, small
+
+
+def test_read_graph_def(tmpdir):
+    pb_file, large, small = write_graph(tmpdir)
+    graph_def, tensor_locations = read_graph_def(pb_file, threshold=1024)
+
+    # only the large constant is left in the file
+    assert list(tensor_locations.keys()) == ['large']
+    np.testing.assert_array_equal(memmap_tensor(tensor_locations['large']), large)
+    nodes = {node.name: node for node in graph_def.node}
+    assert nodes['large'].attr['value'].tensor.tensor_content == b''
+    assert nodes['small'].attr['value'].tensor.tensor_content == small.tobytes()
+
+    # the rest of the graph is as written
+    with open(pb_file, 'rb') as f:
+        expected = tf.GraphDef.FromString(f.read())
+    nodes['large'].attr['value'].tensor.tensor_content = large.tobytes()
+    assert graph_def == expected
+
+
+@pytest.mark.parametrize("memmap_threshold", [1024, None])
+def test_import_protobuf_memmap(tmpdir, memmap_threshold):
+    pb_file, large, small = write_graph(tmpdir)
+    importer = TFImporter()
+    importer.import_protobuf(pb_file, memmap_threshold=memmap_threshold)
+
+    const = importer.get_op_handle_by_name('large').const
+    assert isinstance(const.base, np.memmap) == (memmap_threshold is not None)
+    with ExecutorFactory() as ex:
+        result = ex.executor(importer.get_op_handle_by_name('result'))()
+    ng.testing.assert_allclose(result, large + small)
+
+
+def test_import_protobuf_again(tmpdir):
+    first_file, _, _ = write_graph(tmpdir, seed=0)
+    second_file, large, small = write_graph(tmpdir, seed=1)
+    importer = TFImporter()
+    importer.import_protobuf(first_file)
+
+    # the same named constant of another file is not mapped from the first one
+    importer.import_protobuf(second_file, memmap_threshold=None)
+    const = importer.get_op_handle_by_name('large').const
+    assert not isinstance(const.base, np.memmap)
+    np.testing.assert_array_equal(const, large)
+
+
+def test_restore_memmap(tmpdir):
+    np.random.seed(0)
+    values = [np.random.randn(8, 4).astype(np.float32), np.random.randn(4).astype(np.float32)]
+    variables = [tf.Variable(value, name=name) for value, name in zip(values, ['w', 'b'])]
+    checkpoint_path = os.path.join(str(tmpdir), 'model.ckpt')
+    with tf.Session() as sess:
+        sess.run(tf.global_variables_initializer())
+        tf.train.Saver().save(sess, checkpoint_path)
+    tf.reset_default_graph()
+
+    # the variables are found in the checkpoint's data shard
+    tensor_locations = checkpoint_tensor_locations(checkpoint_path)
+    for name, value in zip(['w', 'b'], values):
+        np.testing.assert_array_equal(memmap_tensor(tensor_locations[name]), value)
+
+    importer = TFImporter()
+    importer.import_meta_graph(checkpoint_path + '.meta', checkpoint_path=checkpoint_path)
+    restore_op = importer.get_restore_op()
+    ng_variables = importer.get_op_handle(variables)
+    with ExecutorFactory() as ex:
+        restore = ex.executor(restore_op)
+        get_variables = ex.executor(ng_variables)
+        restore()
+        for result, value in zip(get_variables(), values):
+            ng.testing.assert_allclose(result, value)
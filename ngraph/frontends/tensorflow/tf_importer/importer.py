@@ -26,6 +26,8 @@ from google.protobuf import text_format
 
 # importer
 import ngraph as ng
+from ngraph.frontends.tensorflow.tf_importer.lazy_tensors import checkpoint_tensor_locations, \
+    memmap_tensor, read_graph_def
 from ngraph.frontends.tensorflow.tf_importer.ops_bridge import OpsBridge
 from ngraph.frontends.tensorflow.tf_importer.utils import remove_tf_name_prefix
 
@@ -51,24 +53,32 @@ class TFImporter:
         # checkpoint path for weight import
         self._checkpoint_path = None
 
-    def import_protobuf(self, pb_file, verbose=False):
+    def import_protobuf(self, pb_file, verbose=False, memmap_threshold=1024):
         """
         Imports graph_def from protobuf file to ngraph.
 
+        The values of the constants of a binary protobuf file are memory-mapped from the file
+        rather than read, so that they are only read when the transformer initializes them.
+
         Arguments:
             pb_file: Protobuf file path.
             verbose: Prints graph_def at each node if True.
+            memmap_threshold: Size in bytes from which constants are memory-mapped, or None
+                to read every constant.
         """
         # read graph_def
         graph_def = tf.GraphDef()
+        tensor_locations = None
         if mimetypes.guess_type(pb_file)[0] == 'text/plain':
             with open(pb_file, 'r') as f:
                 text_format.Merge(f.read(), graph_def)
+        elif memmap_threshold is not None:
+            graph_def, tensor_locations = read_graph_def(pb_file, memmap_threshold)
         else:
             with open(pb_file, 'rb') as f:
                 graph_def.ParseFromString(f.read())
 
-        self.import_graph_def(graph_def, verbose=verbose)
+        self.import_graph_def(graph_def, verbose=verbose, tensor_locations=tensor_locations)
 
     def import_graph(self, graph, verbose=False):
         """
@@ -82,14 +92,20 @@ class TFImporter:
         self._graph_def = self._graph.as_graph_def()
         self.import_graph_def(self._graph_def, verbose=verbose)
 
-    def import_graph_def(self, graph_def, verbose=False):
+    def import_graph_def(self, graph_def, verbose=False, tensor_locations=None):
         """
         Imports a graph_def to ngraph.
 
         Arguments:
             graph_def: GraphDef object
             verbose: Prints graph_def at each node if True.
+            tensor_locations: Locations of the values of the constants whose contents were
+                left in their file, by node name, as returned by read_graph_def.
         """
+        # constants are only mapped from the file of this graph_def
+        self._ops_bridge.tensor_locations = dict() if tensor_locations is None \
+            else tensor_locations
+
         # process nodes
         for tf_node in graph_def.node:
             # print node
@@ -217,6 +233,10 @@ class TFImporter:
         """
         Get variable restoring ngraph op from TF model checkpoint
 
+        The variables are read one at a time from the checkpoint's data shards. Those which
+        can be are memory-mapped, so they are only read when the restore op's computation is
+        initialized.
+
         Returns:
             A `ng.doall` op that restores the stored weights in TF model
             checkpoint
@@ -230,13 +250,19 @@ class TFImporter:
             tf_variables = tf.global_variables()
             ng_variables = self.get_op_handle(tf_variables)
             ng_restore_ops = []
-            with tf.Session() as sess:
-                checkpoint_path = os.path.join(os.getcwd(),
-                                               self._checkpoint_path)
-                self.saver.restore(sess, checkpoint_path)
-                for tf_variable, ng_variable in zip(tf_variables, ng_variables):
-                    val = sess.run(tf_variable)
-                    ng_restore_ops.append(ng.assign(ng_variable, val))
+            checkpoint_path = os.path.join(os.getcwd(), self._checkpoint_path)
+            tensor_locations = checkpoint_tensor_locations(checkpoint_path)
+            reader = None
+            for tf_variable, ng_variable in zip(tf_variables, ng_variables):
+                name = tf_variable.op.name
+                if name in tensor_locations:
+                    val = memmap_tensor(tensor_locations[name])
+                else:
+                    # strings, partitioned variables and V1 checkpoints
+                    if reader is None:
+                        reader = tf.train.NewCheckpointReader(checkpoint_path)
+                    val = reader.get_tensor(name)
+                ng_restore_ops.append(ng.assign(ng_variable, val))
             return ng.doall(ng_restore_ops)
 
     def _post_process_op(self, op):
@@ -0,0 +1,279 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+"""
+Memory-mapped views of the tensors stored in GraphDef files and checkpoints.
+
+The contents of constants in a binary GraphDef and the variables of a V2 checkpoint are stored
+as raw tensor bytes. Rather than copying them into NumPy arrays, the importer maps them as
+copy-on-write views of their files, so that they are only read when a transformer copies
+them into its persistent tensors.
+"""
+from __future__ import division
+
+import collections
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+import six
+import tensorflow as tf
+from tensorflow.core.protobuf import tensor_bundle_pb2
+
+# Where a tensor's bytes are in a file, and their NumPy dtype and shape.
+TensorLocation = collections.namedtuple('TensorLocation', ['filename', 'offset', 'dtype',
+                                                           'shape'])
+
+# field numbers of GraphDef.node, NodeDef.attr, the map entry's key and value,
+# AttrValue.tensor and TensorProto.tensor_content
+_GRAPH_NODE = 1
+_NODE_ATTR = 5
+_ENTRY_KEY = 1
+_ENTRY_VALUE = 2
+_ATTR_TENSOR = 8
+_TENSOR_CONTENT = 4
+
+# the leveldb table format used by checkpoint indices
+_TABLE_MAGIC = 0xdb4775248b80fb57
+_TABLE_FOOTER_LENGTH = 48
+
+
+def memmap_tensor(location):
+    """
+    Returns a copy-on-write memory map of a stored tensor.
+
+    Arguments:
+        location (TensorLocation): Where the tensor is stored.
+
+    Returns:
+        An np.memmap, whose pages are only read when its values are.
+    """
+    return np.memmap(location.filename, dtype=location.dtype, mode='c',
+                     offset=location.offset, shape=location.shape)
+
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = six.indexbytes(buf, pos)
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf, start, end):
+    """
+    Yields (number, start, end, field_start) for each field of the protobuf message encoded
+    in buf[start:end]. start and end delimit the value, without the length of length-delimited
+    fields, and field_start is where the field's key starts.
+    """
+    pos = start
+    while pos < end:
+        field_start = pos
+        key, pos = _read_varint(buf, pos)
+        wire_type = key & 7
+        if wire_type == 0:
+            _, value_end = _read_varint(buf, pos)
+        elif wire_type == 1:
+            value_end = pos + 8
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            value_end = pos + length
+        elif wire_type == 5:
+            value_end = pos + 4
+        else:
+            raise ValueError("Unsupported protobuf wire type {}".format(wire_type))
+        yield key >> 3, pos, value_end, field_start
+        pos = value_end
+
+
+def _find_field(buf, start, end, number):
+    """
+    Returns the (start, end) of the last field number in the message in buf[start:end], or
+    None if it has none.
+    """
+    found = None
+    for field_number, value_start, value_end, _ in _fields(buf, start, end):
+        if field_number == number:
+            found = value_start, value_end
+    return found
+
+
+def _const_content(buf, start, end):
+    """
+    Returns the (start, end) of the tensor_content of the value of the NodeDef in
+    buf[start:end], or None if it has none.
+    """
+    for number, attr_start, attr_end, _ in _fields(buf, start, end):
+        if number != _NODE_ATTR:
+            continue
+        key = _find_field(buf, attr_start, attr_end, _ENTRY_KEY)
+        if key is None or buf[key[0]:key[1]] != b'value':
+            continue
+        found = _find_field(buf, attr_start, attr_end, _ENTRY_VALUE)
+        for field in (_ATTR_TENSOR, _TENSOR_CONTENT):
+            if found is None:
+                return None
+            found = _find_field(buf, found[0], found[1], field)
+        return found
+    return None
+
+
+def _mappable(dtype, shape, nbytes):
+    """
+    Returns the NumPy dtype of raw tensor bytes, or None if they cannot be memory mapped.
+    """
+    if sys.byteorder != 'little':
+        return None
+    try:
+        dtype = np.dtype(tf.as_dtype(dtype).as_numpy_dtype)
+    except TypeError:
+        return None
+    if dtype.hasobject or nbytes == 0 or dtype.itemsize * int(np.prod(shape)) != nbytes:
+        return None
+    return dtype
+
+
+def read_graph_def(pb_file, threshold=1024):
+    """
+    Reads a binary GraphDef, leaving the contents of its large constants in the file.
+
+    Nodes are parsed one at a time from a memory map of the file, so the whole file is never
+    held in memory. The contents of constants of at least threshold bytes are cleared from
+    the GraphDef and their locations returned instead.
+
+    Arguments:
+        pb_file: Protobuf file path.
+        threshold: Size in bytes from which constant contents are left in the file.
+
+    Returns:
+        The GraphDef, and a dict from the names of the constants left in the file to their
+        TensorLocation.
+    """
+    graph_def = tf.GraphDef()
+    locations = dict()
+    with open(pb_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return graph_def, locations
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        for number, start, end, field_start in _fields(buf, 0, len(buf)):
+            if number != _GRAPH_NODE:
+                graph_def.MergeFromString(buf[field_start:end])
+                continue
+            node = graph_def.node.add()
+            node.ParseFromString(buf[start:end])
+            if node.op != 'Const':
+                continue
+            content = _const_content(buf, start, end)
+            if content is None or content[1] - content[0] < threshold:
+                continue
+            tensor = node.attr['value'].tensor
+            shape = tuple(dim.size for dim in tensor.tensor_shape.dim)
+            dtype = _mappable(tensor.dtype, shape, content[1] - content[0])
+            if dtype is not None:
+                locations[node.name] = TensorLocation(pb_file, content[0], dtype, shape)
+                tensor.ClearField('tensor_content')
+    finally:
+        buf.close()
+    return graph_def, locations
+
+
+def _read_block(buf, handle, pos=0):
+    """
+    Returns the contents of the table block whose handle is at handle[pos:].
+    """
+    offset, pos = _read_varint(handle, pos)
+    size, pos = _read_varint(handle, pos)
+    if six.indexbytes(buf, offset + size) != 0:
+        raise NotImplementedError("Compressed checkpoint index blocks are not supported")
+    return buf[offset:offset + size]
+
+
+def _block_entries(block):
+    """
+    Yields the (key, value) entries of a table block.
+    """
+    num_restarts, = struct.unpack_from('<I', block, len(block) - 4)
+    end = len(block) - 4 * (num_restarts + 1)
+    pos, key = 0, b''
+    while pos < end:
+        shared, pos = _read_varint(block, pos)
+        non_shared, pos = _read_varint(block, pos)
+        value_length, pos = _read_varint(block, pos)
+        key = key[:shared] + block[pos:pos + non_shared]
+        pos += non_shared
+        yield key, block[pos:pos + value_length]
+        pos += value_length
+
+
+def _table_entries(filename):
+    """
+    Yields the (key, value) entries of a leveldb table, in key order.
+    """
+    with open(filename, 'rb') as f:
+        buf = f.read()
+    footer = buf[-_TABLE_FOOTER_LENGTH:]
+    if len(footer) != _TABLE_FOOTER_LENGTH or \
+            struct.unpack('<Q', footer[-8:])[0] != _TABLE_MAGIC:
+        raise ValueError("{} is not a checkpoint index".format(filename))
+    # skip the metaindex handle
+    _, pos = _read_varint(footer, 0)
+    _, pos = _read_varint(footer, pos)
+    for _, handle in _block_entries(_read_block(buf, footer, pos)):
+        for entry in _block_entries(_read_block(buf, handle)):
+            yield entry
+
+
+def checkpoint_tensor_locations(checkpoint_path):
+    """
+    Finds the tensors of a V2 checkpoint in its data shards.
+
+    Tensors which cannot be mapped, such as strings, slices of partitioned variables or
+    tensors of another byte order, and all the tensors of V1 checkpoints, are left out and
+    need to be read with a checkpoint reader.
+
+    Arguments:
+        checkpoint_path: Checkpoint prefix, as given to the saver.
+
+    Returns:
+        A dict from tensor names to their TensorLocation.
+    """
+    locations = dict()
+    index_file = checkpoint_path + '.index'
+    if not os.path.exists(index_file):
+        return locations
+    header = tensor_bundle_pb2.BundleHeaderProto()
+    for key, value in _table_entries(index_file):
+        if key == b'':
+            header.ParseFromString(value)
+            if header.endianness != tensor_bundle_pb2.BundleHeaderProto.LITTLE:
+                return locations
+            continue
+        entry = tensor_bundle_pb2.BundleEntryProto.FromString(value)
+        if entry.slices:
+            continue
+        shape = tuple(dim.size for dim in entry.shape.dim)
+        dtype = _mappable(entry.dtype, shape, entry.size)
+        if dtype is not None:
+            filename = '{}.data-{:05d}-of-{:05d}'.format(checkpoint_path, entry.shard_id,
+                                                         header.num_shards)
+            locations[key.decode('utf-8')] = TensorLocation(filename, entry.offset, dtype,
+                                                            shape)
+    return locations
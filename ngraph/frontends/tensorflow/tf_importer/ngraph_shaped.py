@@ -183,8 +183,8 @@ def constant(value, dtype=None, shape=None, name='Const', verify_shape=False):
     """
     TODO: handle auto dtype from value
     """
-    # Convert to numpy
-    np_value = np.array(value)
+    # Convert to numpy, without copying arrays such as memory-mapped constants
+    np_value = np.asarray(value)
 
     # Check shape if needed
     if shape is not None and shape != np_value.shape:
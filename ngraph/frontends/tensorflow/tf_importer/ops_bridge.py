@@ -24,6 +24,7 @@ import ngraph.frontends.tensorflow.tf_importer.ngraph_shaped as ns
 
 from ngraph.frontends.common.utils import common_conv2d_pool_padding, \
     common_conv2d_pool_output_shape
+from ngraph.frontends.tensorflow.tf_importer.lazy_tensors import memmap_tensor
 from ngraph.frontends.tensorflow.tf_importer.utils import tf_obj_shape
 from ngraph.frontends.tensorflow.tf_importer.utils_pos_axes import make_pos_axes
 from tensorflow.python.framework import tensor_util
@@ -43,8 +44,15 @@ def _get_reduction_indices(reduction_indices):
 class OpsBridge(object):
     """
     Bridging op between TensorFlow / ngraph.
+
+    Arguments:
+        tensor_locations (dict): Locations of the values of constants whose contents were left
+            in their file, by node name. Those constants are memory-mapped.
     """
 
+    def __init__(self, tensor_locations=None):
+        self.tensor_locations = dict() if tensor_locations is None else tensor_locations
+
     def __call__(self, tf_node, input_ops):
         """
         Call Op based on `tf_node.name`. Mix-in functions must have same name
@@ -99,8 +107,12 @@ class OpsBridge(object):
         return ns.maximum(inputs[0], inputs[1], name=tf_node.name)
 
     def Const(self, tf_node, inputs):
-        # convert to numpy value
-        np_val = tensor_util.MakeNdarray(tf_node.attr['value'].tensor)
+        # convert to numpy value, mapping the values left in their file
+        location = self.tensor_locations.get(tf_node.name)
+        if location is not None:
+            np_val = memmap_tensor(location)
+        else:
+            np_val = tensor_util.MakeNdarray(tf_node.attr['value'].tensor)
         if np_val.dtype == np.dtype('O'):
             return None
         else:
@@ -157,6 +157,7 @@ class RecvOp(CommunicationOp):
         to_node: The destination node.
         send_node: The send node associated with this recv node.
     """
+    _op_references = ('_send_node',)
 
     def __init__(self, to_node, send_node, parallel_axis=None, num_devices=None):
         super(RecvOp, self).__init__(
@@ -464,6 +465,8 @@ class CPUMlslAllReduceStartOp(MutateInsteadOfCopyWithNewArgsMixin, AllReduceOp):
                                                       func=func)
         self._req = [None]  # use mutable field to share it between start and wait ops
         self.metadata['priority'] = 'high'
+        # AllReduceBucket shared with other allreduce ops, set by AllReduceBucketing
+        self.bucket = None
 
     @property
     def req(self):
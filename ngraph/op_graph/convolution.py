@@ -181,6 +181,7 @@ class ConvDerivOp(TensorOp):
     Arguments:
         fprop: The original convolution.
     """
+    _op_references = ('fprop',)
 
     def __init__(self, fprop, **kwargs):
         super(ConvDerivOp, self).__init__(**kwargs)
@@ -128,6 +128,8 @@ class LutDerivOp(TensorOp):
     Arguments:
         fprop: The original op.
     """
+    _op_references = ('fprop',)
+
     def __init__(self, fprop, **kwargs):
         super(LutDerivOp, self).__init__(**kwargs)
         self.fprop = fprop
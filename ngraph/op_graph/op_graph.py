@@ -24,7 +24,7 @@ import cachetools
 import numpy as np
 from builtins import object
 from functools import wraps
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import abc
 from future.utils import with_metaclass
 
@@ -142,10 +142,65 @@ class DebugInfo(object):
             filename=self.filename, lineno=self.lineno)
 
 
+# For each class of op, the attributes declared in _op_references by it and its bases
+_declared_op_references = dict()
+
+
+def declared_op_references(op_type):
+    """
+    Returns:
+        The names of the attributes declared in the _op_references of op_type and its bases
+        as a tuple, in method resolution order, and as a set, or None if any of them sets
+        _op_references to None.
+    """
+    try:
+        return _declared_op_references[op_type]
+    except KeyError:
+        pass
+    names = []
+    for cls in reversed(op_type.__mro__):
+        cls_names = cls.__dict__.get('_op_references', ())
+        if cls_names is None:
+            names = None
+            break
+        names.extend(name for name in cls_names if name not in names)
+    declared = None if names is None else (tuple(names), frozenset(names))
+    _declared_op_references[op_type] = declared
+    return declared
+
+
+def is_op_reference(value):
+    """
+    Returns:
+        True if value is an op, or a list, tuple, set or dict holding an op.
+    """
+    if isinstance(value, Op):
+        return True
+    if isinstance(value, dict):
+        value = value.values()
+    # OrderedSet is an abstract base class, which makes isinstance checks for it slow
+    elif not (isinstance(value, (list, tuple, set)) or type(value) is OrderedSet):
+        return False
+    return any(isinstance(item, Op) for item in value)
+
+
 class Op(ScopedNameableValue):
     """
     Any operation that can be in an AST.
 
+    Graph traversals that follow every reference between ops, such as all_op_references and
+    serialization, only look at the attributes named in op_reference_keys. Each class lists
+    the attributes it adds that may hold ops, or lists, tuples, sets or dicts of ops, in
+    _op_references. An op or container of ops assigned to any other attribute is registered
+    with the op when it is assigned; a container that only gets its ops later must be
+    declared. Setting _op_references to None in a class falls back to scanning all of the
+    attributes of its ops.
+
+    Op.graph_version counts changes to the graph through graph_changed, which is called for
+    assignments to the attributes that refer to ops, including those made by new ops, and by
+    replace_self and invalidate_property_cache. ordered_ops reuses the orderings it computed
+    since the last change.
+
     Arguments:
         args: Values used by this node.
         const: The value of a constant Op, or None,
@@ -164,6 +219,13 @@ class Op(ScopedNameableValue):
             arbitrary metadata to nodes.
         trainable: The value is trainable.
     """
+    _op_references = ('_args', '_control_deps', '_forward', '_deriv_handler', 'metadata')
+
+    # Incremented by graph_changed
+    graph_version = 0
+    # Orderings computed by ordered_ops at graph_version, by roots, oldest first
+    _ordered_ops_cache = OrderedDict()
+    _ordered_ops_cache_size = 16
 
     # Default is to not collect Ops as they are created
     @staticmethod
@@ -211,10 +273,9 @@ class Op(ScopedNameableValue):
     @staticmethod
     def all_op_references(ops):
         """
-        Currently ops can have references to other ops anywhere in their __dict__, (not just args,
-        but the other typical places handled in serialization's `add_edges`). This function
-        iterates through an ops __dict__ attributes and tests if any of them are subclasses of
-        `Op`.
+        Ops can have references to other ops in attributes other than args, such as those
+        handled in serialization's `add_edges`. This function follows every reference in the
+        attributes named by each op's `op_reference_keys`, so it visits each edge once.
 
         This is 'greedier' than the `ordered_ops` method which only traverses the graph using the
         `args` and `control_deps` keys of an ops `__dict__`. In addition, the order of ops
@@ -227,20 +288,70 @@ class Op(ScopedNameableValue):
             op = frontier.pop()
             op_set.add(op)
 
-            for key in op.__dict__:
-                val = getattr(op, key)
-                if isinstance(val, Op) and val not in op_set:
-                    frontier.add(val)
-                elif isinstance(val, dict):
-                    for subkey in val:
-                        if isinstance(val[subkey], Op) and val[subkey] not in op_set:
-                            frontier.add(val[subkey])
-                elif isinstance(val, (list, tuple, set, OrderedSet)):
-                    for item in val:
-                        if isinstance(item, Op) and item not in op_set:
-                            frontier.add(item)
+            for referenced_op in op.referenced_ops():
+                if referenced_op not in op_set:
+                    frontier.add(referenced_op)
         return op_set
 
+    def __setattr__(self, name, value):
+        super(Op, self).__setattr__(name, value)
+        declared = declared_op_references(type(self))
+        if declared is None or name in declared[1]:
+            Op.graph_changed()
+            return
+        registered = self.__dict__.get('_registered_op_references', ())
+        if name in registered:
+            Op.graph_changed()
+        elif name in self.__dict__ and is_op_reference(value):
+            self.__dict__['_registered_op_references'] = registered + (name,)
+            Op.graph_changed()
+
+    @staticmethod
+    def graph_changed():
+        """
+        Records a change to the graph, which discards the orderings cached by ordered_ops.
+
+        Changes made through op methods and attribute assignments are recorded; code that
+        changes the contents of an op's containers in place, such as its _control_deps, must
+        call this.
+        """
+        Op.graph_version += 1
+        if Op._ordered_ops_cache:
+            Op._ordered_ops_cache.clear()
+
+    def op_reference_keys(self):
+        """
+        Returns:
+            The names of the attributes of this op that may refer to other ops: those
+            declared in the _op_references of its class and bases, then those that an op or a
+            container of ops was assigned to. If its class does not declare references, the
+            names of all of its attributes.
+        """
+        declared = declared_op_references(type(self))
+        if declared is None:
+            return tuple(self.__dict__)
+        return declared[0] + self.__dict__.get('_registered_op_references', ())
+
+    def referenced_ops(self):
+        """
+        Yields:
+            The ops held by the attributes named in op_reference_keys, directly or in a list,
+            tuple, set or dict.
+        """
+        attributes = self.__dict__
+        for key in self.op_reference_keys():
+            val = attributes.get(key)
+            if isinstance(val, Op):
+                yield val
+            elif isinstance(val, dict):
+                for item in val.values():
+                    if isinstance(item, Op):
+                        yield item
+            elif isinstance(val, (list, tuple, set, OrderedSet)):
+                for item in val:
+                    if isinstance(item, Op):
+                        yield item
+
     @staticmethod
     def ordered_ops(roots):
         """
@@ -248,12 +359,28 @@ class Op(ScopedNameableValue):
         using depenency edges rather than dataflow edges, for example,
         `top_sort(a -> b -> c) => [c, b, a]`.
 
+        Until the graph changes, sorting the same roots returns the same tuple.
+
         Args:
             roots: List of ops.
 
         Returns:
-            A list of sorted ops.
+            A tuple of sorted ops.
         """
+        roots = tuple(roots)
+        cache = Op._ordered_ops_cache
+        try:
+            return cache[roots]
+        except KeyError:
+            pass
+        ordered_ops = tuple(Op._sort_ops(roots))
+        if len(cache) >= Op._ordered_ops_cache_size:
+            cache.popitem(last=False)
+        cache[roots] = ordered_ops
+        return ordered_ops
+
+    @staticmethod
+    def _sort_ops(roots):
         ordered_ops = []
         available = OrderedSet()
         counts = dict()
@@ -583,6 +710,7 @@ class Op(ScopedNameableValue):
         """
         if property_name in self.__dict__:
             del self.__dict__[property_name]
+        Op.graph_changed()
 
     @property
     def args(self):
@@ -655,6 +783,7 @@ class Op(ScopedNameableValue):
 
     def replace_self(self, rep):
         self.forward = as_op(rep)
+        Op.graph_changed()
 
     @property
     def deriv_handler(self):
@@ -970,6 +1099,7 @@ class ComputationOp(ParallelOp):
         returns: Ops returned.
         parameters: Parameter ops.
     """
+    _op_references = ('values', 'returns', 'parameters')
 
     def __init__(self, returns, *args, **kwargs):
         if isinstance(returns, collections.Container):
@@ -1393,6 +1523,7 @@ class ValueOp(TensorOp, ControlBlockOp):
     Arguments:
         tensor: The tensor supplying the value for this op.
     """
+    _op_references = ('_tensor',)
 
     def __init__(self, tensor=None, **kwargs):
         super(ValueOp, self).__init__(args=(), is_value_op=True, **kwargs)
@@ -1509,6 +1640,7 @@ class SequentialOp(ValueOp):
     Attributes:
         ops: The list of ops to be computed. The last op is the returned value.
     """
+    _op_references = ('_ops',)
 
     def __init__(self, ops=None, **kwargs):
         super(SequentialOp, self).__init__(**kwargs)
@@ -2580,6 +2712,7 @@ class StackOp(SequentialOp):
     Parameters:
         pos: The position of the join axis.
     """
+    _op_references = ('x_list', 'storage')
 
     def __init__(self, x_list, axis, pos=0, **kwargs):
         super(StackOp, self).__init__(**kwargs)
@@ -2645,6 +2778,7 @@ class ConcatOp(SequentialOp):
         axis_list (list of Axis): A list of Axis objects that will be concatenated along, one for
                                   each tensor in x_list.
     """
+    _op_references = ('x_list', 'storage')
 
     def __init__(self, x_list, axis_list, **kwargs):
         super(ConcatOp, self).__init__(**kwargs)
@@ -2737,6 +2871,7 @@ def concat_along_axis(x_list, axis):
 
 
 class UnsliceOp(SequentialOp):
+    _op_references = ('x',)
 
     def __init__(self, x, slices, axes, **kwargs):
         super(UnsliceOp, self).__init__(**kwargs)
@@ -3817,6 +3952,7 @@ class DotLowDimension(TensorOp):
 
 
 class SoftmaxOp(ValueOp):
+    _op_references = ('x', 'exps', 'Z')
 
     def __init__(self, x, normalization_axes=None, **kwargs):
         super(SoftmaxOp, self).__init__(**kwargs)
@@ -4191,6 +4327,7 @@ class SigmoidOp(ValueOp):
     Parameters:
         x: The tensor argument.
     """
+    _op_references = ('x',)
 
     def __init__(self, x, **kwargs):
         super(SigmoidOp, self).__init__(**kwargs)
@@ -4267,6 +4404,7 @@ def mean(x, reduction_axes=None, out_axes=None):
 
 
 class DerivOp(ValueOp):
+    _op_references = ('dependent', 'independent', 'error')
 
     def __init__(self, dependent, independent, error):
         super(DerivOp, self).__init__()
@@ -4333,6 +4471,7 @@ class CrossEntropyMultiOp(ValueOp):
     Raises:
         UnmatchedAxesError: If y and t do not have matching axes
     """
+    _op_references = ('x', 'y', 's')
 
     def __init__(self, y, t, usebits=False, out_axes=None,
                  enable_softmax_opt=True,
@@ -4405,6 +4544,7 @@ class CrossEntropyBinaryInnerOp(ValueOp):
     Raises:
         UnmatchedAxesError: If y and t do not have matching axes
     """
+    _op_references = ('x', 'y', 't')
 
     def __init__(self, y, t, enable_sig_opt=True, enable_diff_opt=True, **kwargs):
         if (not y.axes.is_sub_set(t.axes)) and (not y.axes.is_super_set(t.axes)):
@@ -74,6 +74,8 @@ class BpropPoolOp(TensorOp):
     Arguments:
         fprop: The original PoolingOp.
     """
+    _op_references = ('fprop', 'inputs')
+
     def __init__(self, delta, inputs, fprop, **kwargs):
         super(BpropPoolOp, self).__init__(args=(delta,), axes=inputs.axes, **kwargs)
         self.fprop = fprop
@@ -0,0 +1,306 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+
+from __future__ import division
+from orderedset import OrderedSet
+
+from ngraph.op_graph.axes import make_axis, make_axes
+from ngraph.op_graph.op_graph import Op, TensorOp, as_op, axes_with_order, computation, \
+    deriv, persistent_tensor, placeholder, sequential, slice_along_axis, sum
+
+
+def scan(step, sequences, initial_states, recurrent_axis=None, backward=False, pos=0):
+    """
+    Applies step along the recurrent axis of sequences, threading state from step to step.
+
+    Unlike unrolling in Python, the ops created by step appear in the graph once, no matter
+    how long the recurrent axis is. Transformers execute the body in a loop over the steps.
+
+    Args:
+        step (callable): Called as step(step_inputs, states) with one placeholder per sequence
+            (the sequence without its recurrent axis) and one placeholder per state. Must
+            return a list of new states, one for each initial state.
+        sequences (list of TensorOp): Tensors which are sliced along recurrent_axis.
+        initial_states (list of TensorOp): Initial values of the states. All states must have
+            the same axes.
+        recurrent_axis (Axis, optional): The axis to iterate over. Defaults to the recurrent
+            axis of the first sequence.
+        backward (bool, optional): Iterate from the last step to the first.
+        pos (int, optional): Position of recurrent_axis in the axes of each output sequence.
+
+    Returns:
+        list of TensorOp: For each state, the sequence of states computed at each step, with
+            recurrent_axis inserted at pos. Results are indexed by time, not by processing order.
+    """
+    sequences = [as_op(seq) for seq in sequences]
+    initial_states = [as_op(state) for state in initial_states]
+    if len(sequences) == 0:
+        raise ValueError("scan requires at least one sequence")
+    if len(initial_states) == 0:
+        raise ValueError("scan requires at least one state")
+    if recurrent_axis is None:
+        recurrent_axis = sequences[0].axes.recurrent_axis()
+    for seq in sequences:
+        if recurrent_axis not in seq.axes:
+            raise ValueError("Sequence {} does not have axis {}".format(seq, recurrent_axis))
+    state_axes = initial_states[0].axes
+    for state in initial_states:
+        if state.axes != state_axes:
+            raise ValueError("All scan states must have axes {}, found {}"
+                             .format(state_axes, state.axes))
+
+    step_inputs = [placeholder(axes=seq.axes - recurrent_axis, dtype=seq.dtype)
+                   .named('scan_input') for seq in sequences]
+    states = [placeholder(axes=state_axes, dtype=state.dtype).named('scan_state')
+              for state in initial_states]
+
+    outputs = step(list(step_inputs), list(states))
+    if len(outputs) != len(states):
+        raise ValueError("step returned {} states, expected {}"
+                         .format(len(outputs), len(states)))
+    body_outputs = []
+    for output in outputs:
+        output = as_op(output)
+        if not output.axes.is_equal_set(state_axes):
+            raise ValueError("step returned a state with axes {}, expected {}"
+                             .format(output.axes, state_axes))
+        body_outputs.append(axes_with_order(output, state_axes))
+
+    captures, capture_inputs, shared = _capture_externals(body_outputs, step_inputs + states)
+    scan_op = ScanOp(sequences, initial_states, captures, shared,
+                     step_inputs=step_inputs,
+                     states=states,
+                     capture_inputs=capture_inputs,
+                     body_outputs=body_outputs,
+                     recurrent_axis=recurrent_axis,
+                     backward=backward,
+                     pos=pos)
+    return [slice_along_axis(scan_op, scan_op.state_axis, i) for i in range(len(states))]
+
+
+def _capture_externals(body_outputs, body_inputs):
+    """
+    Finds the values that the body of a scan uses but does not compute from its inputs.
+
+    Persistent, non-input tensors (variables and constants) are shared with the body as is.
+    Any other external value is replaced in the body by a placeholder, which is filled once
+    each time the scan executes.
+
+    Args:
+        body_outputs: The outputs of the body.
+        body_inputs: The placeholders for step inputs and states.
+
+    Returns:
+        The captured external ops, the placeholders that replace them in the body, and the
+        shared persistent tensors.
+    """
+    body_inputs = set(body_inputs)
+    internal = set()
+    body_ops = Op.ordered_ops(body_outputs)
+    for op in body_ops:
+        if op.tensor in body_inputs or any(dep in internal for dep in op.all_deps):
+            internal.add(op)
+
+    captures = OrderedSet()
+    shared = OrderedSet()
+    for op in body_ops:
+        if op not in internal:
+            continue
+        for arg in op.args:
+            if arg in internal:
+                continue
+            tensor = arg.tensor
+            if tensor.is_persistent and not tensor.is_input:
+                shared.add(tensor)
+            else:
+                captures.add(arg)
+    for output in body_outputs:
+        if output not in internal:
+            captures.add(output)
+
+    capture_inputs = [placeholder(axes=capture.axes, dtype=capture.dtype).named('scan_capture')
+                      for capture in captures]
+    replacements = dict(zip(captures, capture_inputs))
+    for op in body_ops:
+        if op in internal and any(arg in replacements for arg in op.args):
+            op._set_args(as_op(replacements.get(arg, arg)) for arg in op.args)
+    for i, output in enumerate(body_outputs):
+        if output in replacements:
+            body_outputs[i] = as_op(replacements[output])
+    return list(captures), capture_inputs, list(shared)
+
+
+class ScanOp(TensorOp):
+    """
+    Loops a body computation over the recurrent axis of a list of sequences.
+
+    The result stacks the state sequences along a leading state axis; use scan to get one
+    tensor per state.
+
+    Arguments:
+        sequences (list of TensorOp): Sequences to iterate over.
+        initial_states (list of TensorOp): Initial states.
+        captures (list of TensorOp): Non-persistent values used by the body.
+        shared (list of TensorOp): Persistent tensors used directly by the body.
+        step_inputs (list of AssignableTensorOp): Body placeholders for sequence slices.
+        states (list of AssignableTensorOp): Body placeholders for the states.
+        capture_inputs (list of AssignableTensorOp): Body placeholders for the captures.
+        body_outputs (list of TensorOp): New states computed by the body.
+        recurrent_axis (Axis): The axis iterated over.
+        backward (bool): Iterate from the last step to the first.
+        pos (int): Position of the recurrent axis in the axes of each state sequence.
+        body (ComputationOp, optional): The body computation, when copying an existing scan.
+
+    Attributes:
+        body: ComputationOp for one step.
+        state_axis: Leading axis of the result, one entry per state.
+    """
+    _op_references = ('step_inputs', 'states', 'capture_inputs', 'body_outputs', 'body')
+
+    def __init__(self, sequences, initial_states, captures, shared,
+                 step_inputs, states, capture_inputs, body_outputs,
+                 recurrent_axis, backward=False, pos=0, body=None, **kwargs):
+        self.n_sequences = len(sequences)
+        self.n_states = len(initial_states)
+        self.n_captures = len(captures)
+        self.step_inputs = list(step_inputs)
+        self.states = list(states)
+        self.capture_inputs = list(capture_inputs)
+        self.body_outputs = list(body_outputs)
+        self.recurrent_axis = recurrent_axis
+        self.backward = backward
+        self.pos = pos
+
+        state_axes = initial_states[0].axes
+        self.state_axis = make_axis(length=self.n_states, name='scan_states')
+        sequence_axes = state_axes[:pos] + recurrent_axis + state_axes[pos:]
+        super(ScanOp, self).__init__(
+            args=tuple(sequences) + tuple(initial_states) + tuple(captures) + tuple(shared),
+            axes=make_axes((self.state_axis,)) + sequence_axes,
+            dtype=initial_states[0].dtype,
+            **kwargs)
+
+        if body is None:
+            body = computation(self.body_outputs,
+                               *(self.step_inputs + self.states + self.capture_inputs))
+        self.body = body
+
+    def copy_with_new_args(self, args):
+        n_seq = self.n_sequences
+        n_init = n_seq + self.n_states
+        n_capt = n_init + self.n_captures
+        return type(self)(args[:n_seq], args[n_seq:n_init], args[n_init:n_capt], args[n_capt:],
+                          step_inputs=self.step_inputs,
+                          states=self.states,
+                          capture_inputs=self.capture_inputs,
+                          body_outputs=self.body_outputs,
+                          recurrent_axis=self.recurrent_axis,
+                          backward=self.backward,
+                          pos=self.pos,
+                          body=self.body)
+
+    @property
+    def sequences(self):
+        return self.args[:self.n_sequences]
+
+    @property
+    def initial_states(self):
+        return self.args[self.n_sequences:self.n_sequences + self.n_states]
+
+    @property
+    def captures(self):
+        start = self.n_sequences + self.n_states
+        return self.args[start:start + self.n_captures]
+
+    @property
+    def shared(self):
+        return self.args[self.n_sequences + self.n_states + self.n_captures:]
+
+    def generate_adjoints(self, adjoints, delta, *args):
+        # All of the arguments share one backward loop
+        grad = ScanGradOp(self, delta)
+        for arg, grad_buffer in zip(args, grad.grad_buffers):
+            if grad_buffer is not None:
+                arg.generate_add_delta(adjoints, sequential([grad, grad_buffer]))
+
+
+class ScanGradOp(Op):
+    """
+    Backpropagates through a ScanOp.
+
+    The body of the loop recomputes one forward step from the saved states and applies the
+    derivative of the step function to the incoming error. Gradients are written to
+    persistent buffers, one per differentiable argument of the ScanOp.
+
+    Arguments:
+        scan_op (ScanOp): The forward scan.
+        delta (TensorOp): The error for the output of scan_op.
+
+    Attributes:
+        body: ComputationOp for the derivative of one step.
+        errors (list of AssignableTensorOp): Body placeholders for the error of each state.
+        grad_buffers (list): For each argument of scan_op, a persistent tensor that receives
+            its gradient, or None if the argument is not differentiable.
+        body_grads (list of TensorOp): Derivatives computed by the body, in the order
+            step inputs, states, captures and trainable shared tensors.
+    """
+    _op_references = ('scan_op', 'errors', 'body_grads', 'grad_buffers', 'body')
+
+    def __init__(self, scan_op, delta, **kwargs):
+        self.scan_op = scan_op
+        delta = axes_with_order(delta, scan_op.axes)
+
+        self.errors = [placeholder(axes=state.axes, dtype=state.dtype).named('scan_error')
+                       for state in scan_op.states]
+        loss = None
+        for output, error in zip(scan_op.body_outputs, self.errors):
+            term = sum(output * error, out_axes=())
+            loss = term if loss is None else loss + term
+
+        shared = [arg.tensor for arg in scan_op.shared]
+        independents = scan_op.step_inputs + scan_op.states + scan_op.capture_inputs + \
+            [tensor for tensor in shared if tensor.is_trainable]
+        self.body_grads = [deriv(loss, independent) for independent in independents]
+
+        self.grad_buffers = [persistent_tensor(axes=arg.axes, dtype=arg.dtype)
+                             .named('scan_grad')
+                             for arg in scan_op.args[:len(scan_op.args) - len(shared)]]
+        self.grad_buffers += [persistent_tensor(axes=tensor.axes, dtype=tensor.dtype)
+                              .named('scan_grad') if tensor.is_trainable else None
+                              for tensor in shared]
+
+        super(ScanGradOp, self).__init__(
+            args=(scan_op, delta) + tuple(scan_op.args) +
+            tuple(buf for buf in self.grad_buffers if buf is not None),
+            **kwargs)
+
+        self.body = computation(self.body_grads,
+                                *(scan_op.step_inputs + scan_op.states +
+                                  scan_op.capture_inputs + self.errors))
+
+    def copy_with_new_args(self, args):
+        raise ValueError("ScanGradOp can not be copied")
+
+    @property
+    def states_written(self):
+        written = OrderedSet()
+        for arg in self.args[2 + len(self.scan_op.args):]:
+            written.update(arg.states_read)
+        return written
+
+    @property
+    def has_side_effects(self):
+        return True
@@ -20,7 +20,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='ngraph/op_graph/serde/ops.proto',
   package='',
   syntax='proto3',
-  serialized_pb=_b('\n\x1fngraph/op_graph/serde/ops.proto\"\x14\n\x04UUID\x12\x0c\n\x04uuid\x18\x01 \x01(\x0c\"2\n\x08GraphDef\x12\x14\n\x05\x65\x64ges\x18\x01 \x03(\x0b\x32\x05.Edge\x12\x10\n\x03ops\x18\x02 \x03(\x0b\x32\x03.Op\"\xa5\x01\n\x02Op\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07op_type\x18\x04 \x01(\t\x12\x15\n\x05\x64type\x18\x05 \x01(\x0e\x32\x06.DTYPE\x12\x1d\n\x05\x61ttrs\x18\x06 \x03(\x0b\x32\x0e.Op.AttrsEntry\x1a\x35\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.OpAttr:\x02\x38\x01\"\xd6\x01\n\x06OpAttr\x12\x19\n\x06scalar\x18\x03 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x04 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x12$\n\x0b\x63onv_params\x18\x05 \x01(\x0b\x32\r.FilterParamsH\x00\x12$\n\x0bpool_params\x18\x06 \x01(\x0b\x32\r.FilterParamsH\x00\x12\x15\n\x04\x61xes\x18\x07 \x01(\x0b\x32\x05.AxesH\x00\x12\x19\n\x06tensor\x18\x08 \x01(\x0b\x32\x07.TensorH\x00\x42\x07\n\x05value\"?\n\x0c\x46ilterParams\x12\x0e\n\x06\x66shape\x18\x01 \x03(\r\x12\x0e\n\x06stride\x18\x02 \x03(\r\x12\x0f\n\x07padding\x18\x03 \x03(\r\"\xb8\x02\n\x06Scalar\x12\x12\n\x08\x62ool_val\x18\x01 \x01(\x08H\x00\x12\x14\n\nstring_val\x18\x02 \x01(\tH\x00\x12\x14\n\ndouble_val\x18\x03 \x01(\x01H\x00\x12\x11\n\x07int_val\x18\x04 \x01(\x03H\x00\x12\x12\n\x08\x62yte_val\x18\x05 \x01(\x0cH\x00\x12\x19\n\x08uuid_val\x18\x06 \x01(\x0b\x32\x05.UUIDH\x00\x12 \n\x07map_val\x18\x07 \x01(\x0b\x32\r.AttributeMapH\x00\x12\x12\n\x08null_val\x18\x08 \x01(\x08H\x00\x12\x1b\n\tslice_val\x18\t \x01(\x0b\x32\x06.SliceH\x00\x12\x1b\n\tdtype_val\x18\n \x01(\x0e\x32\x06.DTYPEH\x00\x12\x15\n\x04\x61xis\x18\x0b \x01(\x0b\x32\x05.AxisH\x00\x12\x1c\n\x08\x61xes_map\x18\x0c \x01(\x0b\x32\x08.AxesMapH\x00\x42\x07\n\x05value\"h\n\x0c\x41ttributeMap\x12#\n\x03map\x18\x01 \x03(\x0b\x32\x16.AttributeMap.MapEntry\x1a\x33\n\x08MapEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.Scalar:\x02\x38\x01\"&\n\x0eRepeatedScalar\x12\x14\n\x03val\x18\x01 \x03(\x0b\x32\x07.Scalar\"\x87\x02\n\x04\x45\x64ge\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x18\n\tfrom_uuid\x18\x02 \x01(\x0b\x32\x05.UUID\x12\x16\n\x07to_uuid\x18\x03 \x01(\x0b\x32\x05.UUID\x12\x1f\n\x05\x61ttrs\x18\x04 \x03(\x0b\x32\x10.Edge.AttrsEntry\x12!\n\tedge_type\x18\x05 \x01(\x0e\x32\x0e.Edge.EdgeType\x1a\x37\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x18\n\x05value\x18\x02 \x01(\x0b\x32\t.EdgeAttr:\x02\x38\x01\";\n\x08\x45\x64geType\x12\x08\n\x04\x44\x41TA\x10\x00\x12\x0b\n\x07\x43ONTROL\x10\x01\x12\r\n\tCONTAINER\x10\x02\x12\t\n\x05OTHER\x10\x03\"Z\n\x08\x45\x64geAttr\x12\x19\n\x06scalar\x18\x01 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x02 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x42\x07\n\x05value\"2\n\nTensorInfo\x12\x15\n\x05\x64type\x18\x02 \x01(\x0e\x32\x06.DTYPE\x12\r\n\x05shape\x18\x03 \x03(\r\"1\n\x06Tensor\x12\x19\n\x04info\x18\x01 \x01(\x0b\x32\x0b.TensorInfo\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\"4\n\x0eTensorManifest\x12\"\n\x05pairs\x18\x01 \x03(\x0b\x32\x13.TensorInfoUUIDPair\"D\n\x12TensorInfoUUIDPair\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x19\n\x04info\x18\x02 \x01(\x0b\x32\x0b.TensorInfo\">\n\x04\x41xes\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x04\x61xes\x18\x03 \x03(\x0b\x32\x05.Axis\"\xa6\x01\n\x04\x41xis\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0e\n\x06length\x18\x03 \x01(\x05\x12\x11\n\trecurrent\x18\x04 \x01(\x08\x12\r\n\x05\x62\x61tch\x18\x05 \x01(\x08\x12\x17\n\x0fmatch_on_length\x18\x06 \x01(\x08\x12\x11\n\tdocstring\x18\x08 \x01(\t\x12\x1d\n\x0e\x66lattened_axes\x18\t \x01(\x0b\x32\x05.Axes\"#\n\x07\x41xesMap\x12\x18\n\x07mapping\x18\x01 \x01(\x0b\x32\x07.Scalar\"\x1b\n\nInt64Value\x12\r\n\x05value\x18\x01 \x01(\x03\"Y\n\x05Slice\x12\x1a\n\x05start\x18\x01 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04step\x18\x02 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04stop\x18\x03 \x01(\x0b\x32\x0b.Int64Value*\x88\x01\n\x05\x44TYPE\x12\x0b\n\x07\x46LOAT32\x10\x00\x12\x0b\n\x07\x46LOAT16\x10\x01\x12\x0b\n\x07\x46LOAT64\x10\x02\x12\t\n\x05UINT8\x10\x03\x12\n\n\x06UINT16\x10\x04\x12\n\n\x06UINT32\x10\x05\x12\x08\n\x04INT8\x10\x06\x12\t\n\x05INT16\x10\x07\x12\t\n\x05INT32\x10\x08\x12\t\n\x05INT64\x10\t\x12\n\n\x06\x46LEX16\x10\nb\x06proto3')
+  serialized_pb=_b('\n\x1fngraph/op_graph/serde/ops.proto\"\x14\n\x04UUID\x12\x0c\n\x04uuid\x18\x01 \x01(\x0c\"2\n\x08GraphDef\x12\x14\n\x05\x65\x64ges\x18\x01 \x03(\x0b\x32\x05.Edge\x12\x10\n\x03ops\x18\x02 \x03(\x0b\x32\x03.Op\"\xa5\x01\n\x02Op\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07op_type\x18\x04 \x01(\t\x12\x15\n\x05\x64type\x18\x05 \x01(\x0e\x32\x06.DTYPE\x12\x1d\n\x05\x61ttrs\x18\x06 \x03(\x0b\x32\x0e.Op.AttrsEntry\x1a\x35\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.OpAttr:\x02\x38\x01\"\xd6\x01\n\x06OpAttr\x12\x19\n\x06scalar\x18\x03 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x04 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x12$\n\x0b\x63onv_params\x18\x05 \x01(\x0b\x32\r.FilterParamsH\x00\x12$\n\x0bpool_params\x18\x06 \x01(\x0b\x32\r.FilterParamsH\x00\x12\x15\n\x04\x61xes\x18\x07 \x01(\x0b\x32\x05.AxesH\x00\x12\x19\n\x06tensor\x18\x08 \x01(\x0b\x32\x07.TensorH\x00\x42\x07\n\x05value\"?\n\x0c\x46ilterParams\x12\x0e\n\x06\x66shape\x18\x01 \x03(\r\x12\x0e\n\x06stride\x18\x02 \x03(\r\x12\x0f\n\x07padding\x18\x03 \x03(\r\"\xb8\x02\n\x06Scalar\x12\x12\n\x08\x62ool_val\x18\x01 \x01(\x08H\x00\x12\x14\n\nstring_val\x18\x02 \x01(\tH\x00\x12\x14\n\ndouble_val\x18\x03 \x01(\x01H\x00\x12\x11\n\x07int_val\x18\x04 \x01(\x03H\x00\x12\x12\n\x08\x62yte_val\x18\x05 \x01(\x0cH\x00\x12\x19\n\x08uuid_val\x18\x06 \x01(\x0b\x32\x05.UUIDH\x00\x12 \n\x07map_val\x18\x07 \x01(\x0b\x32\r.AttributeMapH\x00\x12\x12\n\x08null_val\x18\x08 \x01(\x08H\x00\x12\x1b\n\tslice_val\x18\t \x01(\x0b\x32\x06.SliceH\x00\x12\x1b\n\tdtype_val\x18\n \x01(\x0e\x32\x06.DTYPEH\x00\x12\x15\n\x04\x61xis\x18\x0b \x01(\x0b\x32\x05.AxisH\x00\x12\x1c\n\x08\x61xes_map\x18\x0c \x01(\x0b\x32\x08.AxesMapH\x00\x42\x07\n\x05value\"h\n\x0c\x41ttributeMap\x12#\n\x03map\x18\x01 \x03(\x0b\x32\x16.AttributeMap.MapEntry\x1a\x33\n\x08MapEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.Scalar:\x02\x38\x01\"&\n\x0eRepeatedScalar\x12\x14\n\x03val\x18\x01 \x03(\x0b\x32\x07.Scalar\"\x87\x02\n\x04\x45\x64ge\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x18\n\tfrom_uuid\x18\x02 \x01(\x0b\x32\x05.UUID\x12\x16\n\x07to_uuid\x18\x03 \x01(\x0b\x32\x05.UUID\x12\x1f\n\x05\x61ttrs\x18\x04 \x03(\x0b\x32\x10.Edge.AttrsEntry\x12!\n\tedge_type\x18\x05 \x01(\x0e\x32\x0e.Edge.EdgeType\x1a\x37\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x18\n\x05value\x18\x02 \x01(\x0b\x32\t.EdgeAttr:\x02\x38\x01\";\n\x08\x45\x64geType\x12\x08\n\x04\x44\x41TA\x10\x00\x12\x0b\n\x07\x43ONTROL\x10\x01\x12\r\n\tCONTAINER\x10\x02\x12\t\n\x05OTHER\x10\x03\"Z\n\x08\x45\x64geAttr\x12\x19\n\x06scalar\x18\x01 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x02 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x42\x07\n\x05value\"2\n\nTensorInfo\x12\x15\n\x05\x64type\x18\x02 \x01(\x0e\x32\x06.DTYPE\x12\r\n\x05shape\x18\x03 \x03(\r\"?\n\x06Tensor\x12\x19\n\x04info\x18\x01 \x01(\x0b\x32\x0b.TensorInfo\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x0c\n\x04\x62lob\x18\x03 \x01(\t\"4\n\x0eTensorManifest\x12\"\n\x05pairs\x18\x01 \x03(\x0b\x32\x13.TensorInfoUUIDPair\"D\n\x12TensorInfoUUIDPair\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x19\n\x04info\x18\x02 \x01(\x0b\x32\x0b.TensorInfo\">\n\x04\x41xes\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x04\x61xes\x18\x03 \x03(\x0b\x32\x05.Axis\"\xa6\x01\n\x04\x41xis\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0e\n\x06length\x18\x03 \x01(\x05\x12\x11\n\trecurrent\x18\x04 \x01(\x08\x12\r\n\x05\x62\x61tch\x18\x05 \x01(\x08\x12\x17\n\x0fmatch_on_length\x18\x06 \x01(\x08\x12\x11\n\tdocstring\x18\x08 \x01(\t\x12\x1d\n\x0e\x66lattened_axes\x18\t \x01(\x0b\x32\x05.Axes\"#\n\x07\x41xesMap\x12\x18\n\x07mapping\x18\x01 \x01(\x0b\x32\x07.Scalar\"\x1b\n\nInt64Value\x12\r\n\x05value\x18\x01 \x01(\x03\"Y\n\x05Slice\x12\x1a\n\x05start\x18\x01 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04step\x18\x02 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04stop\x18\x03 \x01(\x0b\x32\x0b.Int64Value*\x88\x01\n\x05\x44TYPE\x12\x0b\n\x07\x46LOAT32\x10\x00\x12\x0b\n\x07\x46LOAT16\x10\x01\x12\x0b\n\x07\x46LOAT64\x10\x02\x12\t\n\x05UINT8\x10\x03\x12\n\n\x06UINT16\x10\x04\x12\n\n\x06UINT32\x10\x05\x12\x08\n\x04INT8\x10\x06\x12\t\n\x05INT16\x10\x07\x12\t\n\x05INT32\x10\x08\x12\t\n\x05INT64\x10\t\x12\n\n\x06\x46LEX16\x10\nb\x06proto3')
 )
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -77,8 +77,8 @@ _DTYPE = _descriptor.EnumDescriptor(
   ],
   containing_type=None,
   options=None,
-  serialized_start=1996,
-  serialized_end=2132,
+  serialized_start=2010,
+  serialized_end=2146,
 )
 _sym_db.RegisterEnumDescriptor(_DTYPE)
 
@@ -813,6 +813,13 @@ _TENSOR = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
+    _descriptor.FieldDescriptor(
+      name='blob', full_name='Tensor.blob', index=2,
+      number=3, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -826,7 +833,7 @@ _TENSOR = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=1430,
-  serialized_end=1479,
+  serialized_end=1493,
 )
 
 
@@ -856,8 +863,8 @@ _TENSORMANIFEST = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1481,
-  serialized_end=1533,
+  serialized_start=1495,
+  serialized_end=1547,
 )
 
 
@@ -894,8 +901,8 @@ _TENSORINFOUUIDPAIR = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1535,
-  serialized_end=1603,
+  serialized_start=1549,
+  serialized_end=1617,
 )
 
 
@@ -939,8 +946,8 @@ _AXES = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1605,
-  serialized_end=1667,
+  serialized_start=1619,
+  serialized_end=1681,
 )
 
 
@@ -1019,8 +1026,8 @@ _AXIS = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1670,
-  serialized_end=1836,
+  serialized_start=1684,
+  serialized_end=1850,
 )
 
 
@@ -1050,8 +1057,8 @@ _AXESMAP = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1838,
-  serialized_end=1873,
+  serialized_start=1852,
+  serialized_end=1887,
 )
 
 
@@ -1081,8 +1088,8 @@ _INT64VALUE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1875,
-  serialized_end=1902,
+  serialized_start=1889,
+  serialized_end=1916,
 )
 
 
@@ -1126,8 +1133,8 @@ _SLICE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1904,
-  serialized_end=1993,
+  serialized_start=1918,
+  serialized_end=2007,
 )
 
 _GRAPHDEF.fields_by_name['edges'].message_type = _EDGE
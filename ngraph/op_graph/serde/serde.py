@@ -16,8 +16,8 @@
 """
 This module handles ngraph IR topology serialization. The general approach for serialization is to
 
-1. Take in a list of ngraph Ops, and use the new Op.all_op_references method to grab (recursively)
-all references in the Ops attributes (__dict__ keys), for ops.
+1. Take in a list of ngraph Ops, and use the Op.all_op_references method to grab (recursively)
+all references in the Ops attributes (those named by Op.op_reference_keys), for ops.
 2. For each op in this list, convert each to a protobuf object by again iterating through
 attributes and converting each to a protobuf object and adding it to the OpAttr protobuf map. We
 ignore any attributes of an op that reference another Op or Ops (these are handled later by the
@@ -28,12 +28,21 @@ Depending on the attribute name, encode the edge with a special type, or edge at
 where it should be deserialized into.
 4. Return the list of ops and edges in a GraphDef protobuf serialized string.
 
+Messages are filled in place in the GraphDef as they are made, rather than made separately and
+copied in. Edges get compact ids from their position in the graph, so serializing the same graph
+twice gives the same edges. When a `BlobStore` is given, tensors of at least its `threshold` bytes
+are stored in it out of line under a digest of their data, and the tensor message only holds the
+key; equal payloads, such as tied or repeated constants, are stored once. A `DirectoryBlobStore`
+keeps blobs in files that are memory-mapped on deserialization.
+
 Deserialization happens in roughly the same order: first create Python ops, then hook up references
 between them.
 
 Currently only python public (aka non underscore prefixed) attributes are referenced with the
 exception of those in EXCEPTION_ATTRIBUTES and starting with `_is_`.
 """
+import hashlib
+import os
 import uuid
 import weakref
 import pkgutil
@@ -74,12 +83,97 @@ def dtype_to_protobuf(numpy_dtype):
     return getattr(ops_pb, dtype_name)
 
 
-def axis_to_protobuf(axis):
-    pb_axis = ops_pb.Axis()
+class BlobStore(object):
+    """
+    Holds the data of tensors serialized out of line, keyed by the MD5 of the data so that
+    equal tensors are stored once. The digest only identifies content, it is not a security
+    measure.
+
+    Arguments:
+        threshold: Tensors with at least this many bytes are stored out of line.
+    """
+    def __init__(self, threshold=1024):
+        self.threshold = threshold
+        self.blobs = dict()
+        # id of each tensor put in the store to the tensor and its key, so an array referenced
+        # by several attributes, such as the _const and initial_value of a constant, is only
+        # hashed once
+        self.tensor_keys = dict()
+
+    def __contains__(self, key):
+        return key in self.blobs
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def put(self, tensor):
+        """
+        Stores the data of tensor unless an equal blob is already stored.
+
+        Returns:
+            The key of the blob.
+        """
+        if id(tensor) in self.tensor_keys:
+            return self.tensor_keys[id(tensor)][1]
+        data = np.ascontiguousarray(tensor)
+        key = hashlib.md5(data.view(np.uint8).reshape(-1)).hexdigest()
+        if key not in self:
+            self.write(key, data)
+        self.tensor_keys[id(tensor)] = (tensor, key)
+        return key
+
+    def write(self, key, data):
+        self.blobs[key] = data.tobytes()
+
+    def read(self, key):
+        """
+        Returns:
+            The data stored under key, as an object supporting the buffer protocol.
+        """
+        return self.blobs[key]
+
+
+class DirectoryBlobStore(BlobStore):
+    """
+    A BlobStore with a file per blob in a directory. Blobs are read back as read-only memory
+    maps, so tensors are only paged in when they are used, and blobs already in the directory
+    are not written again.
+
+    Arguments:
+        path: The directory of the blob files, which is made if it does not exist.
+        threshold: Tensors with at least this many bytes are stored out of line.
+    """
+    def __init__(self, path, threshold=1024):
+        super(DirectoryBlobStore, self).__init__(threshold)
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def filename(self, key):
+        return os.path.join(self.path, key + '.bin')
+
+    def __contains__(self, key):
+        return os.path.exists(self.filename(key))
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.path) if name.endswith('.bin'))
+
+    def write(self, key, data):
+        data.tofile(self.filename(key))
+
+    def read(self, key):
+        if os.path.getsize(self.filename(key)) == 0:
+            return b''
+        return np.memmap(self.filename(key), dtype=np.uint8, mode='r')
+
+
+def axis_to_protobuf(axis, pb_axis=None):
+    if pb_axis is None:
+        pb_axis = ops_pb.Axis()
     pb_axis.name = axis.name
 
     if isinstance(axis, FlattenedAxis):
-        pb_axis.flattened_axes.CopyFrom(axes_to_protobuf(axis._axes))
+        axes_to_protobuf(axis._axes, pb_axis.flattened_axes)
         pb_axis.length = axis.length
         pb_axis.uuid.uuid = axis.uuid.bytes
         return pb_axis
@@ -92,29 +186,38 @@ def axis_to_protobuf(axis):
     return pb_axis
 
 
-def axes_map_to_protobuf(axes_map):
-    pb_axes_map = ops_pb.AxesMap()
+def axes_map_to_protobuf(axes_map, pb_axes_map=None):
+    if pb_axes_map is None:
+        pb_axes_map = ops_pb.AxesMap()
     assign_scalar(pb_axes_map.mapping, dict(axes_map))
     return pb_axes_map
 
 
-def axes_to_protobuf(axes):
-    pb_axes = ops_pb.Axes()
+def axes_to_protobuf(axes, pb_axes=None):
+    if pb_axes is None:
+        pb_axes = ops_pb.Axes()
     for axis in axes:
-        pb_axis = pb_axes.axes.add()
-        pb_axis.CopyFrom(axis_to_protobuf(axis))
+        axis_to_protobuf(axis, pb_axes.axes.add())
     pb_axes.uuid.uuid = axes.uuid.bytes
     return pb_axes
 
 
-def tensor_to_protobuf(tensor):
-    pb_tensor = ops_pb.Tensor()
+def tensor_to_protobuf(tensor, pb_tensor=None, blob_store=None):
+    """
+    Converts a numpy tensor to a protobuf Tensor, filling in pb_tensor if given. If blob_store
+    is given and the tensor has at least blob_store.threshold bytes, the data is put in
+    blob_store and the message holds its key.
+    """
+    if not isinstance(tensor, (np.ndarray, np.generic)):
+        raise ValueError("Unknown tensor value of {}".format(tensor))
+    if pb_tensor is None:
+        pb_tensor = ops_pb.Tensor()
     pb_tensor.info.dtype = dtype_to_protobuf(tensor.dtype)
     pb_tensor.info.shape.extend(tensor.shape)
-    if isinstance(tensor, (np.ndarray, np.generic)):
-        pb_tensor.data = tensor.tobytes()
+    if blob_store is not None and tensor.nbytes >= blob_store.threshold:
+        pb_tensor.blob = blob_store.put(tensor)
     else:
-        raise ValueError("Unknown tensor value of {}".format(tensor))
+        pb_tensor.data = tensor.tobytes()
     return pb_tensor
 
 
@@ -163,14 +266,14 @@ def assign_scalar(message, value):
         # This encodes an empty dict for deserialization
         assign_scalar(message.map_val.map['_ngraph_map_sentinel_'], '')
     elif isinstance(value, Axis):
-        message.axis.CopyFrom(axis_to_protobuf(value))
+        axis_to_protobuf(value, message.axis)
     elif isinstance(value, AxesMap):
-        message.axes_map.CopyFrom(axes_map_to_protobuf(value))
+        axes_map_to_protobuf(value, message.axes_map)
     else:
         raise unhandled_scalar_value(value)
 
 
-def assign_op_attr(message, value):
+def assign_op_attr(message, value, blob_store=None):
     """
     Assigns a python object in value to the protobuf object `message` after conversion to
     the equivalent protobuf object.
@@ -179,13 +282,14 @@ def assign_op_attr(message, value):
         message <protobuf OpAttr>: protobuf object to have value assigned to after conversion
             to protobuf.
         value <python object>: The python object to be converted and assigned.
+        blob_store <BlobStore>: Where to store large tensors out of line, if given.
     """
     if is_scalar_type(value):
         assign_scalar(message.scalar, value)
     elif isinstance(value, Axes):
-        message.axes.CopyFrom(axes_to_protobuf(value))
+        axes_to_protobuf(value, message.axes)
     elif isinstance(value, np.ndarray):
-        message.tensor.CopyFrom(tensor_to_protobuf(value))
+        tensor_to_protobuf(value, message.tensor, blob_store)
     elif isinstance(value, Iterable):
         if len(value) > 0:
             for item in value:
@@ -201,13 +305,19 @@ def assign_op_attr(message, value):
         raise unhandled_scalar_value(value)
 
 
-def op_to_protobuf(op):
+def op_to_protobuf(op, pb_op=None, blob_store=None):
     """
     Converts all attributes of an op into protobuf values and returns it. Skips over the
     properties of `args`, `ops`, `control_deps`, and `forward` since those are added as
     edges separately.
+
+    If pb_op is given, it is filled in rather than a new message. Tensors of at least
+    blob_store.threshold bytes are stored in blob_store, if given.
     """
-    pb_op = ops_pb.Op(name=op.name, op_type=op.__class__.__name__)
+    if pb_op is None:
+        pb_op = ops_pb.Op()
+    pb_op.name = op.name
+    pb_op.op_type = op.__class__.__name__
     if hasattr(op, 'dtype'):
         pb_op.dtype = dtype_to_protobuf(op.dtype)
     pb_op.uuid.uuid = op.uuid.bytes
@@ -217,7 +327,7 @@ def op_to_protobuf(op):
         # hetr only
         if key in ('hetr_replaced_by', 'replaces_op', 'layout', 'clones'):
             continue
-        assign_op_attr(pb_op.attrs['_ngraph_metadata_' + key], op.metadata[key])
+        assign_op_attr(pb_op.attrs['_ngraph_metadata_' + key], op.metadata[key], blob_store)
 
     if hasattr(op, '_ngraph_ser_handle'):
         pb_op.attrs['_ngraph_ser_handle'].scalar.bool_val = True
@@ -228,38 +338,59 @@ def op_to_protobuf(op):
     # We could instead serialize the closure, but this has its own issues (see Keras utils and
     # issus tracker for gory details)
     if hasattr(op, 'valfun'):
-        pb_op.attrs['valfun_value'].tensor.CopyFrom(
-            tensor_to_protobuf(op.valfun(op.tensor_description())))
+        tensor_to_protobuf(op.valfun(op.tensor_description()), pb_op.attrs['valfun_value'].tensor,
+                           blob_store)
 
     # These are handled above
     ignored_keys = {'valfun', 'uuid', 'dtype', 'metadata', 'layout_view', 'in_view', 'out_view',
                     'all_deps'}
     remaining_keys = set(op.__dict__.keys()).difference(ignored_keys)
+    reference_keys = set(op.op_reference_keys())
 
     for key in remaining_keys:
         if not key.startswith('_is_') and key not in EXCEPTION_ATTRIBUTES and key.startswith('_'):
             continue
         val = getattr(op, key)
-        if isinstance(val, Op) or \
-            (isinstance(val, (list, set, tuple, OrderedSet)) and
-             len(val) > 0 and
-             all(map(lambda x: isinstance(x, Op), val))):
+        if key in reference_keys and \
+            (isinstance(val, Op) or
+             (isinstance(val, (list, set, tuple, OrderedSet)) and
+              len(val) > 0 and
+              all(map(lambda x: isinstance(x, Op), val)))):
             # These will be handled in `add_edges`
             continue
-        assign_op_attr(pb_op.attrs[key], getattr(op, key))
+        assign_op_attr(pb_op.attrs[key], val, blob_store)
     return pb_op
 
 
+def edge_id(index):
+    """
+    Returns:
+        The id of the edge at index in a list of edges, as the fewest little-endian bytes
+        holding index.
+    """
+    id_bytes = bytearray()
+    while index > 0:
+        id_bytes.append(index & 0xff)
+        index >>= 8
+    return bytes(id_bytes)
+
+
 def add_edges(pb_edges, pb_ops, op):
-    """ Adds the edges present in `op` to `pb_edges` and `pb_ops` lists. """
+    """
+    Adds the edges present in `op` to `pb_edges`, which is either a list or the repeated edges
+    field of a GraphDef. Each edge is identified by its index in `pb_edges`.
+    """
 
     def add_edge(from_op, to_op, edge_type):
-        edge = ops_pb.Edge()
-        edge.uuid.uuid = uuid.uuid4().bytes
+        if hasattr(pb_edges, 'add'):
+            edge = pb_edges.add()
+        else:
+            edge = ops_pb.Edge()
+            pb_edges.append(edge)
+        edge.uuid.uuid = edge_id(len(pb_edges) - 1)
         edge.from_uuid.uuid = from_op.uuid.bytes
         edge.to_uuid.uuid = to_op.uuid.bytes
         edge.edge_type = edge_type
-        pb_edges.append(edge)
         return edge
 
     if op._forward is not None:
@@ -275,10 +406,11 @@ def add_edges(pb_edges, pb_ops, op):
         for arg in op._control_deps:
             add_edge(op, arg, ops_pb.Edge.CONTROL)
 
-    # Now iterate through remaining keys of this op's __dict__ and any that reference
-    # other Ops we make edges that we can deserialize as Op attributes later
-    remaining_keys = set(op.__dict__.keys()).difference({'all_deps'})
-    for key in remaining_keys:
+    # Now iterate through the remaining attributes of this op that may reference other Ops
+    # and make edges that we can deserialize as Op attributes later
+    for key in op.op_reference_keys():
+        if key == 'all_deps' or key not in op.__dict__:
+            continue
         if not key.startswith('_is_') and key not in EXCEPTION_ATTRIBUTES and key.startswith('_'):
             continue
         val = getattr(op, key)
@@ -293,7 +425,7 @@ def add_edges(pb_edges, pb_ops, op):
             # TODO(jknight): assert that ALL values of this list are op references
 
 
-def _serialize_graph(ops):
+def _serialize_graph(ops, blob_store=None):
     """
     Serializes a graph and returns the actual protobuf python object (rather than serialized
     byte string as done by `serialize_graph`).
@@ -301,23 +433,14 @@ def _serialize_graph(ops):
     assert isinstance(ops, Iterable), "Ops passed into `serialize_graph` must be an iterable"
     ops = Op.all_op_references(ops)
 
-    pb_ops = []
-    pb_edges = []
-    for op in ops:
-        pb_ops.append(op_to_protobuf(op))
-        add_edges(pb_edges, pb_ops, op)
-
     graph_def = ops_pb.GraphDef()
-    for edge in pb_edges:
-        temp = graph_def.edges.add()
-        temp.CopyFrom(edge)
-    for op in pb_ops:
-        temp = graph_def.ops.add()
-        temp.CopyFrom(op)
+    for op in ops:
+        op_to_protobuf(op, graph_def.ops.add(), blob_store)
+        add_edges(graph_def.edges, graph_def.ops, op)
     return graph_def
 
 
-def serialize_graph(ops, only_return_handle_ops=False):
+def serialize_graph(ops, only_return_handle_ops=False, blob_store=None):
     """
     Dumps ngraph graph to serialized protobuf byte string
 
@@ -325,11 +448,14 @@ def serialize_graph(ops, only_return_handle_ops=False):
       only_return_handle_ops <bool>: If false, this will return ALL ops upon deserialization. If
           true, then only the ops passed in to be serialized will be returned upon deserialization
           (with links to upstream ops intact).
+      blob_store <BlobStore>: If given, tensors of at least blob_store.threshold bytes are stored
+          in it rather than in the byte string, and the same store must be passed to
+          `deserialize_graph`.
     """
     if only_return_handle_ops:
         for op in ops:
             op._ngraph_ser_handle = True
-    return _serialize_graph(ops).SerializeToString()
+    return _serialize_graph(ops, blob_store).SerializeToString()
 
 
 ##################
@@ -347,16 +473,23 @@ def pb_to_dict(map_val):
 
 
 def data_to_tensor(data, info):
+    """
+    Returns a tensor viewing the bytes of data, which is read-only if data is.
+    """
     np_dtype = pb_to_dtype(info.dtype)
-    data_array = np.fromstring(data, dtype=np_dtype)
-    # data_array = np.fromstring(''.join(data[:]), dtype=np_dtype)
+    data_array = np.frombuffer(data, dtype=np_dtype)
     if len(info.shape) == 0:
         return data_array[0]
     else:
         return data_array.reshape(info.shape)
 
 
-def pb_to_tensor(pb_tensor):
+def pb_to_tensor(pb_tensor, blob_store=None):
+    if pb_tensor.blob:
+        if blob_store is None:
+            raise ValueError("Tensor data is in blob {}, but no blob store was given"
+                             .format(pb_tensor.blob))
+        return data_to_tensor(blob_store.read(pb_tensor.blob), pb_tensor.info)
     return data_to_tensor(pb_tensor.data, pb_tensor.info)
 
 
@@ -394,12 +527,12 @@ def protobuf_to_axes(msg):
     return axes
 
 
-def protobuf_attr_to_python(val):
+def protobuf_attr_to_python(val, blob_store=None):
     if val.HasField('scalar'):
         return protobuf_scalar_to_python(val.scalar)
 
     if val.HasField('tensor'):
-        return pb_to_tensor(val.tensor)
+        return pb_to_tensor(val.tensor, blob_store)
     elif val.HasField('repeated_scalar'):
         if len(val.repeated_scalar.val) == 1 and \
                 val.repeated_scalar.val[0].string_val == '_ngraph_iter_sentinel_':
@@ -442,13 +575,14 @@ def get_ngraph_op_cls(op_type):
     raise ValueError("Cannot find op_type of {} in any ngraph.op_graph modules.".format(op_type))
 
 
-def protobuf_to_op(pb_op):
+def protobuf_to_op(pb_op, blob_store=None):
     """
     This will convert a protobuf Op object into its corresponding Python object. But this cannot
     setup links to other ops (such as args, control_deps) since those ops may not
     exist yet.
     We have to wait until all ops are created before connecting them back up together in a second
     pass, so args, etc will be uninitialized.
+    Tensors stored out of line are read from blob_store.
     """
     cls = get_ngraph_op_cls(pb_op.op_type)
 
@@ -459,7 +593,7 @@ def protobuf_to_op(pb_op):
     py_op.name = str(pb_op.name)
 
     if 'valfun_value' in pb_op.attrs:
-        valfun_value = pb_to_tensor(pb_op.attrs['valfun_value'].tensor)
+        valfun_value = pb_to_tensor(pb_op.attrs['valfun_value'].tensor, blob_store)
         py_op.valfun = lambda x: valfun_value
 
     # op.uuid
@@ -473,44 +607,27 @@ def protobuf_to_op(pb_op):
             py_op._ngraph_ser_handle = True
         if key.startswith('_ngraph_metadata_'):
             value = pb_op.attrs[key]
-            py_op.metadata[key[17:]] = protobuf_attr_to_python(value)
+            py_op.metadata[key[17:]] = protobuf_attr_to_python(value, blob_store)
         elif not key.startswith('_is_') and key not in EXCEPTION_ATTRIBUTES and \
                 key.startswith('_'):
             continue
         else:
             value = pb_op.attrs[key]
-            setattr(py_op, key, protobuf_attr_to_python(value))
+            setattr(py_op, key, protobuf_attr_to_python(value, blob_store))
     return py_op
 
 
-def _deserialize_graph_ops_edges(pb_ops, pb_edges):
+def _deserialize_graph_ops_edges(pb_ops, pb_edges, blob_store=None):
     """
     Given a set of serialized ops and edges, this will deserialize them and return the
     list of all ops in that graph.
     """
-    graph_def = ops_pb.GraphDef()
-    for edge in pb_edges:
-        temp = graph_def.edges.add()
-        temp.CopyFrom(edge)
-    for op in pb_ops:
-        temp = graph_def.ops.add()
-        temp.CopyFrom(op)
-    return _deserialize_graph(graph_def)
-
-
-def _deserialize_graph(graph_pb):
-    """
-    Will deserialize a graph and return the list of all ops in that graph. Does not bother
-    filtering down to only the original set of ops the user passed in for serialization
-    (if that's what the user desired upon serializing with the serialization
-    only_return_handle_ops parameter).
-    """
     # For safety we clear this registry
     GLOBAL_AXIS_REGISTRY.clear()
 
-    ops = list(map(protobuf_to_op, graph_pb.ops))
+    ops = [protobuf_to_op(pb_op, blob_store) for pb_op in pb_ops]
     uuid_lookup = {op.uuid.bytes: op for op in ops}
-    for edge in graph_pb.edges:
+    for edge in pb_edges:
         head_op = uuid_lookup[edge.from_uuid.uuid]
         tail_op = uuid_lookup[edge.to_uuid.uuid]
         if edge.edge_type == ops_pb.Edge.DATA:  # args
@@ -535,10 +652,12 @@ def _deserialize_graph(graph_pb):
                     setattr(head_op, key, OrderedSet([tail_op]))
         else:
             raise ValueError("Edge not mapped to op: {}".format(edge))
+    # control_deps and ops were added to in place
+    Op.graph_changed()
 
     # This must come after tensor has been set which occurs after edges
     # op.dtype
-    for py_op, pb_op in zip(ops, graph_pb.ops):
+    for py_op, pb_op in zip(ops, pb_ops):
         py_op.dtype = pb_to_dtype(pb_op.dtype)
 
     # Done with this and don't want it to bleed to subsequent serializations
@@ -558,9 +677,19 @@ def _deserialize_graph(graph_pb):
         return ops
 
 
-def deserialize_graph(graph_msg):
+def _deserialize_graph(graph_pb, blob_store=None):
+    """
+    Will deserialize a graph and return the list of all ops in that graph. Does not bother
+    filtering down to only the original set of ops the user passed in for serialization
+    (if that's what the user desired upon serializing with the serialization
+    only_return_handle_ops parameter).
+    """
+    return _deserialize_graph_ops_edges(graph_pb.ops, graph_pb.edges, blob_store)
+
+
+def deserialize_graph(graph_msg, blob_store=None):
     """
     Given a serialized protobuf `GraphDef` bytestring, this will deserialize it and return
-    the Ops of the graph.
+    the Ops of the graph. Tensors serialized out of line are read from blob_store.
     """
-    return _deserialize_graph(ops_pb.GraphDef.FromString(graph_msg))
+    return _deserialize_graph(ops_pb.GraphDef.FromString(graph_msg), blob_store)
@@ -17,8 +17,7 @@ from __future__ import print_function
 
 from ngraph.transformers.base import make_transformer, set_transformer_factory, \
     transformer_choices,  \
-    allocate_transformer, make_transformer_factory, Transformer, \
-    UnsupportedTransformerException
+    allocate_transformer, make_transformer_factory, Transformer
 
 __all__ = [
     'allocate_transformer',
@@ -31,20 +30,11 @@ __all__ = [
 
 PYCUDA_LOGIC_ERROR_CODE = 4
 
-try:
-    import ngraph.transformers.cputransform  # noqa
-except UnsupportedTransformerException:
-    pass
-
-try:
-    import ngraph.transformers.gputransform  # noqa
-except UnsupportedTransformerException:
-    pass
-
-try:
-    import ngraph.transformers.hetrtransform  # noqa
-except UnsupportedTransformerException as e:
-    pass
+# Backends are imported when a transformer is first requested
+Transformer.transformers.register_module('cpu', 'ngraph.transformers.cputransform')
+Transformer.transformers.register_module('gpu', 'ngraph.transformers.gputransform')
+Transformer.transformers.register_module('hetr', 'ngraph.transformers.hetrtransform')
+Transformer.transformers.register_module('flexgpu', 'ngraph.transformers.flexgputransform')
 
 try:
     import artransformer.artransformer  # noqa
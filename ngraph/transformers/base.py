@@ -16,6 +16,7 @@
 from __future__ import division
 
 import collections
+import importlib
 import weakref
 import logging
 
@@ -262,6 +263,49 @@ class DeviceTensor(with_metaclass(abc.ABCMeta, NameableValue)):
         """
 
 
+class TransformerRegistry(dict):
+    """
+    Transformer classes by name.
+
+    A transformer module that is registered with register_module is only imported when one
+    of its transformers is first looked up, so importing ngraph does not pay for backends
+    that are never used.
+    """
+
+    def __init__(self):
+        super(TransformerRegistry, self).__init__()
+        self.modules = collections.OrderedDict()
+
+    def register_module(self, name, module_name):
+        """
+        Registers the module that defines the transformer name.
+
+        Arguments:
+            name (str): The transformer_name of the transformer.
+            module_name (str): The module to import on first use.
+        """
+        if name not in self:
+            self.modules[name] = module_name
+
+    def load(self, name):
+        module_name = self.modules.pop(name, None)
+        if module_name is not None:
+            try:
+                importlib.import_module(module_name)
+            except UnsupportedTransformerException:
+                pass
+
+    def load_all(self):
+        for name in list(self.modules):
+            self.load(name)
+
+    def __missing__(self, name):
+        if name not in self.modules:
+            raise KeyError(name)
+        self.load(name)
+        return self[name]
+
+
 class Transformer_ABC_Meta(abc.ABCMeta):
     """
     metaclass for the backend objects
@@ -270,7 +314,7 @@ class Transformer_ABC_Meta(abc.ABCMeta):
     def __init__(cls, name, bases, dict_):
         if not hasattr(cls, 'transformers'):
             # First possible transformer class sets things up
-            cls.transformers = {}
+            cls.transformers = TransformerRegistry()
 
         # If this transformer has a transformer_name, register it
         transformer_name = getattr(cls, 'transformer_name', None)
@@ -827,6 +871,7 @@ def set_transformer_factory(factory):
 
 def transformer_choices():
     """Return the list of available transformers."""
+    Transformer.transformers.load_all()
     names = sorted(Transformer.transformers.keys())
     return names
 
@@ -845,3 +890,6 @@ def make_transformer_factory(name, **kargs):
         return allocate_transformer(name, **kargs)
     factory.name = name  # added for pytest
     return factory
+
+
+set_transformer_factory(make_transformer_factory('cpu'))
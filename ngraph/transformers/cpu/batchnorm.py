@@ -50,6 +50,7 @@ class BpropBatchnormOp(TensorOp):
     delta: global gradients from the previous layer
     inputs: fprop src input to the batchnormOp
     """
+    _op_references = ('fprop',)
 
     def __init__(self, delta, inputs, dgamma, dbeta, fprop, **kwargs):
         gamma = fprop.args[1]
@@ -23,6 +23,30 @@ import itertools as itt
 import numpy as np
 
 
+# The engine library is loaded once per process, None if it could not be loaded
+_engine_libraries = dict()
+
+
+class KernelBinding(object):
+    """
+    The buffers of an op kernel, recorded once for arguments at fixed addresses.
+
+    Arguments:
+        kernel: The op kernel.
+        inputs: (index, address) of each input.
+        outputs: (index, address) of each output.
+        bound: A list shared by the bindings of kernel, holding the binding that was set on
+            the kernel last.
+    """
+    __slots__ = ('kernel', 'inputs', 'outputs', 'bound')
+
+    def __init__(self, kernel, inputs, outputs, bound):
+        self.kernel = kernel
+        self.inputs = inputs
+        self.outputs = outputs
+        self.bound = bound
+
+
 class Mkldnn(object):
 
     def __init__(self, engine_path):
@@ -41,17 +65,22 @@ class Mkldnn(object):
             'chwn': 7,
         }
         self.kernels = dict()        # MKL Op kernels
+        self.kernel_bindings = dict()  # Last binding set on each kernel
         self.native_layouts = []     # Layout objects owned by transformer
-        try:
-            self.mkllib = ct.CDLL(engine_path)
-            self.enabled = True
-        except:
-            if (os.getenv('MKL_TEST_ENABLE', False)):
-                print("Could not load MKLDNN Engine: ", engine_path, "Exiting...")
-                sys.exit(1)
-            else:
-                print("Could not load MKLDNN Engine: ", engine_path, " Will default to numpy")
-                return
+        if engine_path not in _engine_libraries:
+            try:
+                _engine_libraries[engine_path] = ct.CDLL(engine_path)
+            except:
+                _engine_libraries[engine_path] = None
+                if (os.getenv('MKL_TEST_ENABLE', False)):
+                    print("Could not load MKLDNN Engine: ", engine_path, "Exiting...")
+                    sys.exit(1)
+                else:
+                    print("Could not load MKLDNN Engine: ", engine_path, " Will default to numpy")
+        self.mkllib = _engine_libraries[engine_path]
+        if self.mkllib is None:
+            return
+        self.enabled = True
         if (self.enabled):
             self.init_mkldnn_engine_fn = \
                 self.mkllib.init_mkldnn_engine
@@ -192,8 +221,44 @@ class Mkldnn(object):
             for layout in self.native_layouts:
                 self.delete_layout(layout)
             self.destroy_mkldnn_engine_fn(self.mkldnn_engine)
+            self.kernel_bindings.clear()
             self.mkldnn_engine_initialized = False
 
+    def bind(self, name, inputs, outputs):
+        """
+        Records the buffers of the kernel of an op, so that each run is a single call into
+        the engine.
+
+        The arrays must not move while the binding is used. Computations that share an op
+        share its kernel, so a binding is set on the kernel again when another binding of the
+        same kernel ran last.
+
+        Arguments:
+            name: The name of the op.
+            inputs: The input arrays, by argument index, None for absent arguments.
+            outputs: The output arrays, by argument index, None for absent arguments.
+
+        Returns:
+            KernelBinding
+        """
+        assert self.enabled and name in self.kernels
+        kernel = self.kernels[name]
+        return KernelBinding(kernel,
+                             [(index, x.ctypes.data) for index, x in enumerate(inputs)
+                              if x is not None],
+                             [(index, x.ctypes.data) for index, x in enumerate(outputs)
+                              if x is not None],
+                             self.kernel_bindings.setdefault(kernel, [None]))
+
+    def run_bound(self, binding):
+        if binding.bound[0] is not binding:
+            for index, data in binding.inputs:
+                self.set_input_tensor(binding.kernel, data, index)
+            for index, data in binding.outputs:
+                self.set_output_tensor(binding.kernel, data, index)
+            binding.bound[0] = binding
+        self.run_opkernel(binding.kernel, self.mkldnn_verbose)
+
     def fprop_batchnorm(self, name, inputs, outputs, gamma, bias, mean, variance, epsilon):
         assert self.enabled and name in self.kernels
         weights = np.stack([gamma[:, 0], bias[:, 0]])
@@ -437,10 +502,12 @@ def update_lut(error, idx, pad_idx, axis, dW):
 
 class ConvLocals(object):
 
-    def __init__(self, conv_params, conv_slices, pool_params, pool_slices, input_nodes, **kwargs):
+    def __init__(self, conv_params, conv_slices, pool_params, pool_slices, input_nodes,
+                 rng=None, **kwargs):
         super(ConvLocals, self).__init__(**kwargs)
         self.conv_params = conv_params
         self.conv_slices = conv_slices
         self.pool_params = pool_params
         self.pool_slices = pool_slices
         self.input_nodes = input_nodes
+        self.rng = rng
@@ -81,6 +81,11 @@ class HetrLocals(object):
             self.distribution = self.mlsl_obj.create_distribution(self.process_count, 1)
 
     def close(self):
+        for allreduce_op in self.allreduce_nodes:
+            bucket = getattr(allreduce_op, 'bucket', None)
+            if bucket is not None and bucket.buffer is not None:
+                self.mlsl_free(bucket.buffer)
+                bucket.buffer = None
         if self.distribution:
             self.mlsl_obj.delete_distribution(self.distribution)
 
@@ -212,7 +217,20 @@ class HetrLocals(object):
         allreduce_op = self.allreduce_nodes[allreduce_id]
         if not hasattr(allreduce_op, '_req'):
             allreduce_op._req = [None]
-        if allreduce_op.reduce_func == 'sum' or allreduce_op.reduce_func == 'mean':
+        bucket = getattr(allreduce_op, 'bucket', None)
+        if bucket is not None:
+            # the collective of the bucket is launched by its last member
+            allreduce_op.arr = out
+            if bucket.buffer is None:
+                bucket.buffer = self.mlsl_alloc(bucket.size, 64, np.dtype(np.float32))
+            bucket.pack(allreduce_op, x_nparr)
+            if bucket.is_last(allreduce_op):
+                buf = self.as_buffer(bucket.buffer)
+                bucket.req = self.distribution.all_reduce(buf, buf, bucket.size,
+                                                          mlsl.DataType.FLOAT,
+                                                          mlsl.ReductionType.SUM,
+                                                          mlsl.GroupType.DATA)
+        elif allreduce_op.reduce_func == 'sum' or allreduce_op.reduce_func == 'mean':
             allreduce_op.arr = out
             send_buf = self.as_buffer(x_nparr)
             send_count = x_nparr.size
@@ -229,7 +247,15 @@ class HetrLocals(object):
         allreduce_op = self.allreduce_nodes[allreduce_id]
         start_node = next(op for op in allreduce_op.control_deps
                           if isinstance(op, CPUMlslAllReduceStartOp))
-        self.mlsl_obj.wait(start_node.req)
+        bucket = getattr(start_node, 'bucket', None)
+        if bucket is not None:
+            # the first wait of the bucket completes the collective for all its members
+            if bucket.req is not None:
+                self.mlsl_obj.wait(bucket.req)
+                bucket.req = None
+            bucket.unpack(start_node, start_node.arr)
+        else:
+            self.mlsl_obj.wait(start_node.req)
 
         if allreduce_op.reduce_func == 'sum':
             # sum reduction is performed inside MLSL
@@ -0,0 +1,69 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+
+from __future__ import division
+import numpy as np
+
+# numpy has no bfloat16, so bfloat16 values are stored as the upper 16 bits of a float32
+storage_dtypes = {
+    'float16': np.dtype(np.float16),
+    'bfloat16': np.dtype(np.uint16),
+}
+
+
+def as_storage_dtype(name):
+    """
+    The numpy dtype that holds values of a reduced storage precision.
+
+    Arguments:
+        name (str): 'float16' or 'bfloat16'.
+    """
+    try:
+        return storage_dtypes[name]
+    except KeyError:
+        raise ValueError("Unsupported storage dtype {}, expected one of {}"
+                         .format(name, sorted(storage_dtypes)))
+
+
+def to_storage(x, out):
+    """
+    Converts the float32 array x to the storage dtype of out.
+
+    bfloat16 is rounded to nearest even.
+    """
+    if out.dtype != np.uint16:
+        out[()] = x
+        return
+    bits = np.ascontiguousarray(x, dtype=np.float32).view(np.uint32)
+    rounded = np.right_shift(bits, np.uint32(16))
+    np.bitwise_and(rounded, np.uint32(1), out=rounded)
+    np.add(rounded, np.uint32(0x7FFF), out=rounded)
+    np.add(rounded, bits, out=rounded)
+    # Rounding could carry a NaN into an infinity
+    rounded[np.isnan(x)] = 0x7FC00000
+    np.right_shift(rounded, np.uint32(16), out=out, casting='unsafe')
+
+
+def from_storage(x, out):
+    """
+    Converts the array x in a reduced storage dtype to the float32 array out.
+    """
+    if x.dtype != np.uint16:
+        out[()] = x
+    elif out.flags.c_contiguous:
+        np.left_shift(x, np.uint32(16), out=out.view(np.uint32), dtype=np.uint32)
+    else:
+        out[()] = np.left_shift(x, np.uint32(16), dtype=np.uint32).view(np.float32)
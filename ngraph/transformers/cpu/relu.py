@@ -38,6 +38,8 @@ class BpropReluOp(ElementWiseOp):
     Arguments:
         fprop: The original relu.
     """
+    _op_references = ('fprop',)
+
     def __init__(self, delta, inputs, fprop, **kwargs):
         super(BpropReluOp, self).__init__(args=(delta, inputs), axes=delta.axes, **kwargs)
         self.fprop = fprop
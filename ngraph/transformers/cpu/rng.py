@@ -0,0 +1,144 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+
+from __future__ import division
+import collections
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_MASK = (1 << 64) - 1
+
+
+def mix64(x):
+    """
+    The splitmix64 finalizer of a python integer.
+    """
+    x = (x + 0x9E3779B97F4A7C15) & _MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK
+    return x ^ (x >> 31)
+
+
+class CounterRng(object):
+    """
+    Counter-based random numbers for the RngOps of one computation.
+
+    Value i of the c-th draw from a stream is a hash of (seed, stream, c, i), so there is no
+    sequential state: any part of any draw can be generated independently, in any order, on
+    any thread or process, and is reproduced exactly from the seed. Values are written
+    directly into the output array through scratch buffers that are reused between draws.
+
+    Arguments:
+        seed (int): Seed of the computation.
+    """
+
+    def __init__(self, seed):
+        self.seed = mix64(int(seed) & _MASK)
+        self.counters = collections.defaultdict(int)
+        self._index = np.arange(0, dtype=np.uint64)
+        self._bits = np.empty(0, dtype=np.uint64)
+        self._shifted = np.empty(0, dtype=np.uint64)
+        self._floats = np.empty((2, 0), dtype=np.float64)
+
+    def key(self, stream, counter):
+        """
+        The key of a draw, which determines all of its values.
+        """
+        return mix64(mix64(self.seed ^ stream) ^ counter)
+
+    def bits(self, key, n, start=0):
+        """
+        Random 64 bit integers for values start to start + n of a draw.
+
+        Returns:
+            A scratch view, which is overwritten by the next call.
+        """
+        if len(self._index) < start + n:
+            self._index = np.arange(start + n, dtype=np.uint64)
+            self._bits = np.empty(start + n, dtype=np.uint64)
+            self._shifted = np.empty(start + n, dtype=np.uint64)
+        z = self._bits[:n]
+        t = self._shifted[:n]
+        np.multiply(self._index[start:start + n], _GOLDEN, out=z)
+        np.add(z, np.uint64(key), out=z)
+        np.right_shift(z, np.uint64(30), out=t)
+        np.bitwise_xor(z, t, out=z)
+        np.multiply(z, _MIX1, out=z)
+        np.right_shift(z, np.uint64(27), out=t)
+        np.bitwise_xor(z, t, out=z)
+        np.multiply(z, _MIX2, out=z)
+        np.right_shift(z, np.uint64(31), out=t)
+        np.bitwise_xor(z, t, out=z)
+        return z
+
+    def unit(self, key, out, start=0, step=1, offset=0):
+        """
+        Writes floats uniform on [0, 1) to the flat array out, using values
+        (start + j) * step + offset of a draw.
+        """
+        n = out.size
+        bits = self.bits(key, n * step, start * step)[offset::step]
+        mantissa = min(np.finfo(out.dtype).nmant + 1, 53)
+        np.right_shift(bits, np.uint64(64 - mantissa), out=bits)
+        np.multiply(bits, 2.0 ** -mantissa, out=out, casting='unsafe')
+        return out
+
+    def _next_key(self, stream):
+        counter = self.counters[stream]
+        self.counters[stream] = counter + 1
+        return self.key(stream, counter)
+
+    def _flat(self, out):
+        if out.flags.c_contiguous:
+            return out.reshape(-1)
+        return np.empty(out.size, dtype=out.dtype)
+
+    def uniform(self, stream, out, low=0.0, high=1.0):
+        """
+        Fills out with the next draw of stream from the uniform distribution on [low, high).
+        """
+        flat = self._flat(out)
+        self.unit(self._next_key(stream), flat)
+        flat *= high - low
+        flat += low
+        if not out.flags.c_contiguous:
+            out[()] = flat.reshape(out.shape)
+
+    def normal(self, stream, out, loc=0.0, scale=1.0):
+        """
+        Fills out with the next draw of stream from the normal distribution, using the
+        Box-Muller transform of two uniform values per output value.
+        """
+        key = self._next_key(stream)
+        n = out.size
+        if self._floats.shape[1] < n:
+            self._floats = np.empty((2, n), dtype=np.float64)
+        radius, angle = self._floats[0, :n], self._floats[1, :n]
+
+        self.unit(key, radius, step=2)
+        np.subtract(1.0, radius, out=radius)
+        np.log(radius, out=radius)
+        radius *= -2.0
+        np.sqrt(radius, out=radius)
+        self.unit(key, angle, step=2, offset=1)
+        angle *= 2.0 * np.pi
+        np.cos(angle, out=angle)
+        radius *= angle
+        radius *= scale
+        radius += loc
+        out[()] = radius.reshape(out.shape)
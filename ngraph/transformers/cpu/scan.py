@@ -0,0 +1,148 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+
+from __future__ import division
+import numpy as np
+
+
+def step_index(pos, t, prefix=()):
+    """
+    Index selecting step t of a tensor whose recurrent axis is at position pos.
+    """
+    return tuple(prefix) + (slice(None),) * pos + (t,)
+
+
+class ScanLoop(object):
+    """
+    Runs the compiled body of a ScanOp once for each step of the recurrent axis.
+
+    All arrays are views into the memory pools of the body computation, so a step only copies
+    the current slice of each sequence in and the new states out.
+
+    Arguments:
+        body: Executor for one step of the body.
+        step_inputs: Body arrays for the current slice of each sequence.
+        states: Body arrays for the current states.
+        capture_inputs: Body arrays for captured values.
+        outputs: Body arrays holding the new states after a step.
+        sequence_positions: Position of the recurrent axis in each sequence.
+        length: Length of the recurrent axis.
+        pos: Position of the recurrent axis in each state sequence.
+        backward: Iterate from the last step to the first.
+    """
+
+    def __init__(self, body, step_inputs, states, capture_inputs, outputs,
+                 sequence_positions, length, pos, backward):
+        self.body = body
+        self.step_inputs = step_inputs
+        self.states = states
+        self.capture_inputs = capture_inputs
+        self.outputs = outputs
+        self.sequence_positions = sequence_positions
+        self.pos = pos
+        self.steps = list(reversed(range(length))) if backward else list(range(length))
+
+    def unpack(self, args):
+        n_seq = len(self.step_inputs)
+        n_init = n_seq + len(self.states)
+        n_capt = n_init + len(self.capture_inputs)
+        return args[:n_seq], args[n_seq:n_init], args[n_init:n_capt]
+
+    def previous_states(self, out, inits, i):
+        """
+        The states before processing the i-th step.
+        """
+        if i == 0:
+            return inits
+        t = self.steps[i - 1]
+        return [out[step_index(self.pos, t, (k,))] for k in range(len(self.states))]
+
+    def __call__(self, out, *args):
+        sequences, inits, captures = self.unpack(args)
+        for capture_input, capture in zip(self.capture_inputs, captures):
+            capture_input[()] = capture
+        for state, init in zip(self.states, inits):
+            state[()] = init
+
+        for t in self.steps:
+            for step_input, sequence, pos in zip(self.step_inputs, sequences,
+                                                 self.sequence_positions):
+                step_input[()] = sequence[step_index(pos, t)]
+            self.body()
+            # Write every output before updating any state, since a body that just permutes
+            # its states returns the state arrays themselves.
+            for k, output in enumerate(self.outputs):
+                out[step_index(self.pos, t, (k,))] = output
+            for k, state in enumerate(self.states):
+                state[()] = out[step_index(self.pos, t, (k,))]
+
+
+class ScanGradLoop(ScanLoop):
+    """
+    Runs the compiled derivative of a ScanOp body backward over the steps of the forward loop.
+
+    Arguments:
+        body: Executor for the derivative of one step.
+        errors: Body arrays for the error of each new state.
+        grads: Body arrays for the derivatives, in the order step inputs, states, captures
+            and trainable shared tensors.
+        **kwargs: Arguments for ScanLoop; outputs is unused.
+    """
+
+    def __init__(self, body, errors, grads, **kwargs):
+        super(ScanGradLoop, self).__init__(body, outputs=None, **kwargs)
+        self.errors = errors
+        self.grads = grads
+        self.carried = [np.zeros_like(state) for state in self.states]
+
+    def __call__(self, out, fprop, delta, *args):
+        n_seq = len(self.step_inputs)
+        n_state = len(self.states)
+        n_grads = len(self.grads)
+        sequences, inits, captures = self.unpack(args)
+        grad_buffers = args[len(args) - n_grads:]
+        sequence_grads = grad_buffers[:n_seq]
+        state_grads = grad_buffers[n_seq:n_seq + n_state]
+        accumulated_grads = grad_buffers[n_seq + n_state:]
+        body_accumulated_grads = self.grads[n_seq + n_state:]
+
+        for capture_input, capture in zip(self.capture_inputs, captures):
+            capture_input[()] = capture
+        for grad in accumulated_grads:
+            grad.fill(0)
+        for carried in self.carried:
+            carried.fill(0)
+
+        for i in reversed(range(len(self.steps))):
+            t = self.steps[i]
+            for step_input, sequence, pos in zip(self.step_inputs, sequences,
+                                                 self.sequence_positions):
+                step_input[()] = sequence[step_index(pos, t)]
+            for state, previous in zip(self.states, self.previous_states(fprop, inits, i)):
+                state[()] = previous
+            for k, (error, carried) in enumerate(zip(self.errors, self.carried)):
+                np.add(carried, delta[step_index(self.pos, t, (k,))], out=error)
+            self.body()
+            for grad, body_grad, pos in zip(sequence_grads, self.grads,
+                                            self.sequence_positions):
+                grad[step_index(pos, t)] = body_grad
+            for carried, body_grad in zip(self.carried, self.grads[n_seq:n_seq + n_state]):
+                carried[()] = body_grad
+            for grad, body_grad in zip(accumulated_grads, body_accumulated_grads):
+                grad += body_grad
+
+        for grad, carried in zip(state_grads, self.carried):
+            grad[()] = carried
@@ -17,11 +17,14 @@
 from __future__ import division
 from __future__ import print_function
 
+from collections import OrderedDict
 from functools import wraps
 from operator import itemgetter
 # These are indirectly used by the generated code
 import numpy as np
 import os
+import shutil
+import tempfile
 
 from ngraph.util.pygen import PyModule, PyGen, indenting
 from ngraph.util.generics import generic_method
@@ -38,23 +41,31 @@ from ngraph.op_graph.convolution import ConvolutionOp, update_conv, bprop_conv,
 from ngraph.op_graph.pooling import PoolingOp, BpropPoolOp
 from ngraph.op_graph.lookuptable import LookupTableOp, update_lut
 from ngraph.op_graph.ctc import CTCOp
+from ngraph.op_graph.scan import ScanOp, ScanGradOp
 from ngraph.op_graph.debug import PrintOp
 from ngraph.transformers.cpu.batchnorm import BatchnormOp, BpropBatchnormOp
 from ngraph.transformers.cpu.relu import ReluOp, BpropReluOp
+from ngraph.transformers.cpu.precision import as_storage_dtype
+from ngraph.transformers.cpu.rng import CounterRng, mix64
+from ngraph.transformers.cpu.scan import ScanLoop, ScanGradLoop
 from ngraph.transformers.passes.passes import RequiredTensorShaping, \
     CPUTensorShaping, SimplePrune, HeTrTensorShaping
 from ngraph.transformers.passes.cpulayout import CPUTensorLayout
 from ngraph.transformers.passes.cpufusion import CPUFusion
+from ngraph.transformers.passes.cse import CommonSubexpressionElimination
+from ngraph.transformers.passes.simplification import AlgebraicSimplification
 from ngraph.transformers.passes.mkldnnpasses import MklCreateOpDescriptors, \
     MklAddLayoutConversions, MklReorderOp
 from ngraph.transformers.passes.expass import SSAConversion, IndexElision, \
     CopyElimination, DeadCodeEliminationPass
 from ngraph.transformers.passes.memlayout import MemLayoutPass
-from ngraph.transformers.passes.memoptimize import MemOptimizePass
+from ngraph.transformers.passes.memoptimize import InPlaceBufferSharing, MemOptimizePass
 from ngraph.transformers.passes.liveness import LivenessPass
+from ngraph.transformers.passes.hetrpasses import AllReduceBucketing, AllReduceScheduling
+from ngraph.transformers.passes.reducedprecision import ReducedPrecisionStorage, \
+    ToStorageOp, FromStorageOp
+from ngraph.transformers.passes.rematerialization import Rematerialization
 
-from ngraph.transformers.base import make_transformer_factory, \
-    set_transformer_factory
 from ngraph.transformers.extransform import ExecutionGraphTransformer, \
     DeviceTensor, DeviceTensorView, DeviceComputation
 
@@ -86,6 +97,15 @@ def align_ndarray(element_count, alignment, dtype):
         return x[padding:padding + element_count]
 
 
+def memmap_ndarray(filename, byte_count):
+    """
+    Makes a uint8 array of byte_count bytes stored in filename, which is created or truncated.
+    Pages are only read into memory when they are used.
+    """
+    buffer = np.memmap(filename, dtype=np.uint8, mode='w+', shape=(max(byte_count, 1),))
+    return buffer[:byte_count]
+
+
 class CPUConvEngine(object):
 
     @staticmethod
@@ -185,6 +205,7 @@ class CPUDeviceComputation(DeviceComputation):
         self.pool_slices = dict()
         self.conv_params = dict()
         self.conv_slices = dict()
+        self.rng_streams = dict()
 
 
 class CPUDeviceTensor(DeviceTensor):
@@ -220,15 +241,23 @@ class CPUDeviceTensor(DeviceTensor):
         return self.name
 
     def codegen(self):
-        start = self.buffer_pool_offset // 4
-        end = start + self.size // 4
-        pool_name = self.device_computation.computation_op.name
+        if self.tensor_decl.is_memmapped:
+            filename = self.transformer.memmap_filename(self)
+            self.transformer.exop_codegen_tensor.append("\n# tensor size={}, file={}",
+                                                        self.size, filename)
+            self.transformer.exop_codegen_tensor.append(
+                "{} = memmap_ndarray(r'{}', {}).view('{}')",
+                self.name, filename, self.size, self.element_type.dtype)
+            return
+        start = self.buffer_pool_offset
+        end = start + self.size
+        pool_name = self.device_computation.computation_op.safe_name
         pool_name += '_persistent_pool' if self.is_persistent else '_temporary_pool'
         dtype = self.element_type.dtype
         self.transformer.exop_codegen_tensor.append("\n# tensor size={}, offset={}",
                                                     self.size,
                                                     self.buffer_pool_offset)
-        self.transformer.exop_codegen_tensor.append("{} = {}[{}:{}].view('{}')",
+        self.transformer.exop_codegen_tensor.append("{} = {}.view('uint8')[{}:{}].view('{}')",
                                                     self.name, pool_name, start, end, dtype)
 
     def transform_allocate(self):
@@ -345,6 +374,37 @@ class CPUCodeGenerator(PyGen):
     def name(self, x):
         return self.transformer.device_tensor_view(x.tensor_view_decl).ref_str
 
+    def append_mkldnn(self, op, inputs, outputs, code, *args):
+        """
+        Adds a call to the MKL-DNN kernel of op.
+
+        Tensors live at fixed offsets in the pools of the computation, so the buffers of a
+        kernel are bound once when the computation is loaded, and running the op is a single
+        call into the engine. Ops without a kernel run code, a call to the Mkldnn method that
+        falls back to numpy.
+
+        Arguments:
+            op: The op.
+            inputs: The inputs of the kernel, by argument index, None for absent arguments.
+            outputs: The outputs of the kernel, by argument index.
+            code, args: The fallback call and its format arguments.
+        """
+        mkldnn = self.transformer.mkldnn
+        if not (mkldnn.enabled and op.safe_name in mkldnn.kernels):
+            self.append(code, *args)
+            return
+
+        binding = '{}_{}_kernel'.format(self.exop.computation_decl.computation_op.safe_name,
+                                        op.safe_name)
+
+        def names(arrays):
+            return ', '.join('None' if x is None else self.name(x) for x in arrays)
+
+        self.transformer.exop_codegen_bind.append("{} = mkldnn.bind('{}', [{}], [{}])",
+                                                  binding, op.safe_name,
+                                                  names(inputs), names(outputs))
+        self.append("mkldnn.run_bound({})", binding)
+
     def np_reduction_axis(self, op):
         """
         Returns numpy reduction axis of an op
@@ -385,6 +445,10 @@ class CPUCodeGenerator(PyGen):
     def conv_slices(self):
         return self.transformer.device_computation.conv_slices
 
+    @property
+    def rng_streams(self):
+        return self.transformer.device_computation.rng_streams
+
     @property
     def input_nodes(self):
         return self.transformer.device_computation.input_nodes
@@ -447,6 +511,10 @@ class CPUCodeGenerator(PyGen):
         self.pool_params[op.safe_name] = op.pool_params
         self.pool_slices[op.safe_name] = CPUPoolEngine.get_slices(arrI, arrO, op.pool_params)
 
+    @allocate_op.on_type(RngOp)
+    def allocate_op(self, op, out, x):
+        self.rng_streams[op.safe_name] = len(self.rng_streams)
+
     def generate_op_pre(self, op):
         # exop = self.exop
         # self.append("\n# {} pre", exop.name)
@@ -504,6 +572,9 @@ class CPUCodeGenerator(PyGen):
     def generate_op(self, op, out, *args):
         write_args = self.exop.write_args
         for dest, source in zip(write_args, args):
+            if source.tensor_view_decl is dest.tensor_view_decl:
+                # The value was computed in place
+                continue
             if isinstance(source.source_output_decl.exop.op, LiteralScalarOp):
                 self.append("{}[...] = {}", dest, source.source_output_decl.exop.op.scalar)
             else:
@@ -515,8 +586,9 @@ class CPUCodeGenerator(PyGen):
 
     @generate_op.on_type(Add)
     def generate_op(self, op, out, x, y):
-        self.append("mkldnn.elementwise_add('{}', I_array1={}, I_array2={}, O_array={})",
-                    op.safe_name, x, y, out)
+        self.append_mkldnn(op, [x, y], [out],
+                           "mkldnn.elementwise_add('{}', I_array1={}, I_array2={}, O_array={})",
+                           op.safe_name, x, y, out)
 
     @generate_op.on_type(Argmax)
     def generate_op(self, op, out, x):
@@ -528,28 +600,38 @@ class CPUCodeGenerator(PyGen):
 
     @generate_op.on_type(ConvolutionOp)
     def generate_op(self, op, outputs, inputs, filters, bias=None):
-        self.append("mkldnn.fprop_conv('{}', self.conv_slices['{}'], I={}, F={}, B={}, O={})",
-                    op.safe_name, op.safe_name, inputs, filters, bias, outputs)
+        self.append_mkldnn(op, [inputs, filters, bias], [outputs],
+                           "mkldnn.fprop_conv('{}', self.conv_slices['{}'], I={}, F={}, B={}, "
+                           "O={})",
+                           op.safe_name, op.safe_name, inputs, filters, bias, outputs)
 
     @generate_op.on_type(bprop_conv)
     def generate_op(self, op, outputs, delta, filters):
-        self.append("mkldnn.bprop_conv('{}', self.conv_slices['{}'], E={}, F={}, gI={})",
-                    op.safe_name, op.fprop.forwarded.safe_name, delta, filters, outputs)
+        self.append_mkldnn(op, [delta, filters], [outputs],
+                           "mkldnn.bprop_conv('{}', self.conv_slices['{}'], E={}, F={}, gI={})",
+                           op.safe_name, op.fprop.forwarded.safe_name, delta, filters, outputs)
 
     @generate_op.on_type(update_conv)
     def generate_op(self, op, outputs, delta, inputs, dbias=None):
-        self.append("mkldnn.update_conv('{}', self.conv_slices['{}'], I={}, E={}, U={}, dB={})",
-                    op.safe_name, op.fprop.forwarded.safe_name, inputs, delta, outputs, dbias)
+        self.append_mkldnn(op, [delta, inputs], [outputs, dbias],
+                           "mkldnn.update_conv('{}', self.conv_slices['{}'], I={}, E={}, U={}, "
+                           "dB={})",
+                           op.safe_name, op.fprop.forwarded.safe_name, inputs, delta, outputs,
+                           dbias)
 
     @generate_op.on_type(DeconvolutionOp)
     def generate_op(self, op, outputs, inputs, filters):
-        self.append("mkldnn.bprop_conv('{}', self.conv_slices['{}'], E={}, F={}, gI={})",
-                    op.safe_name, op.safe_name, inputs, filters, outputs)
+        self.append_mkldnn(op, [inputs, filters], [outputs],
+                           "mkldnn.bprop_conv('{}', self.conv_slices['{}'], E={}, F={}, gI={})",
+                           op.safe_name, op.safe_name, inputs, filters, outputs)
 
     @generate_op.on_type(DeconvDerivOp)
     def generate_op(self, op, outputs, delta, filters):
-        self.append("mkldnn.fprop_conv('{}', self.conv_slices['{}'], I={}, F={}, B={},  O={})",
-                    op.safe_name, op.fprop.forwarded.safe_name, delta, filters, None, outputs)
+        self.append_mkldnn(op, [delta, filters], [outputs],
+                           "mkldnn.fprop_conv('{}', self.conv_slices['{}'], I={}, F={}, B={}, "
+                           "O={})",
+                           op.safe_name, op.fprop.forwarded.safe_name, delta, filters, None,
+                           outputs)
 
     @generate_op.on_type(PoolingOp)
     def generate_op(self, op, outputs, inputs):
@@ -577,24 +659,42 @@ class CPUCodeGenerator(PyGen):
         self.append("ctc_cpu(acts={}, lbls={}, utt_lens={}, lbl_lens={}, grads={}, costs={})",
                     activations, lbls, utt_lens, lbl_lens, grads, outputs)
 
+    @generate_op.on_type(ScanOp)
+    def generate_op(self, op, out, *args):
+        loop_name = self.transformer.make_scan_loop(op)
+        self.append("{}({})", loop_name, ", ".join(self.name(arg) for arg in (out,) + args))
+
+    @generate_op.on_type(ScanGradOp)
+    def generate_op(self, op, out, *args):
+        loop_name = self.transformer.make_scan_loop(op)
+        self.append("{}(None, {})", loop_name, ", ".join(self.name(arg) for arg in args))
+
     @generate_op.on_type(RngOp)
     def generate_op(self, op, out, x):
         if op.distribution == 'uniform':
-            rstr = "uniform(low={low}, high={high}".format(**op.params)
+            rstr = "uniform({{stream}}, {{out}}, low={low}, high={high})".format(**op.params)
         elif op.distribution == 'normal':
-            rstr = "normal(loc={loc}, scale={scale}".format(**op.params)
+            rstr = "normal({{stream}}, {{out}}, loc={loc}, scale={scale})".format(**op.params)
 
-        self.append("{out}[()] = np.random.{rstr}, size={out}.shape)", out=out, rstr=rstr)
+        self.append("self.rng." + rstr, out=out, stream=self.rng_streams[op.safe_name])
 
     @generate_op.on_type(CosOp)
     def generate_op(self, op, out, x):
         self.append("np.cos({}, out={})", x, out)
 
+    @generate_op.on_type(ToStorageOp)
+    def generate_op(self, op, out, x):
+        self.append("to_storage({}, out={})", x, out)
+
+    @generate_op.on_type(FromStorageOp)
+    def generate_op(self, op, out, x):
+        self.append("from_storage({}, out={})", x, out)
+
     @generate_op.on_type(ContiguousOp)
     def generate_op(self, op, out, x):
         # self.append("{}[()] = {}", out, x)
-        self.append("mkldnn.mkl_contiguous('{}', {}, {})",
-                    op.safe_name, out, x)
+        self.append_mkldnn(op, [x], [out],
+                           "mkldnn.mkl_contiguous('{}', {}, {})", op.safe_name, out, x)
 
     @generate_op.on_type(Divide)
     def generate_op(self, op, out, x, y):
@@ -610,8 +710,9 @@ class CPUCodeGenerator(PyGen):
 
     @generate_op.on_type(DotLowDimension)
     def generate_op(self, op, out, x, y, bias=None):
-        self.append("mkldnn.innerproduct_fprop('{}', {}, {}, {}, out={})",
-                    op.safe_name, x, y, bias, out)
+        self.append_mkldnn(op, [x, y, bias], [out],
+                           "mkldnn.innerproduct_fprop('{}', {}, {}, {}, out={})",
+                           op.safe_name, x, y, bias, out)
 
     @generate_op.on_type(BatchnormOp)
     def generate_op(self, op, output, inputs, gamma, bias, epsilon, mean, variance):
@@ -628,12 +729,15 @@ class CPUCodeGenerator(PyGen):
 
     @generate_op.on_type(ReluOp)
     def generate_op(self, op, outputs, inputs):
-        self.append("mkldnn.fprop_relu('{}', {}, {}, {})", op.safe_name, inputs, outputs, op.slope)
+        self.append_mkldnn(op, [inputs], [outputs],
+                           "mkldnn.fprop_relu('{}', {}, {}, {})",
+                           op.safe_name, inputs, outputs, op.slope)
 
     @generate_op.on_type(BpropReluOp)
     def generate_op(self, op, outputs, delta, inputs):
-        self.append("mkldnn.bprop_relu('{}', {}, {}, {}, {})",
-                    op.safe_name, delta, outputs, inputs, op.fprop.slope)
+        self.append_mkldnn(op, [inputs, delta], [outputs],
+                           "mkldnn.bprop_relu('{}', {}, {}, {}, {})",
+                           op.safe_name, delta, outputs, inputs, op.fprop.slope)
 
     @generate_op.on_type(Equal)
     def generate_op(self, op, out, x, y):
@@ -685,7 +789,8 @@ class CPUCodeGenerator(PyGen):
 
     @generate_op.on_type(MklReorderOp)
     def generate_op(self, op, output, input):
-        self.append("mkldnn.mkl_reorder('{}', {}, {})", op.safe_name, output, input)
+        self.append_mkldnn(op, [input], [output],
+                           "mkldnn.mkl_reorder('{}', {}, {})", op.safe_name, output, input)
 
     @generate_op.on_type(Multiply)
     def generate_op(self, op, out, x, y):
@@ -857,9 +962,17 @@ class CPUTransformer(ExecutionGraphTransformer):
     default_rtol = 1e-05
     default_atol = 1e-08
 
-    def __init__(self, comm=None, **kwargs):
+    def __init__(self, comm=None, rng_seed=None, storage_dtype=None, memory_budget=None,
+                 remat_strategy=None, memmap_dir=None, memmap_threshold=None, **kwargs):
         super(CPUTransformer, self).__init__(**kwargs)
 
+        # persistent tensors with the memmap metadata, or of at least memmap_threshold bytes,
+        # are stored in files in memmap_dir, a temporary directory by default
+        self.memmap_dir = memmap_dir
+        self.memmap_threshold = memmap_threshold
+        self.memmap_temporary_dir = None
+        self.memmapped_tensors = OrderedDict()
+
         # comm is not None in case of work under HetrTransformer
         if comm is not None:
             global use_mlsl
@@ -877,6 +990,10 @@ class CPUTransformer(ExecutionGraphTransformer):
                            " all input ops will provide correctly shaped"
                            " buffers full of zeros, expect non-functionality")
 
+        # size of the buffers allreduce ops are grouped into, in bytes, 0 disables grouping
+        self.allreduce_bucket_size = int(os.environ.get('HETR_ALLREDUCE_BUCKET_SIZE',
+                                                        AllReduceBucketing.default_bucket_size))
+
         self.device_computation = None
         self.conv_engine = CPUConvEngine()
         self.init_code = CPUCodeGenerator(self)
@@ -887,11 +1004,20 @@ class CPUTransformer(ExecutionGraphTransformer):
         self.initialize_module(self.globals)
         self.n_computations = 0
         self.use_pinned_mem = False
-        self.rng_seed = None
+        self.rng_seed = rng_seed
+        self.n_rngs = 0
+        self.storage_dtype = None
+        if storage_dtype is not None:
+            self.storage_dtype = as_storage_dtype(storage_dtype)
+        # activations are recomputed for the backward pass when either is given
+        self.rematerialization = None
+        if memory_budget is not None or remat_strategy is not None:
+            self.rematerialization = Rematerialization(memory_budget, remat_strategy)
 
         self.exop_codegen_pools = CPUCodeGenerator(self)
         self.exop_codegen_tensor = CPUCodeGenerator(self)
         self.exop_codegen_tensor_view = CPUCodeGenerator(self)
+        self.exop_codegen_bind = CPUCodeGenerator(self)
         self.exop_codegen = CPUCodeGenerator(self, skip_comm_ops=skip_comm_ops,
                                              skip_input_ops=skip_input_ops)
         self.exop_codegen_define_length = 0
@@ -913,6 +1039,8 @@ class CPUTransformer(ExecutionGraphTransformer):
             SimplePrune(),
             RequiredTensorShaping(),
             CPUTensorShaping(),
+            AlgebraicSimplification(),
+            CommonSubexpressionElimination(),
             DeadCodeEliminationPass(),
         ]
 
@@ -923,17 +1051,28 @@ class CPUTransformer(ExecutionGraphTransformer):
                 MklAddLayoutConversions(mkldnn=self.mkldnn),
             ]
 
+        self.graph_passes += [SSAConversion()]
+        if self.storage_dtype is not None:
+            self.graph_passes += [ReducedPrecisionStorage(self.storage_dtype)]
         self.graph_passes += [
-            SSAConversion(),
             # DCE here eliminates return values. Need to figure out why.
             # DeadCodeEliminationPass(),
             LivenessPass(),
             MemOptimizePass(),
             CopyElimination(),
             IndexElision(),
+        ]
+        if self.rematerialization is not None:
+            self.graph_passes += [self.rematerialization]
+        self.graph_passes += [InPlaceBufferSharing()]
+        if use_mlsl:
+            self.graph_passes += [AllReduceScheduling()]
+        self.graph_passes += [
             LivenessPass(),
-            MemLayoutPass()
+            MemLayoutPass(memmap=True, memmap_threshold=self.memmap_threshold)
         ]
+        if use_mlsl and self.allreduce_bucket_size > 0:
+            self.graph_passes += [AllReduceBucketing(self.allreduce_bucket_size)]
         # from ngraph.transformers.passes.dumpgraphpass import DumpGraphPass
         # self.graph_passes += [DumpGraphPass()]
 
@@ -947,10 +1086,10 @@ class CPUTransformer(ExecutionGraphTransformer):
 
         if use_mlsl:
             self.exop_codegen.append("class {}(HetrLocals, ConvLocals):",
-                                     computation_decl.computation_op.name)
+                                     computation_decl.computation_op.safe_name)
         else:
             self.exop_codegen.append("class {}(ConvLocals):",
-                                     computation_decl.computation_op.name)
+                                     computation_decl.computation_op.safe_name)
 
         with indenting(self.exop_codegen):
             self.exop_codegen.append("def __init__(self, **kwargs):")
@@ -964,7 +1103,7 @@ self.__profiler_start__ = list()
 self.__profiler_stop__  = list()
 """)
                 self.exop_codegen.append('super({}, self).__init__(**kwargs)',
-                                         computation_decl.computation_op.name)
+                                         computation_decl.computation_op.safe_name)
                 for exop in computation_decl.exop_block:
                     output_decl = exop.output_decls[0] if len(exop.output_decls) > 0 else None
                     # TODO better way to deal with multiple values
@@ -995,14 +1134,18 @@ self.__profiler_stop__  = list()
         device_computation = computation_decl.device_computation
         byte_alignment = computation_decl.execution_graph.execution_state \
             .transformer.byte_alignment
+        # Pools are sized in bytes and tensors are carved from a byte view, so tensors may
+        # have any element size. The pools are float32 since mlsl_alloc needs a float dtype.
         self.exop_codegen_pools.append(
             "{}_temporary_pool = align_ndarray({}, {}, np.dtype('{}'))",
-            computation_decl.computation_op.name, computation_decl.temporary_max_allocated,
+            computation_decl.computation_op.safe_name,
+            -(-computation_decl.temporary_max_allocated // 4),
             byte_alignment,
             'float32')
         self.exop_codegen_pools.append(
             "{}_persistent_pool = align_ndarray({}, {}, np.dtype('{}'))",
-            computation_decl.computation_op.name, computation_decl.persistent_max_allocated,
+            computation_decl.computation_op.safe_name,
+            -(-computation_decl.persistent_max_allocated // 4),
             byte_alignment,
             'float32')
 
@@ -1019,17 +1162,22 @@ self.__profiler_stop__  = list()
         code += '#---------------------------------------------\n'
         code += self.exop_codegen_tensor_view.take_code()
         code += '\n\n#---------------------------------------------\n'
+        code += '# kernel binding\n'
+        code += '#---------------------------------------------\n'
+        code += self.exop_codegen_bind.take_code()
+        code += '\n\n#---------------------------------------------\n'
         code += '# code\n'
         code += '#---------------------------------------------\n'
         code += self.exop_codegen.take_code()
 
         self.globals.compile(code)
-        cls = self.globals[computation_decl.computation_op.name]
+        cls = self.globals[computation_decl.computation_op.safe_name]
         params = {'conv_params': device_computation.conv_params,
                   'pool_params': device_computation.pool_params,
                   'conv_slices': device_computation.conv_slices,
                   'pool_slices': device_computation.pool_slices,
-                  'input_nodes': device_computation.input_nodes}
+                  'input_nodes': device_computation.input_nodes,
+                  'rng': self.make_rng()}
         if use_mlsl:
             params.update({'send_nodes': device_computation.send_nodes,
                            'recv_nodes': device_computation.recv_nodes,
@@ -1043,6 +1191,125 @@ self.__profiler_stop__  = list()
         executor = cls(**params)
         return executor
 
+    def add_computation(self, computation_op):
+        """
+        Adds a computation to the transformer.
+
+        The bodies of scans are compiled as computations of their own before the computation
+        that loops over them.
+
+        Arguments:
+            computation_op: A computation Op.
+
+        Returns:
+            Callable.
+        """
+        for op in Op.ordered_ops([computation_op]):
+            if isinstance(op, (ScanOp, ScanGradOp)):
+                self.add_computation(op.body)
+        return super(CPUTransformer, self).add_computation(computation_op)
+
+    def computation_arrays(self, computation_op):
+        """
+        Returns the arrays holding the parameters and the results of a compiled computation.
+
+        Arguments:
+            computation_op: A computation Op that has been added to this transformer.
+
+        Returns:
+            The executor, a list of parameter arrays and a list of result arrays.
+        """
+        device_computation = self.device_computations[computation_op]
+        computation_decl = device_computation.computation_decl
+        parameters = []
+        for param in computation_op.parameters:
+            tensor_decl = computation_decl.get_tensor_decl(op=param.tensor)
+            parameters.append(self.device_tensor_view(tensor_decl.root_tensor_view_decl).tensor)
+        results = [self.device_to_host(device_computation, op)
+                   for op in computation_op.returns]
+        return device_computation.executor, parameters, results
+
+    def make_scan_loop(self, op):
+        """
+        Makes the runtime loop for a ScanOp or ScanGradOp and adds it to the generated module.
+
+        Arguments:
+            op: A ScanOp or ScanGradOp whose body has been compiled.
+
+        Returns:
+            The name of the loop in the generated module.
+        """
+        scan_op = op.scan_op if isinstance(op, ScanGradOp) else op
+        body, parameters, results = self.computation_arrays(op.body)
+        n_seq = scan_op.n_sequences
+        n_init = n_seq + scan_op.n_states
+        n_capt = n_init + scan_op.n_captures
+        kwargs = dict(step_inputs=parameters[:n_seq],
+                      states=parameters[n_seq:n_init],
+                      capture_inputs=parameters[n_init:n_capt],
+                      sequence_positions=[seq.axes.index(scan_op.recurrent_axis)
+                                          for seq in scan_op.sequences],
+                      length=scan_op.recurrent_axis.length,
+                      pos=scan_op.pos,
+                      backward=scan_op.backward)
+        if isinstance(op, ScanGradOp):
+            loop = ScanGradLoop(body, errors=parameters[n_capt:], grads=results, **kwargs)
+        else:
+            loop = ScanLoop(body, outputs=results, **kwargs)
+        loop_name = "{}_loop".format(op.safe_name)
+        self.globals[loop_name] = loop
+        return loop_name
+
+    def make_rng(self):
+        """
+        Makes the random number generator owned by a new computation.
+
+        With rng_seed set, the seed of each computation is derived from rng_seed and the
+        order in which computations are loaded, so results are reproducible across runs.
+        Otherwise it is drawn from the global numpy RNG, so np.random.seed still applies.
+
+        Returns:
+            CounterRng
+        """
+        if self.rng_seed is None:
+            seed = np.random.randint(np.iinfo(np.int64).max, dtype=np.int64)
+        else:
+            seed = mix64(mix64(self.rng_seed) ^ self.n_rngs)
+        self.n_rngs += 1
+        return CounterRng(seed)
+
+    def memmap_filename(self, device_tensor):
+        """
+        Returns the file that stores a memory-mapped tensor.
+
+        Arguments:
+            device_tensor: A CPUDeviceTensor whose tensor_decl is_memmapped.
+
+        Returns:
+            The filename.
+        """
+        memmap_dir = self.memmap_dir
+        if memmap_dir is None:
+            if self.memmap_temporary_dir is None:
+                self.memmap_temporary_dir = tempfile.mkdtemp(prefix='ngraph_memmap_')
+            memmap_dir = self.memmap_temporary_dir
+        filename = os.path.join(memmap_dir, '{}.bin'.format(device_tensor.name))
+        self.memmapped_tensors[device_tensor.name] = filename
+        return filename
+
+    def sync_memmapped_tensors(self):
+        """
+        Flushes the memory-mapped persistent tensors to their files, which then hold a
+        checkpoint of the tensors that can be read with np.memmap or np.fromfile.
+
+        Returns:
+            A dict from the names of the memory-mapped tensors to their files.
+        """
+        for name in self.memmapped_tensors:
+            if name in self.globals:
+                self.globals[name].flush()
+        return dict(self.memmapped_tensors)
+
     def make_device_tensor(self, computation, tensor_decl):
         """
         Make a DeviceTensor.
@@ -1069,7 +1336,8 @@ from ngraph.transformers.cpu.cpuengine import fprop_lut, update_lut
 from ngraph.transformers.cpu.cpuengine import Mkldnn
 from ngraph.transformers.cpu.cpuengine import ConvLocals
 from ngraph.transformers.cpu.ctc import ctc_cpu
-from ngraph.transformers.cputransform import align_ndarray
+from ngraph.transformers.cpu.precision import to_storage, from_storage
+from ngraph.transformers.cputransform import align_ndarray, memmap_ndarray
         """)
 
         if use_mlsl:
@@ -1108,7 +1376,7 @@ from ngraph.transformers.cpu.hetr import HetrLocals
 
                 if use_mlsl:
                     for computation in self.device_computations.values():
-                        comp_name = computation.computation_decl.computation_op.name
+                        comp_name = computation.computation_decl.computation_op.safe_name
                         pool_name = comp_name + '_temporary_pool'
                         if pool_name in self.globals:
                             computation.executor.mlsl_free(self.globals[pool_name])
@@ -1122,6 +1390,11 @@ from ngraph.transformers.cpu.hetr import HetrLocals
 
             except TypeError:
                 pass
+            if getattr(self, 'memmapped_tensors', None):
+                self.sync_memmapped_tensors()
+        if getattr(self, 'memmap_temporary_dir', None) is not None:
+            shutil.rmtree(self.memmap_temporary_dir, ignore_errors=True)
+            self.memmap_temporary_dir = None
         self.code = None
 
     def consume(self, buf_index, hostlist, devlist):
@@ -1137,7 +1410,3 @@ from ngraph.transformers.cpu.hetr import HetrLocals
 
     def make_computation(self, computation):
         return CPUDeviceComputation(self, computation)
-
-
-set_transformer_factory(
-    make_transformer_factory(CPUTransformer.transformer_name))
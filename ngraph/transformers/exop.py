@@ -74,6 +74,7 @@ float16_t = ElementType('float16_t', np.float16)
 int32_t = ElementType('int32_t', np.int32)
 int64_t = ElementType('int64_t', np.int64)
 int8_t = ElementType('int8_t', np.int8)
+uint16_t = ElementType('uint16_t', np.uint16)
 uint32_t = ElementType('uint32_t', np.uint32)
 uint64_t = ElementType('uint64_t', np.uint64)
 uint8_t = ElementType('uint8_t', np.uint8)
@@ -514,7 +515,10 @@ class ExOp(ExecutionGraphElt):
     def has_side_effects(self):
         return self.op.has_side_effects
 
-    def align(self, size, alignment):
+    def align(self, size, alignment=None):
+        if alignment is None:
+            transformer = self.computation_decl.execution_graph.execution_state.transformer
+            alignment = 1 if transformer is None else transformer.byte_alignment
         return - (-size // alignment) * alignment
 
     def memory_usage(self):
@@ -948,7 +952,7 @@ class ExOpBlock(ExecutionGraphElt):
     def memory_efficiency(self):
         footprint = self.memory_footprint()
         usage = 0
-        for node in self.ops:
+        for node in self:
             usage = max(usage, node.memory_usage())
         result = 100
         if footprint > 0:
@@ -1008,6 +1012,8 @@ class TensorDecl(ExecutionGraphElt):
         tensor_description_base: The tensor description base for this tensor.
         is_compile_only: If True, this tensor is only needed during compilation, and should not be
             allocated.
+        is_memmapped: If True, this persistent tensor is stored in a memory-mapped file rather
+            than the persistent pool.
     """
 
     def __init__(self,
@@ -1038,6 +1044,7 @@ class TensorDecl(ExecutionGraphElt):
         self.lifespan = None
         self.is_constant = is_constant
         self.is_compile_only = is_compile_only
+        self.is_memmapped = False
         self.initial_value = None
         self.exop = exop
         if tensor_description is None:
@@ -1096,7 +1103,7 @@ class TensorDecl(ExecutionGraphElt):
     def prefix(self):
         if self.is_persistent:
             return "a_"
-        return "a_{}".format(self.execution_graph.computation_decl.computation_op.name)
+        return "a_{}".format(self.execution_graph.computation_decl.computation_op.safe_name)
 
     @property
     def variable_name(self):
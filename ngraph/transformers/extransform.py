@@ -16,7 +16,9 @@
 from __future__ import division
 from future.utils import iteritems, itervalues
 import abc
+from collections import OrderedDict
 from future.utils import with_metaclass
+import time
 import weakref
 
 from ngraph.util.names import NameableValue
@@ -25,6 +27,7 @@ from ngraph.transformers.base import Transformer
 from ngraph.transformers.base import DeviceTensor as BaseDeviceTensorView
 from ngraph.transformers.base import Computation as BaseDeviceComputation
 from ngraph.transformers.exop import ExecutionState
+from ngraph.transformers.memreport import MemoryReport
 from ngraph.transformers.passes.exopdelegate import ExOpGraphOpAccessor
 
 from ngraph.util.trace_events import TraceEventTracker
@@ -53,6 +56,18 @@ class DeviceComputation(BaseDeviceComputation):
             tracker.add_operation("ExOp", exop.op.short_name, 0, 0, start_time, duration, args)
         tracker.serialize_to_file()
 
+    def memory_report(self, top=10):
+        """
+        Reports the memory used by this computation.
+
+        Arguments:
+            top (int): The number of largest tensors live at the peak to report.
+
+        Returns:
+            A MemoryReport.
+        """
+        return MemoryReport(self.computation_decl, top=top)
+
 
 class DeviceBuffer(NameableValue):
     def __init__(self, transformer, buffer, **kwargs):
@@ -222,10 +237,15 @@ class ExecutionGraphTransformer(Transformer):
 
     def run_registered_graph_passes(self, computation_decl, **kwargs):
         op_accessor = ExOpGraphOpAccessor()
+        # (pass name, seconds) in the order the passes ran, for benchmarks
+        computation_decl.pass_times = []
         for graph_pass in self.graph_passes:
+            start = time.time()
             graph_pass.wrapped_do_pass(op_accessor=op_accessor,
                                        computation_decl=computation_decl,
                                        **kwargs)
+            computation_decl.pass_times.append((type(graph_pass).__name__,
+                                                time.time() - start))
 
     @abc.abstractmethod
     def make_device_tensor(self, computation, tensor_decl):
@@ -450,9 +470,14 @@ class ExecutionGraphTransformer(Transformer):
         if device_computation is not None:
             return device_computation
 
+        compile_times = OrderedDict()
+        start = time.time()
         execution_graph = self.execution_state.make_execution_graph(computation_op)
         computation_decl = execution_graph.computation_decl
+        compile_times['execution_graph'] = time.time() - start
+        start = time.time()
         self.run_registered_graph_passes(computation_decl=computation_decl)
+        compile_times['passes'] = time.time() - start
         ExecutionGraphTransformer.computation_count += 1
 
         device_computation = self.make_computation(computation_op)
@@ -460,6 +485,9 @@ class ExecutionGraphTransformer(Transformer):
         device_computation.computation_decl = computation_decl
         self.device_computations[computation_op] = device_computation
 
+        start = time.time()
         device_computation.executor = self.load_computation(computation_decl)
+        compile_times['codegen'] = time.time() - start
+        device_computation.compile_times = compile_times
 
         return device_computation
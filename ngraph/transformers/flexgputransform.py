@@ -19,6 +19,10 @@ from __future__ import division
 import numpy as np
 
 from ngraph.transformers.base import UnsupportedTransformerException
+# gputransform raises UnsupportedTransformerException when there is no GPU
+from ngraph.transformers.gputransform import GPUTransformer, GPUKernelGroup
+from ngraph.transformers.gputransform import GPUDeviceTensor, GPUDeviceBufferStorage
+from ngraph.transformers.gputransform import ElementWiseKernel
 from ngraph.transformers.gpu.flex_lut import FlexLUTBpropKernel
 from ngraph.transformers.passes.flexfusion import FlexFusion
 
@@ -30,9 +34,6 @@ except ImportError:
 from ngraph.op_graph.op_graph import Op, Fill, RngOp, TensorSizeOp, AssignOp
 from ngraph.op_graph.pooling import PoolingOp, BpropPoolOp
 from ngraph.op_graph.convolution import ConvolutionOp, bprop_conv, update_conv
-from ngraph.transformers.gputransform import GPUTransformer, GPUKernelGroup
-from ngraph.transformers.gputransform import GPUDeviceTensor, GPUDeviceBufferStorage
-from ngraph.transformers.gputransform import ElementWiseKernel
 from ngraph.transformers.gpu.flex_conv import FlexConvFpropKernel, FlexConvBpropKernel, \
     FlexConvUpdateKernel
 from ngraph.transformers.gpu.flex_pool import FlexPoolFpropKernel, FlexPoolBpropKernel
@@ -0,0 +1,430 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+"""
+Freezing of trained graphs for inference.
+
+Example:
+    Freeze the inference outputs of a model trained with transformer, then save them for
+    deployment:
+
+    with Layer.inference_mode_on():
+        inference_prob = model(inputs['image'])
+    ...train...
+    frozen_prob = freeze_for_inference(inference_prob, transformer)
+    graph = serialize_graph([frozen_prob], only_return_handle_ops=True)
+"""
+from __future__ import division
+from collections import defaultdict
+from contextlib import closing
+
+import numpy as np
+
+from ngraph.op_graph.convolution import ConvolutionOp
+from ngraph.op_graph.debug import PrintOp
+from ngraph.op_graph.op_graph import Add, AssignableTensorOp, BroadcastOp, ContiguousOp, \
+    ControlBlockOp, DotOp, Flatten, IndexOp, MapRolesOp, Multiply, Op, ReorderAxes, RngOp, \
+    SequentialOp, Subtract, TensorOp, TensorSliceOp, TensorValueOp, Unflatten, ValueOp, \
+    as_op, axes_with_order, broadcast, constant, make_axes
+from ngraph.op_graph.serde.serde import deserialize_graph, serialize_graph
+
+
+def freeze_for_inference(outputs, transformer=None, fold_constants=True, fold_batchnorm=True,
+                         transformer_factory='cpu'):
+    """
+    Makes an inference-only copy of a graph.
+
+    The outputs should be built for inference, e.g. inside Layer.inference_mode_on(). The
+    original graph is not modified, so training can continue with it.
+
+    The copy reads no variables: every persistent tensor that is neither a constant nor a
+    placeholder is replaced by a constant holding its current value, the assignments to those
+    tensors (optimizer updates, batchnorm statistics) are removed, and sequential ops left
+    with nothing to sequence are replaced by their values.
+
+    Arguments:
+        outputs: An Op, a list of Ops or a dict of Ops.
+        transformer: The transformer holding the trained values. If None, the initial
+            values of the variables are used.
+        fold_constants (bool): Evaluate subgraphs that only depend on constants once and
+            replace them by constants.
+        fold_batchnorm (bool): Fold per-channel scales and shifts, such as batchnorm in
+            inference mode, into the weights of the preceding convolution or dot.
+        transformer_factory (str): The transformer used to fold constants.
+
+    Returns:
+        The frozen outputs, in the same structure as outputs.
+    """
+    if isinstance(outputs, dict):
+        keys = list(outputs)
+        frozen = freeze_for_inference([outputs[key] for key in keys], transformer,
+                                      fold_constants, fold_batchnorm, transformer_factory)
+        return dict(zip(keys, frozen))
+    if isinstance(outputs, Op):
+        return freeze_for_inference([outputs], transformer, fold_constants, fold_batchnorm,
+                                    transformer_factory)[0]
+
+    outputs = [as_op(output).forwarded for output in outputs]
+    values = _variable_values(outputs, transformer)
+    frozen = _copy_graph(outputs)
+
+    variables = set(op.tensor for op in Op.ordered_ops(frozen) if _is_variable_read(op))
+    _strip_updates(frozen, variables)
+    frozen = [op.forwarded for op in frozen]
+    for op in Op.ordered_ops(frozen):
+        if _is_variable_read(op):
+            tensor = op.tensor
+            op.replace_self(as_op(constant(values.get(tensor.uuid, tensor.initial_value),
+                                           axes=tensor.axes, dtype=tensor.dtype)
+                                  .named(tensor.name)))
+    frozen = [op.forwarded for op in frozen]
+
+    if fold_constants:
+        fold_constant_subgraphs(frozen, transformer_factory)
+        frozen = [op.forwarded for op in frozen]
+    if fold_batchnorm:
+        fold_channel_affines(frozen)
+        frozen = [op.forwarded for op in frozen]
+
+    for op in _ordered_ops(frozen):
+        op.deriv_handler = None
+    return frozen
+
+
+def fold_constant_subgraphs(outputs, transformer_factory='cpu'):
+    """
+    Replaces each maximal subgraph that only depends on constants by a constant.
+
+    The subgraphs are evaluated once with a transformer. Views of constants, such as
+    broadcasts, are kept as views so the folded constants are no larger than their inputs.
+
+    Arguments:
+        outputs: A list of Ops. They may be forwarded.
+        transformer_factory (str): The transformer used to evaluate the subgraphs.
+
+    Returns:
+        The number of ops replaced by constants.
+    """
+    ops = _ordered_ops(outputs)
+    constants = set()
+    for op in ops:
+        if _is_foldable(op, constants):
+            constants.add(op)
+
+    consumers = _consumers(ops)
+    roots = set(op.forwarded for op in outputs)
+    folded = [op for op in ops
+              if op in constants and _computes(op) and
+              (op in roots or any(consumer not in constants or not _computes(consumer)
+                                  for consumer in consumers[op]))]
+    if not folded:
+        return 0
+
+    values = _evaluate(folded, transformer_factory)
+    for op in folded:
+        op.replace_self(as_op(constant(values[op.uuid], axes=op.axes, dtype=op.dtype)
+                              .named(op.name)))
+    return len(folded)
+
+
+def fold_channel_affines(outputs):
+    """
+    Folds per-channel scales into the weights of the convolution or dot that produces
+    their input.
+
+    A chain of adds, subtracts and multiplies by constants that only vary along channel axes
+    computes x * scale + shift. When x is a view of a convolution or dot with constant
+    weights, and nothing else uses it, the weights are scaled instead and the chain is
+    replaced by x + shift. Batchnorm in inference mode, and dropout, are such chains.
+
+    Arguments:
+        outputs: A list of Ops. They may be forwarded.
+
+    Returns:
+        The number of chains folded.
+    """
+    count = 0
+    while True:
+        ops = _ordered_ops(outputs)
+        consumers = _consumers(ops)
+        if not any(_fold_channel_affine(op, consumers) for op in reversed(ops)):
+            return count
+        count += 1
+
+
+def _ordered_ops(outputs):
+    """
+    Returns: The ordered ops of outputs, with their args updated to the forwarded ops.
+    """
+    ops = Op.ordered_ops(outputs)
+    for op in ops:
+        op.update_forwards()
+    return ops
+
+
+def _variable_values(outputs, transformer):
+    """
+    Returns: A dict from the uuids of the variables read by outputs to their values in
+        transformer.
+    """
+    variables = []
+    for op in Op.ordered_ops(outputs):
+        if _is_variable_read(op) and op.tensor not in variables:
+            variables.append(op.tensor)
+    if transformer is None or not variables:
+        return dict()
+    values = transformer.computation(variables)()
+    return {variable.uuid: np.array(value, copy=True)
+            for variable, value in zip(variables, values)}
+
+
+def _copy_graph(ops):
+    """
+    Copies the graph of ops by serializing it. The copies keep the uuids of the originals.
+
+    Returns:
+        The copies of ops, in the same order.
+    """
+    copies = {op.uuid: op for op in
+              deserialize_graph(serialize_graph(ops, only_return_handle_ops=True))}
+    return [copies[op.uuid] for op in ops]
+
+
+def _evaluate(ops, transformer_factory):
+    """
+    Computes ops on a copy of their graph, since transformers rewrite the graphs they compile.
+
+    Returns:
+        A dict from the uuids of ops to their values.
+    """
+    import ngraph.transformers as ngt
+
+    copies = _copy_graph(ops)
+    with closing(ngt.make_transformer_factory(transformer_factory)()) as transformer:
+        values = transformer.computation(copies)()
+    return {op.uuid: np.array(value, copy=True) for op, value in zip(ops, values)}
+
+
+def _is_variable_read(op):
+    if not isinstance(op, TensorValueOp):
+        return False
+    tensor = op.tensor
+    return isinstance(tensor, AssignableTensorOp) and tensor.is_persistent and \
+        not tensor.is_constant and not tensor.is_placeholder
+
+
+def _strip_updates(outputs, variables):
+    """
+    Removes the control dependencies that only update variables and then replaces sequential
+    ops with nothing left to sequence by their values.
+    """
+    ops = Op.ordered_ops(outputs)
+    for op in ops:
+        for dep in list(op.control_deps):
+            if isinstance(op, SequentialOp) and dep is op.value_tensor:
+                continue
+            if _only_updates(dep, variables):
+                op.remove_control_dep(dep)
+                if isinstance(op, SequentialOp):
+                    op._ops = [seq_op for seq_op in op.ops if seq_op.forwarded is not dep]
+
+    for op in ops:
+        if isinstance(op, SequentialOp) and op.control_deps <= {op.value_tensor}:
+            op.replace_self(as_op(op.value_tensor))
+
+
+def _only_updates(op, variables):
+    """
+    Returns: True if the only side effects of op and the ops it depends on are writes to
+        variables.
+    """
+    for dep in Op.ordered_ops([op]):
+        written = dep.states_written
+        if written:
+            if not all(state in variables for state in written):
+                return False
+        elif dep.has_side_effects:
+            return False
+    return True
+
+
+def _is_foldable(op, constants):
+    if isinstance(op, TensorValueOp):
+        return op.tensor.is_constant
+    if not isinstance(op, TensorOp) or isinstance(op, (ValueOp, ControlBlockOp, RngOp,
+                                                       PrintOp)):
+        return False
+    if not op.args or op.has_side_effects or op.states_written:
+        return False
+    return all(arg in constants for arg in op.args)
+
+
+def _computes(op):
+    """
+    Returns: True if op computes a new value rather than reading or viewing one.
+    """
+    return not isinstance(op, (TensorValueOp, IndexOp))
+
+
+def _consumers(ops):
+    consumers = defaultdict(list)
+    for op in ops:
+        for arg in op.args:
+            consumers[arg].append(op)
+    return consumers
+
+
+def _constant_value(op):
+    """
+    Returns: The axes and value of the constant that op broadcasts, or None if op is not a
+        broadcast constant.
+    """
+    while isinstance(op, BroadcastOp):
+        op = op.args[0]
+    if not isinstance(op, TensorValueOp):
+        return None
+    tensor = op.tensor
+    if not tensor.is_constant or tensor.const is None:
+        return None
+    return tensor.axes, np.asarray(tensor.const)
+
+
+def _align(value, axes, to_axes):
+    """
+    Transposes value from axes to the order of to_axes, adding length 1 dimensions for
+    the axes of to_axes not in axes, so it broadcasts against to_axes.
+    """
+    names = [axis.name for axis in axes]
+    order = [names.index(axis.name) for axis in to_axes if axis.name in names]
+    shape = [axis.length if axis.name in names else 1 for axis in to_axes]
+    return np.asarray(value).reshape([axis.length for axis in axes]).transpose(order) \
+        .reshape(shape)
+
+
+def _combine(x, y, fun):
+    x_axes, x_value = x
+    y_axes, y_value = y
+    axes = x_axes | y_axes
+    return axes, fun(_align(x_value, x_axes, axes), _align(y_value, y_axes, axes))
+
+
+def _channel_affine(op):
+    """
+    Finds base, scale and shift such that op computes base * scale + shift, where scale and
+    shift are constants that only vary along some axes of op.
+
+    Returns:
+        base, scale and shift, where scale and shift are (axes, value) tuples.
+    """
+    one = (make_axes(), np.float32(1))
+    zero = (make_axes(), np.float32(0))
+    if not isinstance(op, (Add, Subtract, Multiply)):
+        return op, one, zero
+
+    x, y = op.args
+    x_constant, y_constant = _constant_value(x), _constant_value(y)
+    if (x_constant is None) == (y_constant is None):
+        return op, one, zero
+
+    if x_constant is None:
+        base, scale, shift = _channel_affine(x)
+        if isinstance(op, Add):
+            return base, scale, _combine(shift, y_constant, np.add)
+        elif isinstance(op, Subtract):
+            return base, scale, _combine(shift, y_constant, np.subtract)
+        return base, _combine(scale, y_constant, np.multiply), \
+            _combine(shift, y_constant, np.multiply)
+
+    base, scale, shift = _channel_affine(y)
+    if isinstance(op, Add):
+        return base, scale, _combine(x_constant, shift, np.add)
+    elif isinstance(op, Subtract):
+        return base, _combine(scale, one, lambda s, _: -s), \
+            _combine(x_constant, shift, np.subtract)
+    return base, _combine(x_constant, scale, np.multiply), \
+        _combine(x_constant, shift, np.multiply)
+
+
+def _fold_channel_affine(op, consumers):
+    """
+    Folds the chain computing op into the weights of the producer of its base.
+
+    Returns:
+        True if op was folded.
+    """
+    base, (scale_axes, scale), (shift_axes, shift) = _channel_affine(op)
+    if base is op or np.all(scale == 1) or not base.axes.is_equal_set(op.axes):
+        return False
+    channel_axes = scale_axes | shift_axes
+
+    # Walk down views that keep the channel axes to the producer.
+    names = [axis.name for axis in channel_axes]
+    producer = base
+    while True:
+        if len(consumers[producer]) != 1:
+            return False
+        if not all(name in producer.axes.names for name in names):
+            return False
+        if not isinstance(producer, (Flatten, Unflatten, ReorderAxes, ContiguousOp,
+                                     TensorSliceOp, MapRolesOp)):
+            break
+        arg = producer.args[0]
+        if isinstance(producer, MapRolesOp):
+            inverse = producer.axes_map.invert()
+            names = [inverse.get(name, name) for name in names]
+        if not all(name in arg.axes.names and
+                   arg.axes.find_by_name(name)[0].length == axis.length
+                   for name, axis in zip(names, channel_axes)):
+            return False
+        producer = arg
+
+    if isinstance(producer, ConvolutionOp) and len(producer.args) == 2:
+        weights = producer.args[1]
+        if len(names) != 1 or producer.axes[0].name != names[0]:
+            return False
+        # The output channels of a convolution are the last axis of its filters.
+        weight_axes = [weights.axes[-1]]
+    elif isinstance(producer, DotOp) and producer.bias is None:
+        if _constant_value(producer.args[0]) is not None:
+            weights, out_axes = producer.args[0], producer.x_out_axes
+        else:
+            weights, out_axes = producer.args[1], producer.y_out_axes
+        if not all(name in out_axes.names for name in names):
+            return False
+        weight_axes = [weights.axes.find_by_name(name)[0] for name in names]
+    else:
+        return False
+    if not isinstance(weights, TensorValueOp) or _constant_value(weights) is None or \
+            len(consumers[weights]) != 1:
+        return False
+
+    # The channel axes may be renamed below the chain, so weight_axes matches channel_axes
+    # by position.
+    _, weight_value = _constant_value(weights)
+    weight_scale = np.broadcast_to(_align(scale, scale_axes, channel_axes), channel_axes.lengths)
+    weight_scale = _align(weight_scale, make_axes(weight_axes), weights.axes)
+    weights.replace_self(as_op(constant(weight_value * weight_scale, axes=weights.axes,
+                                        dtype=weights.dtype).named(weights.tensor.name)))
+
+    result = base
+    if np.any(shift != 0):
+        shift = np.broadcast_to(_align(shift, shift_axes, channel_axes), channel_axes.lengths)
+        shift = constant(shift, axes=channel_axes,
+                         dtype=op.dtype).named(op.name + '_shift')
+        result = base + broadcast(shift, base.axes)
+    if result.axes.names != op.axes.names:
+        result = axes_with_order(result, op.axes)
+    op.replace_self(result)
+    return True
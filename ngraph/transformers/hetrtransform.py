@@ -24,6 +24,7 @@ from ngraph.transformers.base import Computation
 from ngraph.transformers.base import ComputationGraphTransformer
 from ngraph.transformers.base import make_transformer_factory
 from ngraph.transformers.hetr.mpilauncher import MPILauncher
+from ngraph.transformers.passes.cse import CommonSubexpressionElimination
 from ngraph.transformers.passes.hetrpasses import CommunicationPass
 from ngraph.transformers.passes.hetrpasses import DeviceAssignPass
 from ngraph.transformers.passes.hetrpasses import AxesUpdatePass
@@ -212,7 +213,8 @@ class HetrTransformer(ComputationGraphTransformer):
         self.is_closed = False
         self.child_transformers = dict()
         self.send_nodes = OrderedSet()
-        self.graph_passes = [DeviceAssignPass(hetr=self,
+        self.graph_passes = [CommonSubexpressionElimination(),
+                             DeviceAssignPass(hetr=self,
                                               default_device=device,
                                               default_device_id=0),
                              CommunicationPass(self.send_nodes),
@@ -0,0 +1,179 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+"""
+Memory reports for computations compiled by an execution graph transformer.
+
+Example:
+    Report on a graph saved with ngraph.op_graph.serde.serde.serialize_graph:
+
+    python -m ngraph.transformers.memreport graph.pb --format json --top 20
+"""
+from __future__ import division, print_function
+from collections import OrderedDict
+import argparse
+import json
+import sys
+
+
+class MemoryReport(object):
+    """
+    Memory use of a compiled computation, from the liveness and memory layout passes.
+
+    Arguments:
+        computation_decl: The ComputationDecl of a loaded computation.
+        top (int): The number of largest tensors live at the peak to report.
+
+    Attributes:
+        temporary_bytes: Size of the temporary pool.
+        persistent_bytes: Size of the persistent pool.
+        worst_case_bytes: Size of the temporaries if none shared memory.
+        timeline: For each exop, in execution order, the bytes of the live temporaries
+            (usage) and the end of the highest one in the pool (footprint).
+        peak: The timeline entry with the most live bytes.
+        peak_tensors: The largest temporaries live at the peak.
+        fragmentation: Fraction of the temporary pool not used by live tensors at the peak.
+    """
+
+    def __init__(self, computation_decl, top=10):
+        exop_block = computation_decl.exop_block
+        self.computation = computation_decl.computation_op.name
+        self.temporary_bytes = computation_decl.temporary_max_allocated
+        self.persistent_bytes = computation_decl.persistent_max_allocated
+        self.worst_case_bytes = exop_block.worst_case_footprint()
+        self.efficiency = exop_block.memory_efficiency()
+
+        exops = list(exop_block)
+        self.timeline = [OrderedDict([('index', index),
+                                      ('exop', exop.name),
+                                      ('op', type(exop.op).__name__),
+                                      ('usage', exop.memory_usage()),
+                                      ('footprint', exop.memory_footprint()),
+                                      ('live', len(exop.liveness_live_list))])
+                         for index, exop in enumerate(exops)]
+
+        self.peak = None
+        self.peak_tensors = []
+        self.fragmentation = 0.0
+        if exops:
+            self.peak = max(self.timeline, key=lambda entry: entry['usage'])
+            exop = exops[self.peak['index']]
+            live = sorted(exop.liveness_live_list, key=lambda x: -x.size)
+            self.peak_tensors = [OrderedDict([('tensor', tensor_decl.tensor_name),
+                                              ('op', None if tensor_decl.op is None
+                                               else tensor_decl.op.name),
+                                              ('shape', list(tensor_decl.tensor_description_base
+                                                             .shape)),
+                                              ('dtype', tensor_decl.element_type.dtype.name),
+                                              ('bytes', tensor_decl.size),
+                                              ('offset', tensor_decl.buffer_pool_offset)])
+                                 for tensor_decl in live[:top]]
+            if self.temporary_bytes:
+                self.fragmentation = 1 - self.peak['usage'] / self.temporary_bytes
+
+    def as_dict(self):
+        """
+        Returns: The report as a dict that can be written as JSON.
+        """
+        return OrderedDict([('computation', self.computation),
+                            ('temporary_bytes', self.temporary_bytes),
+                            ('persistent_bytes', self.persistent_bytes),
+                            ('worst_case_bytes', self.worst_case_bytes),
+                            ('efficiency', self.efficiency),
+                            ('fragmentation', self.fragmentation),
+                            ('peak', self.peak),
+                            ('peak_tensors', self.peak_tensors),
+                            ('timeline', self.timeline)])
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def to_text(self):
+        lines = ['Memory report for {}'.format(self.computation),
+                 '  persistent pool    {:>16,} bytes'.format(self.persistent_bytes),
+                 '  temporary pool     {:>16,} bytes'.format(self.temporary_bytes),
+                 '  without reuse      {:>16,} bytes'.format(self.worst_case_bytes),
+                 '  fragmentation      {:>16.1%}'.format(self.fragmentation)]
+        if self.peak is not None:
+            lines.append('  peak at exop {index} {exop} ({op}), {usage:,} bytes live'
+                         .format(**self.peak))
+            lines.append('')
+            lines.append('  {:<40} {:>16} {:>16}  {}'.format('tensor', 'bytes', 'offset',
+                                                             'shape'))
+            for tensor in self.peak_tensors:
+                lines.append('  {:<40} {:>16,} {:>16,}  {}'.format(
+                    tensor['tensor'], tensor['bytes'], tensor['offset'], tensor['shape']))
+        lines.append('')
+        lines.append('  {:>6} {:<40} {:>16} {:>16}'.format('index', 'exop', 'usage',
+                                                           'footprint'))
+        for entry in self.timeline:
+            lines.append('  {index:>6} {exop:<40} {usage:>16,} {footprint:>16,}'
+                         .format(**entry))
+        return '\n'.join(lines)
+
+    def dump(self, file=None, format='text'):
+        """
+        Writes the report.
+
+        Arguments:
+            file: A file object, defaults to stdout.
+            format (str): 'text' or 'json'.
+        """
+        if file is None:
+            file = sys.stdout
+        if format == 'json':
+            file.write(self.to_json(indent=2))
+        elif format == 'text':
+            file.write(self.to_text())
+        else:
+            raise ValueError("Unknown memory report format {}, expected text or json"
+                             .format(format))
+        file.write('\n')
+
+    def __str__(self):
+        return self.to_text()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report the memory use of a computation')
+    parser.add_argument('graph',
+                        help='graph serialized with serialize_graph(returns, '
+                             'only_return_handle_ops=True)')
+    parser.add_argument('--transformer', default='cpu', help='transformer to compile with')
+    parser.add_argument('--format', default='text', choices=['text', 'json'])
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of largest tensors at the peak to report')
+    parser.add_argument('--output', default=None, help='file to write, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    from contextlib import closing
+    import ngraph as ng
+    import ngraph.transformers as ngt
+    from ngraph.op_graph.serde.serde import deserialize_graph
+
+    with open(args.graph, 'rb') as f:
+        returns = deserialize_graph(f.read())
+    computation_op = ng.computation(returns, 'all')
+    with closing(ngt.make_transformer_factory(args.transformer)()) as transformer:
+        report = transformer.add_computation(computation_op).memory_report(top=args.top)
+    if args.output is None:
+        report.dump(format=args.format)
+    else:
+        with open(args.output, 'w') as f:
+            report.dump(f, format=args.format)
+
+
+if __name__ == '__main__':
+    main()
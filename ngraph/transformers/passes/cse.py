@@ -0,0 +1,148 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from __future__ import division
+import numbers
+
+import numpy as np
+from orderedset import OrderedSet
+
+from ngraph.op_graph.axes import Axes, Axis, FlattenedAxis
+from ngraph.op_graph.comm_nodes import CommunicationOp, ResultOp
+from ngraph.op_graph.op_graph import Op, TensorOp, TensorValueOp, ValueOp, ControlBlockOp, \
+    RngOp
+from ngraph.transformers.passes.opdelegate import OpGraphOpAccessor
+from ngraph.transformers.passes.passes import ProcessOpGraphPass
+
+
+class _Unhashable(Exception):
+    pass
+
+
+class CommonSubexpressionElimination(ProcessOpGraphPass):
+    """
+    Replaces ops that compute the same value as an earlier op by the earlier op.
+
+    Two ops compute the same value when they have the same type, the same (already
+    deduplicated) args, axes and dtype, and the same attributes. Commutative ops match with
+    their args in any order.
+
+    Ops with side effects, ops that write or communicate state, random ops and ops with
+    control dependencies are never merged. Reads of constants and placeholders are merged.
+    Reads of other state are only merged in an execution graph, and only when nothing in the
+    computation writes that state, since reads on either side of a write see different
+    values; replacements in the op-graph are seen by every computation using it. The ops
+    passed to an op-graph pass are kept, since callers look up their results by op.
+
+    Attributes:
+        eliminated: The number of ops replaced by the last run of the pass.
+    """
+    # Attributes that name, identify or sequence an op rather than describe its value
+    ignored_attributes = {'_NameableValue__name', '_ScopedNameableValue__scope', '__doc__',
+                          '_args', '_control_deps', '_deriv_handler', '_forward', 'all_deps',
+                          'call_info', 'graph_label_type', 'metadata', 'style', 'uuid',
+                          '_const', '_is_persistent', '_is_trainable', '_registered_op_references'}
+    # Metadata that places an op, used by hetr
+    placement_metadata = ('device', 'device_id', 'parallel')
+
+    def __init__(self, **kwargs):
+        super(CommonSubexpressionElimination, self).__init__(**kwargs)
+        self.eliminated = 0
+        self.states_written = set()
+        self.canonical_ops = dict()
+        self.available = dict()
+        self.merge_state_reads = False
+        self.roots = set()
+
+    def do_pass(self, **kwargs):
+        self.eliminated = 0
+        self.states_written = set()
+        self.canonical_ops = dict()
+        self.available = dict()
+        self.merge_state_reads = not isinstance(self.op_accessor, OpGraphOpAccessor)
+        self.roots = set(kwargs.get('ops', ()))
+        self.run_pass(self.collect_states_written, **kwargs)
+        self.run_pass(self.process_op, **kwargs)
+
+    def collect_states_written(self, op):
+        self.states_written.update(op.states_written)
+
+    def process_op(self, op):
+        key = self.op_key(op)
+        if key is None:
+            return
+        available = self.available.setdefault(key, op)
+        if available is not op and op not in self.roots:
+            self.canonical_ops[op] = available
+            self.replace_op(op, available)
+            self.eliminated += 1
+
+    def canonical_op(self, op):
+        return self.canonical_ops.get(op, op)
+
+    def is_mergeable(self, op):
+        if not isinstance(op, TensorOp) or op.control_deps:
+            return False
+        if isinstance(op, TensorValueOp):
+            tensor = op.tensor
+            if tensor.is_constant or tensor.is_placeholder:
+                return True
+            return self.merge_state_reads and tensor not in self.states_written
+        if isinstance(op, (ValueOp, ControlBlockOp, RngOp, CommunicationOp, ResultOp)):
+            return False
+        return not (op.has_side_effects or op.states_written)
+
+    def op_key(self, op):
+        """
+        Returns:
+            A hashable key that is the same for ops that compute the same value, or None if
+            op should not be merged.
+        """
+        if op in self.canonical_ops or not self.is_mergeable(op):
+            return None
+        args = tuple(id(self.canonical_op(arg)) for arg in self.op_args(op))
+        if op.is_commutative:
+            args = tuple(sorted(args))
+        try:
+            attributes = tuple(sorted((name, self.hashable(value))
+                                      for name, value in op.__dict__.items()
+                                      if name not in self.ignored_attributes))
+            placement = tuple((name, self.hashable(op.metadata.get(name)))
+                              for name in self.placement_metadata)
+        except (_Unhashable, TypeError):
+            return None
+        return type(op), args, attributes, placement
+
+    def hashable(self, value):
+        if value is None or isinstance(value, (bool, numbers.Number, str, bytes, np.dtype)):
+            return value
+        if isinstance(value, Op):
+            return 'op', id(self.canonical_op(value.forwarded))
+        if isinstance(value, FlattenedAxis):
+            return 'flattened', self.hashable(value.axes)
+        if isinstance(value, Axis):
+            return 'axis', value.name, value.length
+        if isinstance(value, Axes):
+            return 'axes', tuple(self.hashable(axis) for axis in value)
+        if isinstance(value, np.ndarray):
+            return 'array', value.dtype.str, value.shape, value.tobytes()
+        if isinstance(value, slice):
+            return 'slice', value.start, value.stop, value.step
+        if isinstance(value, dict):
+            return 'dict', tuple(sorted((key, self.hashable(item))
+                                        for key, item in value.items()))
+        if isinstance(value, (list, tuple, OrderedSet)):
+            return type(value).__name__, tuple(self.hashable(item) for item in value)
+        raise _Unhashable()
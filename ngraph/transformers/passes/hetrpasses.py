@@ -13,17 +13,23 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ******************************************************************************
+from __future__ import division
+import collections
+import logging
 import socket
 
+import numpy as np
 from orderedset import OrderedSet
 
 from ngraph.factory.comm_node_factory import get_comm_pattern, CommNodePair
-from ngraph.op_graph.op_graph import Op, TensorValueOp
-from ngraph.op_graph.comm_nodes import RecvOp
-from ngraph.transformers.passes.passes import GraphBuildingPass
+from ngraph.op_graph.op_graph import Op, TensorValueOp, ReturnOp
+from ngraph.op_graph.comm_nodes import RecvOp, CPUMlslAllReduceStartOp, CPUMlslAllReduceWaitOp
+from ngraph.transformers.passes.passes import GraphBuildingPass, GraphPass
 from ngraph.op_graph.axes import make_axis
 from ngraph.transformers.hetr.hetr_utils import update_parallel_axis
 
+logger = logging.getLogger(__name__)
+
 
 class DeviceAssignPass(GraphBuildingPass):
 
@@ -121,3 +127,179 @@ class AxesUpdatePass(GraphBuildingPass):
                         docstring='HeTr parallel axis')
                 gather_send_op = op.send_node()
                 update_parallel_axis(gather_send_op, self.parallel_axis)
+
+
+def writes_tensor(exop, tensor_decl):
+    return any(decl.tensor_decl is tensor_decl for decl in exop.output_decls) or \
+        any(decl.tensor_decl is tensor_decl for decl in exop.write_args)
+
+
+class AllReduceScheduling(GraphPass):
+    """
+    Overlaps allreduce communication with computation.
+
+    Each allreduce start is hoisted to just after the exop that produces its input, and each
+    wait is sunk to just before the first exop that reads the reduced value, depends on the
+    wait, or overwrites the input while the collective may still be reading it. Starts and
+    waits keep their order relative to each other, so buckets still launch in backprop order.
+
+    A wait reads the input of its allreduce and the reduced value is read by its consumers,
+    so the liveness analysis that follows keeps both buffers allocated while the collective
+    is in flight. The pass must run after the exops are scheduled and before the final
+    liveness analysis.
+
+    The number of exops between the start and the wait of each allreduce is stored in
+    computation_decl.allreduce_overlap, by name of the reduced tensor.
+    """
+
+    def do_pass(self, computation_decl, **kwargs):
+        exop_block = computation_decl.exop_block
+        starts = [exop for exop in exop_block if isinstance(exop.op, CPUMlslAllReduceStartOp)]
+        waits = [exop for exop in exop_block if isinstance(exop.op, CPUMlslAllReduceWaitOp)]
+
+        for exop in starts:
+            self.hoist_start(exop_block, exop)
+        start_exops = {exop.op: exop for exop in starts}
+        for exop in reversed(waits):
+            self.sink_wait(exop_block, exop, start_exops[self.start_op(exop.op)])
+
+        positions = {exop: i for i, exop in enumerate(exop_block)}
+        computation_decl.allreduce_overlap = collections.OrderedDict()
+        for exop in waits:
+            start_exop = start_exops[self.start_op(exop.op)]
+            name = start_exop.op.args[0].name
+            window = positions[exop] - positions[start_exop] - 1
+            computation_decl.allreduce_overlap[name] = window
+            logger.debug("allreduce of %s overlaps %d exops", name, window)
+
+    @staticmethod
+    def start_op(wait_op):
+        return next(dep for dep in wait_op.control_deps
+                    if isinstance(dep, CPUMlslAllReduceStartOp))
+
+    def hoist_start(self, exop_block, exop):
+        tensor_decl = exop.input_decls[0].tensor_decl
+        prev = exop.prev_exop
+        while not prev.is_exop_end_of_list:
+            if writes_tensor(prev, tensor_decl) or \
+                    isinstance(prev.op, CPUMlslAllReduceStartOp):
+                break
+            prev = prev.prev_exop
+        if prev is not exop.prev_exop:
+            exop_block.move_exop_to_after_exop(exop, prev)
+
+    def sink_wait(self, exop_block, exop, start_exop):
+        input_tensor_decl = start_exop.input_decls[0].tensor_decl
+        values = set(decl.tensor_decl for decl in start_exop.output_decls + exop.output_decls)
+        next_exop = exop.next_exop
+        while not next_exop.is_exop_end_of_list:
+            if isinstance(next_exop.op, (ReturnOp, CPUMlslAllReduceWaitOp)) or \
+                    exop.op in next_exop.op.control_deps or \
+                    any(decl.tensor_decl in values for decl in next_exop.input_decls) or \
+                    writes_tensor(next_exop, input_tensor_decl):
+                break
+            next_exop = next_exop.next_exop
+        if next_exop is not exop.next_exop:
+            exop_block.move_exop_to_after_exop(exop, next_exop.prev_exop)
+
+
+class AllReduceBucket(object):
+    """
+    A group of allreduce ops that share one collective over a contiguous buffer.
+
+    Each start op copies its tensor into its region of the buffer, and the last one launches
+    the collective on the whole buffer. Each wait op waits for the collective and copies its
+    region out.
+
+    Arguments:
+        reduce_func: The reduction function of all the ops.
+
+    Attributes:
+        members: The start ops, in execution order.
+        offsets: The offset of the region of each start op, in elements.
+        size: The size of the buffer in elements.
+        buffer: The buffer, allocated by the first start.
+        req: The request of the collective in flight.
+    """
+
+    def __init__(self, reduce_func):
+        self.reduce_func = reduce_func
+        self.members = []
+        self.offsets = dict()
+        self.size = 0
+        self.buffer = None
+        self.req = None
+
+    def add(self, op):
+        self.members.append(op)
+        self.offsets[op] = self.size
+        self.size += op.axes.size
+        op.bucket = self
+
+    def is_last(self, op):
+        return op is self.members[-1]
+
+    def region(self, op, shape):
+        start = self.offsets[op]
+        return self.buffer[start:start + op.axes.size].reshape(shape)
+
+    def pack(self, op, x):
+        self.region(op, x.shape)[()] = x
+
+    def unpack(self, op, out):
+        out[()] = self.region(op, out.shape)
+
+
+class AllReduceBucketing(GraphPass):
+    """
+    Groups the allreduce ops of a computation into buckets that are reduced with one
+    collective each, so that models with many small gradients are not bound by the latency of
+    one collective per gradient.
+
+    Start ops are packed in execution order, which is the order in which backprop produces the
+    gradients. A bucket is closed when adding the next start would exceed bucket_size bytes,
+    or when a wait of the bucket runs before the next start, since the collective is only
+    launched by the last start of a bucket. Ops that end up alone in a bucket are left as is.
+
+    The pass only annotates the ops, so it can run after the exops are scheduled.
+
+    Arguments:
+        bucket_size (int): The maximum size of a bucket in bytes.
+    """
+
+    default_bucket_size = 4 * 1024 * 1024
+
+    def __init__(self, bucket_size, **kwargs):
+        super(AllReduceBucketing, self).__init__(**kwargs)
+        self.bucket_size = bucket_size
+
+    def do_pass(self, computation_decl, **kwargs):
+        starts = []
+        wait_positions = dict()
+        for position, exop in enumerate(computation_decl.exop_block):
+            op = exop.op
+            if isinstance(op, CPUMlslAllReduceStartOp):
+                starts.append((position, op))
+            elif isinstance(op, CPUMlslAllReduceWaitOp):
+                start_op = next(dep for dep in op.control_deps
+                                if isinstance(dep, CPUMlslAllReduceStartOp))
+                wait_positions[start_op] = position
+
+        itemsize = np.dtype(np.float32).itemsize
+        buckets = []
+        bucket = None
+        for position, op in starts:
+            if np.dtype(op.dtype) != np.float32:
+                continue
+            if bucket is None or \
+                    (bucket.size + op.axes.size) * itemsize > self.bucket_size or \
+                    bucket.reduce_func != op.reduce_func or \
+                    any(wait_positions.get(member, position) < position
+                        for member in bucket.members):
+                bucket = AllReduceBucket(op.reduce_func)
+                buckets.append(bucket)
+            bucket.add(op)
+
+        for bucket in buckets:
+            if len(bucket.members) == 1:
+                bucket.members[0].bucket = None
@@ -24,6 +24,36 @@ from ngraph.transformers.passes.passes import GraphPass
 
 
 class MemLayoutPass(GraphPass):
+    """
+    Assigns offsets in the temporary and persistent pools to tensors.
+
+    Arguments:
+        memmap (bool): Leave persistent tensors whose op has the memmap metadata out of the
+            persistent pool and mark them is_memmapped, for a transformer that stores them in
+            memory-mapped files.
+        memmap_threshold (int): If memmap, also memory-map persistent tensors of at least this
+            many bytes.
+    """
+    def __init__(self, memmap=False, memmap_threshold=None, **kwargs):
+        super(MemLayoutPass, self).__init__(**kwargs)
+        self.memmap = memmap
+        self.memmap_threshold = memmap_threshold
+
+    def is_memmapped(self, tensor_decl):
+        if not self.memmap or tensor_decl.is_compile_only:
+            return False
+        op = tensor_decl.tensor_description_base.op
+        if op is not None and op.metadata.get('memmap', False):
+            return True
+        return self.memmap_threshold is not None and tensor_decl.size >= self.memmap_threshold
+
+    def allocate_persistent(self, pmm, tensor_decl):
+        if tensor_decl.is_persistent and tensor_decl.buffer_pool_offset is None and \
+                not tensor_decl.is_memmapped:
+            tensor_decl.is_memmapped = self.is_memmapped(tensor_decl)
+            if not tensor_decl.is_memmapped:
+                tensor_decl.buffer_pool_offset = pmm.allocate(tensor_decl.size)
+
     def do_pass(self, computation_decl, **kwargs):
         self.exop_block = computation_decl.exop_block
         self.byte_alignment = computation_decl.execution_graph.execution_state \
@@ -45,15 +75,9 @@ class MemLayoutPass(GraphPass):
         pmm = MemoryManager(self.byte_alignment)
         for exop in self.exop_block:
             for input_decl in exop.input_decls:
-                if input_decl.source_output_decl.tensor_decl.is_persistent and \
-                        input_decl.source_output_decl.tensor_decl.buffer_pool_offset is None:
-                    input_decl.source_output_decl.tensor_decl.buffer_pool_offset = \
-                        pmm.allocate(input_decl.source_output_decl.tensor_decl.size)
+                self.allocate_persistent(pmm, input_decl.source_output_decl.tensor_decl)
             for output_decl in exop.output_decls:
-                if output_decl.tensor_decl.is_persistent and \
-                        output_decl.tensor_decl.buffer_pool_offset is None:
-                    output_decl.tensor_decl.buffer_pool_offset = \
-                        pmm.allocate(output_decl.tensor_decl.size)
+                self.allocate_persistent(pmm, output_decl.tensor_decl)
 
         computation_decl.persistent_max_allocated = pmm.max_allocated()
 
@@ -150,6 +174,9 @@ class MemLayoutPass(GraphPass):
         return mm.max_allocated()
 
     def test_memory_overlap(self):
+        """
+        Raises RuntimeError if two different tensors live at the same exop share memory.
+        """
         for i, node in enumerate(self.exop_block):
             for tensor1 in node.liveness_live_list:
                 for tensor2 in node.liveness_live_list:
@@ -158,22 +185,13 @@ class MemLayoutPass(GraphPass):
                         t2_start = tensor2.buffer_pool_offset
                         t1_end = t1_start + tensor1.size
                         t2_end = t2_start + tensor2.size
-                        if t1_start < t2_start:
-                            if t1_end > t2_start:
-                                print('{} {}'.format(i, node.name))
-                                print('   overlap {} at {} and {} at {}'.format(
-                                    tensor1.size,
-                                    tensor1.buffer_pool_offset,
-                                    tensor2.size,
-                                    tensor2.buffer_pool_offset))
-                        else:
-                            if t2_end > t1_start:
-                                print('{} {}'.format(i, node.name))
-                                print('   overlap {} at {} and {} at {}'.format(
-                                    tensor1.size,
-                                    tensor1.buffer_pool_offset,
-                                    tensor2.size,
-                                    tensor2.buffer_pool_offset))
+                        if t1_start < t2_end and t2_start < t1_end:
+                            raise RuntimeError('Error: {} {} - overlap {} at {} and {} at {}'
+                                               .format(i, node.name,
+                                                       tensor1.size,
+                                                       tensor1.buffer_pool_offset,
+                                                       tensor2.size,
+                                                       tensor2.buffer_pool_offset))
 
 
 class MemoryNode(object):
@@ -15,9 +15,10 @@
 # ******************************************************************************
 
 from ngraph.transformers.exop import ExOpBlock
-from ngraph.op_graph.op_graph import WriteOp, ReadOp
+from ngraph.op_graph.op_graph import ElementWiseOp, WriteOp, ReadOp
 from ngraph.op_graph.ctc import CTCOp
 from ngraph.transformers.passes.passes import GraphPass
+from ngraph.transformers.passes.reducedprecision import ToStorageOp, FromStorageOp
 from ngraph.op_graph.comm_nodes import CommunicationOp
 
 
@@ -91,6 +92,9 @@ class MemOptimizePass(GraphPass):
                 pass
             elif isinstance(exop.op, CTCOp):
                 pass
+            elif isinstance(exop.op, (ToStorageOp, FromStorageOp)):
+                # Already placed next to the producer or user of the value
+                pass
             else:
                 for tensor in exop.liveness_new_list:
                     if tensor.is_persistent is False:
@@ -127,3 +131,189 @@ class MemOptimizePass(GraphPass):
 
         for op_to_move in persistent_ops:
             move_op(exop_block, op_to_move)
+
+
+def is_temporary(tensor_decl):
+    return not (tensor_decl.is_persistent or tensor_decl.is_input or tensor_decl.is_output or
+                tensor_decl.is_constant or tensor_decl.is_compile_only)
+
+
+def is_previous_value(tensor_decl):
+    """
+    Returns:
+        True if tensor_decl is a temporary, or one of the values SSAConversion makes for the
+        assignments to a tensor, rather than the tensor itself.
+    """
+    return is_temporary(tensor_decl) or tensor_decl.source_tensor is not tensor_decl
+
+
+def same_layout(tensor_description, other):
+    return tensor_description.dtype == other.dtype and \
+        tensor_description.shape == other.shape and \
+        tensor_description.strides == other.strides and \
+        tensor_description.offset == other.offset
+
+
+class InPlaceBufferSharing(GraphPass):
+    """
+    Lets elementwise exops write their output over an input that is not used afterwards.
+
+    An elementwise exop reads each element of its inputs only to compute the same element
+    of its output, so when an input dies at the exop and is read with the same layout as
+    the output is written, the output can be written to the input's buffer. In the same
+    way, an elementwise value that is only used to assign a persistent tensor is written
+    directly to that tensor, unless the tensor is used before the assignment. The codegen
+    already writes elementwise results with out=, so a shared buffer makes the call operate
+    in place.
+
+    A partial assignment copies the previous value of its tensor before writing the assigned
+    region. When the previous value is a temporary that is not used afterwards, the
+    assignment is written over it instead, so a chain of partial assignments to one tensor
+    only copies the tensor once rather than once for each assignment.
+
+    Attributes:
+        outputs_shared: The number of outputs given the buffer of an input by the last run.
+        assignments_shared: The number of assigned values written directly to their tensor
+            by the last run.
+        previous_values_shared: The number of partial assignments written over the previous
+            value of their tensor by the last run.
+    """
+    def do_pass(self, computation_decl, **kwargs):
+        self.computation_decl = computation_decl
+        assert isinstance(computation_decl.exop_block, ExOpBlock)
+        self.outputs_shared = 0
+        self.assignments_shared = 0
+        self.previous_values_shared = 0
+
+        self.exops = list(computation_decl.exop_block)
+        self.collect_uses()
+        for index, exop in enumerate(self.exops):
+            if isinstance(exop.op, WriteOp):
+                self.share_assignments(index, exop)
+        self.collect_uses()
+        for index, exop in enumerate(self.exops):
+            if isinstance(exop.op, WriteOp):
+                self.share_previous_value(index, exop)
+        self.collect_uses()
+        for index, exop in enumerate(self.exops):
+            if isinstance(exop.op, ElementWiseOp):
+                self.share_input(index, exop)
+
+    def collect_uses(self):
+        self.last_use = dict()
+        for index, exop in enumerate(self.exops):
+            for input_decl in exop.input_decls:
+                self.last_use[input_decl.tensor_decl] = index
+
+    def is_shareable(self, tensor_view_decl):
+        return getattr(tensor_view_decl, 'mkl_layout', None) is None
+
+    def output_decls(self, tensor_decl):
+        """
+        Returns:
+            The outputs written to tensor_decl, including the views left by IndexElision,
+            which are not in the output_decls of their exop.
+        """
+        return [output_decl
+                for tensor_view_decl in tensor_decl.tensor_view_decls.values()
+                for output_decl in tensor_view_decl.writers
+                if output_decl.tensor_decl is tensor_decl]
+
+    def only_written_by(self, tensor_decl, exop):
+        return all(output_decl.exop is exop for output_decl in self.output_decls(tensor_decl))
+
+    def share_input(self, index, exop):
+        if not exop.output_decls:
+            return
+        output_decl = exop.output_decls[0]
+        output = output_decl.tensor_decl
+        if not (is_temporary(output) and self.only_written_by(output, exop) and
+                self.is_shareable(output_decl.tensor_view_decl)):
+            return
+        for input_decl in exop.input_decls:
+            tensor_decl = input_decl.tensor_decl
+            if tensor_decl is output or not is_temporary(tensor_decl) or \
+                    self.last_use.get(tensor_decl) != index:
+                continue
+            same_tensor_inputs = [other for other in exop.input_decls
+                                  if other.tensor_decl is tensor_decl]
+            if all(same_layout(other.tensor_description, output_decl.tensor_description) and
+                   self.is_shareable(other.tensor_view_decl) for other in same_tensor_inputs):
+                self.merge_tensor(output, tensor_decl)
+                self.outputs_shared += 1
+                return
+
+    def share_assignments(self, index, write_exop):
+        for write_arg, input_decl in zip(write_exop.write_args, write_exop.input_decls):
+            value_decl = input_decl.source_output_decl
+            exop = value_decl.exop
+            value = value_decl.tensor_decl
+            tensor_decl = write_arg.tensor_decl
+            if not (isinstance(exop.op, ElementWiseOp) and is_temporary(value) and
+                    self.output_decls(value) == [value_decl] and
+                    value_decl.user_input_decls == {input_decl} and
+                    same_layout(write_arg.tensor_description, value_decl.tensor_description) and
+                    self.is_shareable(write_arg.tensor_view_decl) and
+                    self.is_shareable(value_decl.tensor_view_decl)):
+                continue
+            # Other writes of the exop to the tensor, such as the copy of its previous value
+            # before a partial assignment, would overwrite the value
+            if not tensor_decl.is_persistent or \
+                    [other.tensor_decl for other in write_exop.write_args].count(tensor_decl) > 1:
+                continue
+            if any(other.tensor_decl is tensor_decl for other in write_exop.input_decls):
+                continue
+            # The value's exop may update the tensor in place, but nothing else may use the
+            # tensor until it is written
+            if any(other.tensor_decl is tensor_decl and
+                   not same_layout(other.tensor_description, value_decl.tensor_description)
+                   for other in exop.input_decls):
+                continue
+            start = self.exops.index(exop)
+            if any(other.tensor_decl is tensor_decl
+                   for between in self.exops[start + 1:index]
+                   for other in list(between.input_decls) + list(between.write_args)):
+                continue
+            value_decl.tensor_description = write_arg.tensor_description
+            value_decl.tensor_decl = tensor_decl
+            self.assignments_shared += 1
+
+    def share_previous_value(self, index, write_exop):
+        # A partial assignment first writes its whole output from the previous value of the
+        # tensor, then the assigned region
+        if not write_exop.output_decls or len(write_exop.write_args) < 2:
+            return
+        output = write_exop.output_decls[0].tensor_decl
+        copy_arg, previous_decl = write_exop.write_args[0], write_exop.input_decls[0]
+        previous = previous_decl.tensor_decl
+        if previous is output or copy_arg.tensor_decl is not output or \
+                not (is_previous_value(output) and is_previous_value(previous)) or \
+                self.last_use.get(previous) != index or \
+                not self.only_written_by(output, write_exop):
+            return
+        if any(input_decl.tensor_decl is previous for input_decl in write_exop.input_decls[1:]):
+            return
+        if not (same_layout(copy_arg.tensor_description, previous_decl.tensor_description) and
+                self.is_shareable(copy_arg.tensor_view_decl) and
+                self.is_shareable(previous_decl.tensor_view_decl)):
+            return
+        tensor_descriptions = [write_arg.tensor_description
+                               for write_arg in write_exop.write_args]
+        self.merge_tensor(output, previous)
+        # Moving the output gives its users a view of the whole tensor, so the write
+        # arguments are given back the views they write
+        for write_arg, tensor_description in zip(write_exop.write_args, tensor_descriptions):
+            write_arg.tensor_view_decl.readers.discard(write_arg)
+            write_arg.tensor_description = tensor_description
+            write_arg.tensor_view_decl = previous.get_tensor_view(tensor_description,
+                                                                  reader=write_arg)
+        self.previous_values_shared += 1
+
+    def merge_tensor(self, tensor_decl, into):
+        """
+        Moves the outputs written to tensor_decl to into.
+        """
+        for output_decl in self.output_decls(tensor_decl):
+            output_decl.tensor_decl = into
+        if tensor_decl in self.last_use:
+            self.last_use[into] = self.last_use.pop(tensor_decl)
@@ -0,0 +1,138 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from __future__ import division
+
+import numpy as np
+
+from ngraph.op_graph.op_graph import TensorOp, IndexOp, ReadOp, WriteOp, ReturnOp
+from ngraph.transformers.exop import ExOp, ExOpBlock
+from ngraph.transformers.passes.passes import GraphPass
+
+
+class ToStorageOp(TensorOp):
+    """
+    Converts a float32 value to a reduced storage dtype.
+    """
+
+    def __init__(self, arg, dtype, **kwargs):
+        super(ToStorageOp, self).__init__(args=(arg,), axes=arg.axes, dtype=dtype, **kwargs)
+
+
+class FromStorageOp(TensorOp):
+    """
+    Converts a value in a reduced storage dtype back to float32.
+    """
+
+    def __init__(self, arg, **kwargs):
+        super(FromStorageOp, self).__init__(args=(arg,), axes=arg.axes, dtype=np.float32,
+                                            **kwargs)
+
+
+class ReducedPrecisionStorage(GraphPass):
+    """
+    Keeps float32 temporaries that stay live across many exops in a reduced storage dtype.
+
+    The producer of such a value is followed by a conversion to the storage dtype, and the
+    distant users read a float32 copy converted back just before they run. Kernels still
+    compute in float32, but the float32 tensor is only live between the producer and its
+    nearby users, so values saved for a later step, such as activations saved for the
+    backward pass, occupy half as much of the temporary pool.
+
+    Must run on the SSA exop graph, before liveness analysis.
+
+    Arguments:
+        dtype: The storage dtype, float16 or uint16 for emulated bfloat16.
+        distance (int): Users at most this many exops after the producer, or after an
+            earlier conversion back, read the float32 value directly.
+    """
+
+    def __init__(self, dtype, distance=8, **kwargs):
+        super(ReducedPrecisionStorage, self).__init__(**kwargs)
+        self.dtype = np.dtype(dtype)
+        self.distance = distance
+
+    def do_pass(self, computation_decl, **kwargs):
+        self.computation_decl = computation_decl
+        self.exop_block = computation_decl.exop_block
+        assert isinstance(self.exop_block, ExOpBlock)
+
+        self.sink_index_exops()
+        positions = {exop: i for i, exop in enumerate(self.exop_block)}
+        for exop in list(self.exop_block):
+            if not self.is_candidate(exop):
+                continue
+            output_decl = exop.output_decls[0]
+            users = sorted(output_decl.user_input_decls, key=lambda x: positions[x.exop])
+            far_users = [user for user in users
+                         if positions[user.exop] - positions[exop] > self.distance]
+            if far_users:
+                self.store(exop, far_users, positions)
+
+    def sink_index_exops(self):
+        """
+        Moves each view next to its first user, so that a view of a distant value does not
+        keep the float32 value live.
+        """
+        positions = {exop: i for i, exop in enumerate(self.exop_block)}
+        for exop in reversed(list(self.exop_block)):
+            if not isinstance(exop.op, IndexOp) or len(exop.output_decls) != 1:
+                continue
+            users = exop.output_decls[0].user_input_decls
+            if not users:
+                continue
+            first_user = min((user.exop for user in users), key=lambda x: positions[x])
+            previous = first_user.prev_exop
+            if previous is exop:
+                continue
+            positions[exop] = (positions[previous] + positions[first_user]) / 2
+            self.exop_block.move_exop_to_after_exop(exop, previous)
+
+    def is_candidate(self, exop):
+        if isinstance(exop.op, (IndexOp, ReadOp, WriteOp, ReturnOp,
+                                ToStorageOp, FromStorageOp)):
+            return False
+        if len(exop.output_decls) != 1 or exop.write_args:
+            return False
+        output_decl = exop.output_decls[0]
+        tensor_decl = output_decl.tensor_decl
+        if tensor_decl.element_type.dtype != np.float32:
+            return False
+        if tensor_decl.is_persistent or tensor_decl.is_input or tensor_decl.is_output or \
+                tensor_decl.is_constant or tensor_decl.is_compile_only:
+            return False
+        if getattr(output_decl.tensor_view_decl, 'mkl_layout', None) is not None:
+            return False
+        return tuple(output_decl.tensor_description.shape) == tuple(exop.op.axes.lengths)
+
+    def store(self, exop, far_users, positions):
+        """
+        Converts the output of exop to the storage dtype and rewires far_users to float32
+        copies, one for each group of users within distance of each other.
+        """
+        store_exop = ExOp(computation_decl=self.computation_decl,
+                          op=ToStorageOp(exop.op, dtype=self.dtype))
+        self.exop_block.add_exop(store_exop, exop)
+
+        load_exop = None
+        load_position = None
+        for user in far_users:
+            position = positions[user.exop]
+            if load_exop is None or position - load_position > self.distance:
+                load_exop = ExOp(computation_decl=self.computation_decl,
+                                 op=FromStorageOp(store_exop.op))
+                self.exop_block.add_exop(load_exop, user.exop.prev_exop)
+                load_position = position
+            user.source_output_decl = load_exop.output_decls[0]
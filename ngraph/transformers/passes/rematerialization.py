@@ -0,0 +1,351 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from __future__ import division
+import copy
+import math
+import uuid
+from collections import defaultdict
+
+from ngraph.op_graph.comm_nodes import CommunicationOp
+from ngraph.op_graph.op_graph import InputOp, LiteralScalarOp, ReadOp, ReturnOp, RngOp, \
+    WriteOp
+from ngraph.transformers.exop import ExOp, ExOpBlock, OutputDecl
+from ngraph.transformers.passes.memoptimize import is_temporary
+from ngraph.transformers.passes.passes import GraphPass
+from ngraph.transformers.passes.reducedprecision import FromStorageOp, ToStorageOp
+
+
+class Rematerialization(GraphPass):
+    """
+    Recomputes activations for their backward users instead of keeping them live.
+
+    An activation is a temporary that is used shortly after it is computed, then not used
+    for a long stretch of exops, then used again, as a value saved by the forward pass for
+    the backward pass is. Some activations are kept as checkpoints; for each of the others,
+    its producer, and the producers of any of their inputs that are no longer live, are
+    emitted again just before the first later user, which reads the recomputed value. The
+    activation itself is then only live until its last early user.
+
+    Must run on the SSA exop graph after IndexElision, before liveness analysis. Only
+    deterministic exops without side effects are recomputed, and only from inputs that are
+    not written between the original exop and the recomputation.
+
+    Arguments:
+        memory_budget (int): With the greedy strategy, the number of bytes the estimated
+            peak of live temporaries should not exceed.
+        strategy (str): 'sqrt' splits the n activations into segments of about sqrt(n) and
+            keeps the last activation of each as a checkpoint; 'greedy' drops the largest
+            activation live at the estimated peak until the peak is within memory_budget.
+            Defaults to 'greedy' if there is a memory_budget, otherwise 'sqrt'.
+        min_gap (int): Uses are early or late when they are more than min_gap exops apart.
+
+    Attributes:
+        rematerialized: The number of activations recomputed by the last run.
+        recompute_exops: The number of exops added by the last run.
+        recompute_bytes: The number of bytes the added exops compute.
+        peak_before: The estimated peak of live temporaries before the last run, in bytes.
+        peak_after: The estimated peak of live temporaries after the last run, in bytes.
+    """
+    strategies = ('sqrt', 'greedy')
+
+    def __init__(self, memory_budget=None, strategy=None, min_gap=4, **kwargs):
+        super(Rematerialization, self).__init__(**kwargs)
+        if strategy is None:
+            strategy = 'sqrt' if memory_budget is None else 'greedy'
+        if strategy not in self.strategies:
+            raise ValueError("Unknown rematerialization strategy {}, expected one of {}"
+                             .format(strategy, self.strategies))
+        if strategy == 'greedy' and memory_budget is None:
+            raise ValueError("The greedy rematerialization strategy needs a memory_budget")
+        self.memory_budget = memory_budget
+        self.strategy = strategy
+        self.min_gap = min_gap
+
+    def do_pass(self, computation_decl, **kwargs):
+        self.computation_decl = computation_decl
+        self.exop_block = computation_decl.exop_block
+        assert isinstance(self.exop_block, ExOpBlock)
+        self.rematerialized = 0
+        self.recompute_exops = 0
+        self.recompute_bytes = 0
+        self.clones = dict()
+        self.clone_exops = set()
+        self.dropping = set()
+
+        self.analyze()
+        self.peak_before = self.peak()[1]
+        if self.strategy == 'sqrt':
+            self.sqrt_segments()
+        else:
+            self.greedy()
+        self.analyze()
+        self.peak_after = self.peak()[1]
+
+    @property
+    def recompute_fraction(self):
+        """
+        Returns:
+            The exops added by the last run as a fraction of the other exops.
+        """
+        exops = len(self.exops) - self.recompute_exops
+        return self.recompute_exops / exops if exops else 0
+
+    def sqrt_segments(self):
+        activations = sorted(self.activations, key=lambda x: self.producer_position(x))
+        segment = int(math.ceil(math.sqrt(len(activations))))
+        self.dropping = set(activation for i, activation in enumerate(activations)
+                            if (i + 1) % segment != 0)
+        for tensor_decl in sorted(self.dropping, key=lambda x: self.late_position(x)):
+            self.analyze()
+            if tensor_decl in self.activations:
+                self.rematerialize(tensor_decl)
+
+    def greedy(self):
+        tried = set()
+        while True:
+            self.analyze()
+            position, peak = self.peak()
+            if peak <= self.memory_budget:
+                return
+            candidates = [tensor_decl for tensor_decl in self.activations
+                          if tensor_decl not in tried and
+                          self.last_early_position(tensor_decl) < position <
+                          self.late_position(tensor_decl)]
+            if not candidates:
+                return
+            tensor_decl = max(candidates, key=lambda x: x.size)
+            tried.add(tensor_decl)
+            self.dropping = {tensor_decl}
+            self.rematerialize(tensor_decl)
+
+    def analyze(self):
+        """
+        Collects the positions of the exops and the uses and writes of each tensor, and finds
+        the activations and where their late uses start.
+        """
+        self.exops = list(self.exop_block)
+        self.positions = {exop: i for i, exop in enumerate(self.exops)}
+        self.uses = defaultdict(list)
+        self.writes = defaultdict(list)
+        for position, exop in enumerate(self.exops):
+            for input_decl in exop.input_decls:
+                self.uses[input_decl.tensor_decl].append(input_decl)
+            for write_arg in exop.write_args:
+                self.writes[write_arg.tensor_decl].append(position)
+        for tensor_decl in list(self.uses):
+            for tensor_view_decl in tensor_decl.tensor_view_decls.values():
+                for output_decl in tensor_view_decl.writers:
+                    if output_decl.tensor_decl is tensor_decl and \
+                            output_decl.exop in self.positions:
+                        self.writes[tensor_decl].append(self.positions[output_decl.exop])
+        for exop in self.exops:
+            for output_decl in exop.output_decls:
+                self.writes[output_decl.tensor_decl].append(self.positions[exop])
+
+        self.late_uses = dict()
+        for tensor_decl, uses in self.uses.items():
+            late_uses = self.split_uses(tensor_decl, uses)
+            if late_uses:
+                self.late_uses[tensor_decl] = late_uses
+        self.activations = set(self.late_uses)
+
+    def split_uses(self, tensor_decl, uses):
+        """
+        Returns:
+            The uses of tensor_decl after the longest gap between its uses, if tensor_decl
+            is an activation that can be recomputed, otherwise None.
+        """
+        if not is_temporary(tensor_decl) or len(set(self.writes[tensor_decl])) != 1:
+            return None
+        exop = self.exops[self.writes[tensor_decl][0]]
+        if exop in self.clone_exops or not self.is_recomputable(exop) or \
+                any(write_arg.tensor_decl is tensor_decl
+                    for use in uses for write_arg in use.exop.write_args):
+            return None
+        uses = sorted(uses, key=lambda x: self.positions[x.exop])
+        positions = [self.positions[exop]] + [self.positions[use.exop] for use in uses]
+        gap, index = max((positions[i + 1] - positions[i], i) for i in range(len(uses)))
+        if gap <= self.min_gap or index == 0:
+            return None
+        return uses[index:]
+
+    def is_recomputable(self, exop):
+        op = exop.op
+        if not op.is_device_op or op.has_side_effects or op.states_written:
+            return False
+        if isinstance(op, (ReadOp, WriteOp, ReturnOp, InputOp, RngOp, LiteralScalarOp,
+                           CommunicationOp, ToStorageOp, FromStorageOp)):
+            return False
+        if len(exop.output_decls) != 1 or exop.write_args:
+            return False
+        output_decl = exop.output_decls[0]
+        if op.tensor_description().base.tensor_size != output_decl.tensor_decl.size:
+            return False
+        views = [output_decl.tensor_view_decl] + \
+            [input_decl.tensor_view_decl for input_decl in exop.input_decls]
+        return all(getattr(view, 'mkl_layout', None) is None for view in views)
+
+    def producer_position(self, tensor_decl):
+        return self.writes[tensor_decl][0]
+
+    def late_position(self, tensor_decl):
+        return self.positions[self.late_uses[tensor_decl][0].exop]
+
+    def last_early_position(self, tensor_decl):
+        late_uses = set(self.late_uses[tensor_decl])
+        return max(self.positions[use.exop] for use in self.uses[tensor_decl]
+                   if use not in late_uses)
+
+    def last_position(self, tensor_decl):
+        uses = self.uses.get(tensor_decl)
+        if not uses:
+            return self.producer_position(tensor_decl)
+        return max(self.positions[use.exop] for use in uses)
+
+    def peak(self):
+        """
+        Returns:
+            The position and size in bytes of the largest total size of live temporaries.
+        """
+        changes = defaultdict(int)
+        for tensor_decl, writes in self.writes.items():
+            if is_temporary(tensor_decl):
+                changes[min(writes)] += tensor_decl.size
+                changes[self.last_position(tensor_decl) + 1] -= tensor_decl.size
+        live = 0
+        peak_position, peak = 0, 0
+        for position in sorted(changes):
+            live += changes[position]
+            if live > peak:
+                peak_position, peak = position, live
+        return peak_position, peak
+
+    def rematerialize(self, tensor_decl):
+        """
+        Has the late uses of tensor_decl read a recomputed value.
+        """
+        late_uses = self.late_uses[tensor_decl]
+        user = late_uses[0].exop
+        plan = []
+        sources = dict()
+        if not self.plan_value(tensor_decl, self.positions[user], plan, sources):
+            return
+        clones = dict()
+        for exop in plan:
+            clones[exop] = self.emit_clone(exop, user, sources, clones)
+            # Other activations being dropped use the recomputed value for their late uses
+            if exop.output_decls[0].tensor_decl in self.dropping:
+                self.clones[exop.output_decls[0].tensor_decl] = clones[exop]
+        clone = sources[tensor_decl]
+        clone = clones.get(clone, clone)
+        for use in late_uses:
+            use.source_output_decl = self.clone_output_decl(clone, use.source_output_decl)
+        self.rematerialized += 1
+
+    def plan_value(self, tensor_decl, position, plan, sources):
+        """
+        Finds the exops that must be recomputed so the value of tensor_decl can be read at
+        position.
+
+        Arguments:
+            tensor_decl: The tensor.
+            position: The position of the exop that will read the value.
+            plan: The exops to recompute, in order, extended by this method.
+            sources: A map from tensors to the exop, an earlier recomputation or an exop in
+                the plan, that provides their value at position, extended by this method.
+
+        Returns:
+            True if the value can be read at position.
+        """
+        if tensor_decl in sources:
+            return True
+        clone = self.clones.get(tensor_decl)
+        if clone is not None and self.positions.get(clone, position) < position:
+            sources[tensor_decl] = clone
+            return True
+        if tensor_decl in self.dropping:
+            # Only live until its last early use
+            if self.last_early_position(tensor_decl) >= position:
+                return True
+        elif not is_temporary(tensor_decl) or self.last_position(tensor_decl) >= position:
+            return True
+        if not is_temporary(tensor_decl) or len(set(self.writes[tensor_decl])) != 1:
+            return False
+        exop = self.exops[self.producer_position(tensor_decl)]
+        if exop in self.clone_exops or not self.is_recomputable(exop):
+            return False
+        for input_decl in exop.input_decls:
+            if self.written_between(input_decl.tensor_decl, self.positions[exop], position):
+                return False
+            if not self.plan_value(input_decl.tensor_decl, position, plan, sources):
+                return False
+        plan.append(exop)
+        sources[tensor_decl] = exop
+        return True
+
+    def written_between(self, tensor_decl, start, end):
+        return any(start < position < end for position in self.writes[tensor_decl])
+
+    def emit_clone(self, exop, user, sources, clones):
+        """
+        Adds a copy of exop before user, reading recomputed values where there are any.
+
+        Returns:
+            The new exop.
+        """
+        op = exop.op
+        clone = copy.copy(op)
+        clone.uuid = uuid.uuid4()
+        clone.name = op.unscoped_name
+        # The inputs are wired below, not from the args
+        clone._args = ()
+        clone_exop = ExOp(computation_decl=self.computation_decl, op=clone, create_value=False)
+        clone._args = op._args
+        for input_decl in exop.input_decls:
+            source_output_decl = input_decl.source_output_decl
+            source = sources.get(input_decl.tensor_decl)
+            if source is not None:
+                source = clones.get(source, source)
+                source_output_decl = self.clone_output_decl(source, source_output_decl)
+            clone_exop.add_input_decl(source_output_decl)
+        output_decl = exop.output_decls[0]
+        clone_exop.add_output_decl(self.computation_decl.get_tensor_decl(op=clone),
+                                   output_decl.tensor_description)
+        self.exop_block.add_exop(clone_exop, user.prev_exop)
+        self.clone_exops.add(clone_exop)
+        self.recompute_exops += 1
+        self.recompute_bytes += output_decl.tensor_decl.size
+        return clone_exop
+
+    def clone_output_decl(self, clone_exop, output_decl):
+        """
+        Returns:
+            An output of clone_exop with the view of output_decl, which is the original of
+            the value of clone_exop or a view of it.
+        """
+        primary = clone_exop.output_decls[0]
+        key = output_decl.tensor_description.axes_key
+        if key == primary.tensor_description.axes_key:
+            return primary
+        tensor_view_decl = primary.tensor_decl.tensor_view_decls.get(key)
+        if tensor_view_decl is not None:
+            for writer in tensor_view_decl.writers:
+                if writer.exop is clone_exop:
+                    return writer
+        view = OutputDecl(tensor_decl=primary.tensor_decl,
+                          tensor_description=output_decl.tensor_description)
+        clone_exop.take_output_decl(view)
+        return view
@@ -0,0 +1,197 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from collections import Counter
+
+import numpy as np
+
+from ngraph.op_graph.op_graph import Add, AssignableTensorOp, BroadcastOp, ContiguousOp, \
+    Divide, Flatten, IndexOp, Multiply, NegativeOp, Op, PatternLabelOp, PatternSkipOp, \
+    ReorderAxes, Subtract, Sum, TensorValueOp, Unflatten, broadcast, constant
+from ngraph.transformers.passes.passes import GraphRewritePass
+
+
+def pattern(op_type, *args):
+    """
+    Makes an op of type op_type with args for use in a pattern, without running the
+    constructor of op_type, which would check axes the pattern does not have.
+    """
+    op = op_type.__new__(op_type)
+    Op.__init__(op, args=args)
+    return op
+
+
+def optional_contiguous(arg):
+    return PatternSkipOp(arg, lambda op: isinstance(op, ContiguousOp))
+
+
+class AlgebraicSimplification(GraphRewritePass):
+    """
+    Removes layout ops that cancel each other and arithmetic that does nothing.
+
+    Each rule is a pattern and a rewrite; the rewrite returns the replacement for the
+    matched op, or None to leave it. Replacements that drop an elementwise op only do so
+    when the remaining tensor has the same axes, dtype and a contiguous layout, so users
+    see the same layout as before.
+
+    Attributes:
+        rewrites: For the last run of the pass, the number of ops rewritten by each rule.
+        copies_removed: For the last run of the pass, the number of device ops (copies and
+            arithmetic) that no longer need to be computed.
+    """
+    def __init__(self, **kwargs):
+        super(AlgebraicSimplification, self).__init__(**kwargs)
+        self.rewrites = Counter()
+        self.copies_removed = 0
+        self.rewritten = set()
+
+        x = PatternLabelOp('x')
+        zero = PatternLabelOp('zero', lambda op: self.constant_fill(op) == 0)
+        one = PatternLabelOp('one', lambda op: self.constant_fill(op) == 1)
+        self.rules = [
+            ('reorder_reorder', pattern(ReorderAxes, pattern(ReorderAxes, x)),
+             self.rewrite_view),
+            ('reorder_broadcast', pattern(ReorderAxes, pattern(BroadcastOp, x)),
+             self.rewrite_broadcast),
+            ('broadcast_reorder', pattern(BroadcastOp, pattern(ReorderAxes, x)),
+             self.rewrite_broadcast),
+            ('broadcast_broadcast', pattern(BroadcastOp, pattern(BroadcastOp, x)),
+             self.rewrite_broadcast),
+            ('flatten_unflatten', pattern(Flatten, optional_contiguous(pattern(Unflatten, x))),
+             self.rewrite_view),
+            ('unflatten_flatten', pattern(Unflatten, optional_contiguous(pattern(Flatten, x))),
+             self.rewrite_view),
+            ('contiguous', pattern(ContiguousOp, x),
+             self.rewrite_contiguous),
+            ('sum_broadcast', pattern(Sum, optional_contiguous(pattern(BroadcastOp, x))),
+             self.rewrite_sum_broadcast),
+            ('multiply_one', pattern(Multiply, x, one),
+             self.rewrite_elementwise),
+            ('divide_one', pattern(Divide, x, one),
+             self.rewrite_elementwise),
+            ('add_zero', pattern(Add, x, zero),
+             self.rewrite_elementwise),
+            ('subtract_zero', pattern(Subtract, x, zero),
+             self.rewrite_elementwise),
+            ('negative_negative', pattern(NegativeOp, pattern(NegativeOp, x)),
+             self.rewrite_elementwise),
+        ]
+        for name, rule_pattern, rewrite in self.rules:
+            self.register_pattern(rule_pattern, self.make_callback(name, rewrite))
+
+    def make_callback(self, name, rewrite):
+        def callback(op, label_map_op_list):
+            for label_map, op in label_map_op_list:
+                # An op is only replaced once; later batches see its replacement
+                if op in self.rewritten:
+                    continue
+                replacement = rewrite(op, label_map['x'])
+                if replacement is None:
+                    continue
+                self.rewritten.add(op)
+                self.rewrites[name] += 1
+                self.replace_op(op, replacement)
+        return callback
+
+    def do_pass(self, **kwargs):
+        self.rewrites = Counter()
+        self.rewritten = set()
+        device_ops = self.count_device_ops(**kwargs)
+        super(AlgebraicSimplification, self).do_pass(**kwargs)
+        self.copies_removed = device_ops - self.count_device_ops(**kwargs)
+
+    def count_device_ops(self, **kwargs):
+        """
+        Returns:
+            The number of device ops used by the graph, not counting ops only used by ops
+            this pass has replaced.
+        """
+        ops = []
+        self.run_pass(ops.append, **kwargs)
+        used = set(arg for op in ops for arg in self.op_args(op))
+        pending = [op for op in ops if op not in used and op not in self.rewritten]
+        live = set()
+        while pending:
+            op = pending.pop()
+            if op not in live:
+                live.add(op)
+                pending.extend(self.op_args(op))
+        return sum(1 for op in live if op.is_device_op)
+
+    def constant_fill(self, op):
+        """
+        Returns:
+            The value of every element of op if op is a view of a constant with one value,
+            otherwise None.
+        """
+        while isinstance(op, (IndexOp, ContiguousOp)):
+            op = self.op_arg(op, 0)
+        if isinstance(op, TensorValueOp):
+            op = op.tensor
+        if not (isinstance(op, AssignableTensorOp) and op.is_constant):
+            return None
+        value = np.asarray(op.const)
+        if value.size == 0 or not np.all(value == value.flat[0]):
+            return None
+        return value.flat[0]
+
+    def is_contiguous(self, op):
+        return op.tensor_description().c_contiguous
+
+    def rewrite_view(self, op, x):
+        """
+        A chain of reorders, or an unflatten undone by a flatten, is the same view as x
+        with the axes of op.
+        """
+        if op.axes == x.axes and (isinstance(op, ReorderAxes) or self.is_contiguous(x)):
+            return x
+        if isinstance(op, ReorderAxes):
+            return ReorderAxes(x, op.axes)
+        return None
+
+    def rewrite_broadcast(self, op, x):
+        """
+        Broadcasts reorder their axes, so reorders and broadcasts of x are one broadcast.
+        """
+        if op.axes == x.axes:
+            return x
+        return BroadcastOp(x, op.axes)
+
+    def rewrite_contiguous(self, op, x):
+        if self.is_contiguous(x):
+            return x
+        return None
+
+    def rewrite_sum_broadcast(self, op, x):
+        """
+        Summing over axes added by a broadcast is the same as scaling x, which avoids
+        materializing the broadcast tensor.
+        """
+        if len(op.reduction_axes) == 0 or any(axis in x.axes for axis in op.reduction_axes):
+            return None
+        if not (op.dtype == x.dtype and np.issubdtype(op.dtype, np.floating)):
+            return None
+        x = broadcast(x, op.axes)
+        if op.reduction_axes.size == 1:
+            return ContiguousOp(x)
+        return x * constant(op.reduction_axes.size, dtype=op.dtype)
+
+    def rewrite_elementwise(self, op, x):
+        """
+        The op computes x; keep the op unless x can be used in its place.
+        """
+        if op.axes == x.axes and op.dtype == x.dtype and self.is_contiguous(x):
+            return x
+        return None
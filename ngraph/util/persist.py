@@ -17,7 +17,6 @@ from __future__ import print_function
 import os
 import posixpath
 import sys
-import requests
 from tqdm import tqdm
 
 PY3 = sys.version_info[0] >= 3
@@ -113,6 +112,7 @@ def fetch_file(url, sourcefile, destfile, totalsz=None):
         destfile (str): Path to the destination.
         totalsz (int): Size of the file to be downloaded.
     """
+    import requests
     req = requests.get(posixpath.join(url, sourcefile),
                        headers={'User-Agent': 'ngraph'},
                        stream=True)
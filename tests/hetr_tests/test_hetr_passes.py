@@ -13,12 +13,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ******************************************************************************
+import collections
+import numpy as np
 import pytest
 from ngraph.testing import ExecutorFactory
 from orderedset import OrderedSet
 import ngraph as ng
+from ngraph.op_graph.op_graph import Op
+from ngraph.op_graph.comm_nodes import CPUMlslAllReduceStartOp, CPUMlslAllReduceWaitOp
+from ngraph.transformers.exop import ExecutionState
 from ngraph.transformers.passes.hetrpasses import DeviceAssignPass, \
-    CommunicationPass
+    CommunicationPass, AllReduceBucketing, AllReduceScheduling
 
 
 pytestmark = pytest.mark.hetr_only
@@ -173,3 +178,75 @@ def test_hetr_graph_passes():
     check_device_assign_pass("cpu", "0", graph_op_metadata, graph_ops)
     check_communication_pass(ops_to_transform=graph_ops,
                              expected_recv_nodes=[x_plus_y])
+
+
+FakeExOp = collections.namedtuple('FakeExOp', ['op'])
+FakeComputationDecl = collections.namedtuple('FakeComputationDecl', ['exop_block'])
+
+
+def make_allreduce(length, func='sum'):
+    with ng.metadata(device='cpu', device_id='0', transformer='cpu0', host_transformer=None):
+        x = ng.placeholder([ng.make_axis(length)])
+    start = CPUMlslAllReduceStartOp(x, func=func)
+    wait = CPUMlslAllReduceWaitOp(x, start, func=func)
+    return start, wait
+
+
+def test_allreduce_bucketing():
+    # 4 byte elements, so buckets hold 16 elements
+    a, b, c, d, e = [make_allreduce(length) for length in (4, 8, 8, 2, 3)]
+    f = make_allreduce(2, func='mean')
+    # the wait of c runs before the start of d, so d starts a new bucket
+    order = [a[0], b[0], c[0], c[1], d[0], e[0], f[0], a[1], b[1], d[1], e[1], f[1]]
+    AllReduceBucketing(16 * 4).do_pass(FakeComputationDecl([FakeExOp(op) for op in order]))
+
+    assert a[0].bucket is b[0].bucket
+    assert a[0].bucket.members == [a[0], b[0]]
+    assert a[0].bucket.size == 12
+    assert c[0].bucket is None
+    assert d[0].bucket is e[0].bucket
+    assert f[0].bucket is None
+
+    bucket = a[0].bucket
+    bucket.buffer = np.zeros(bucket.size, dtype=np.float32)
+    x_a = np.arange(4, dtype=np.float32)
+    x_b = np.arange(8, dtype=np.float32).reshape(2, 4) + 10
+    bucket.pack(a[0], x_a)
+    bucket.pack(b[0], x_b)
+    out_b = np.empty_like(x_b)
+    bucket.unpack(b[0], out_b)
+    np.testing.assert_array_equal(out_b, x_b)
+    np.testing.assert_array_equal(bucket.buffer[:4], x_a)
+
+
+def test_allreduce_scheduling():
+    start, wait = make_allreduce(4)
+    with ng.metadata(device='cpu', device_id='0', transformer='cpu0', host_transformer=None):
+        y = ng.placeholder(start.axes)
+        other = ng.tanh(ng.exp(y) + y)
+    update = ng.add(other, start)
+    update.add_control_dep(wait)
+    computation_decl = ExecutionState().make_execution_graph(
+        ng.computation([update], start.args[0], y)).computation_decl
+
+    # schedule the unrelated computation between the gradient and its allreduce
+    exop_block = computation_decl.exop_block
+    exops = list(exop_block)
+    other_ops = set(Op.ordered_ops([other]))
+    gradient_exops = [exop for exop in exops[:exops.index(computation_decl.get_exop(start))]
+                      if exop.op not in other_ops and exop.op.tensor is not y.tensor]
+    after = exop_block
+    for exop in gradient_exops:
+        exop_block.move_exop_to_after_exop(exop, after)
+        after = exop
+
+    AllReduceScheduling().do_pass(computation_decl)
+    exops = list(exop_block)
+    start_exop = computation_decl.get_exop(start)
+    wait_exop = computation_decl.get_exop(wait)
+    update_exop = computation_decl.get_exop(update)
+    assert exops[exops.index(start_exop) - 1] is gradient_exops[-1]
+    assert exops[exops.index(wait_exop) + 1] is update_exop
+    window = exops.index(wait_exop) - exops.index(start_exop) - 1
+    assert window == len(exops) - len(gradient_exops) - 4
+    assert list(computation_decl.allreduce_overlap.values()) == [window]
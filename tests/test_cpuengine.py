@@ -0,0 +1,61 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+import numpy as np
+
+from ngraph.transformers.cpu.cpuengine import Mkldnn
+
+
+class RecordingMkldnn(Mkldnn):
+    """
+    Records the calls into the engine instead of making them.
+    """
+
+    def __init__(self):
+        super(RecordingMkldnn, self).__init__('no_such_mkldnn_engine.so')
+        self.enabled = True
+        self.calls = []
+
+    def set_input_tensor(self, kernel, data, index):
+        self.calls.append(('input', kernel, data, index))
+
+    def set_output_tensor(self, kernel, data, index):
+        self.calls.append(('output', kernel, data, index))
+
+    def run_opkernel(self, kernel, verbose):
+        self.calls.append(('run', kernel))
+
+
+def test_bound_kernel_arguments_are_set_once():
+    mkldnn = RecordingMkldnn()
+    mkldnn.kernels['conv'] = 'kernel'
+    x, w, y, z = [np.zeros(4, dtype=np.float32) for _ in range(4)]
+    first = mkldnn.bind('conv', [x, w, None], [y])
+    second = mkldnn.bind('conv', [x, w, None], [z])
+
+    mkldnn.run_bound(first)
+    mkldnn.run_bound(first)
+    assert mkldnn.calls == [('input', 'kernel', x.ctypes.data, 0),
+                            ('input', 'kernel', w.ctypes.data, 1),
+                            ('output', 'kernel', y.ctypes.data, 0),
+                            ('run', 'kernel'),
+                            ('run', 'kernel')]
+
+    # a computation sharing the kernel binds its own buffers again
+    del mkldnn.calls[:]
+    mkldnn.run_bound(second)
+    mkldnn.run_bound(first)
+    assert [call for call in mkldnn.calls if call[0] == 'output'] == \
+        [('output', 'kernel', z.ctypes.data, 0), ('output', 'kernel', y.ctypes.data, 0)]
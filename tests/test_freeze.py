@@ -0,0 +1,94 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from contextlib import closing
+
+import numpy as np
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.frontends.neon import Affine, Convolution, GaussianInit, GradientDescentMomentum, \
+    Layer, Rectlin, Sequential, Softmax, ax
+from ngraph.op_graph.convolution import ConvolutionOp
+from ngraph.op_graph.op_graph import AssignOp, AssignOneDOp
+from ngraph.op_graph.serde.serde import deserialize_graph, serialize_graph
+from ngraph.transformers.freeze import fold_constant_subgraphs, freeze_for_inference
+
+
+def make_model():
+    ax.N.length = 4
+    ax.Y.length = 5
+    C = ng.make_axis(length=3, name='C')
+    H = ng.make_axis(length=8, name='H')
+    W = ng.make_axis(length=8, name='W')
+    x = ng.placeholder([C, H, W, ax.N])
+    y = ng.placeholder([ax.Y, ax.N])
+    model = Sequential([Convolution((3, 3, 4), filter_init=GaussianInit(), batch_norm=True,
+                                    activation=Rectlin()),
+                        Affine(axes=ax.Y, weight_init=GaussianInit(), batch_norm=True,
+                               activation=Softmax())])
+    prob = model(x)
+    loss = ng.cross_entropy_multi(prob, y)
+    update = ng.sequential([GradientDescentMomentum(0.1)(loss), ng.mean(loss, out_axes=())])
+    with Layer.inference_mode_on():
+        inference_prob = model(x)
+    return x, y, update, inference_prob
+
+
+def test_freeze_for_inference():
+    x, y, update, inference_prob = make_model()
+    x_value = np.random.uniform(-1, 1, x.axes.lengths).astype(np.float32)
+    y_value = np.eye(ax.Y.length, ax.N.length, dtype=np.float32)
+
+    with closing(ngt.make_transformer()) as transformer:
+        train = transformer.add_computation(ng.computation(update, x, y))
+        infer = transformer.add_computation(ng.computation(inference_prob, x))
+        for _ in range(3):
+            train(x_value, y_value)
+        expected = infer(x_value)
+        frozen = freeze_for_inference(inference_prob, transformer)
+        # the training graph is left alone
+        train(x_value, y_value)
+
+    ops = ng.Op.all_op_references([frozen])
+    assert not any(isinstance(op, (AssignOp, AssignOneDOp)) for op in ops)
+    assert not any(isinstance(op, ng.AssignableTensorOp) and
+                   not (op.is_constant or op.is_placeholder) for op in ops)
+    # both batchnorms are folded into their convolution and dot
+    assert not any(isinstance(op, (ng.SqrtOp, ng.ReciprocalOp)) for op in ops)
+    assert any(isinstance(op, ConvolutionOp) for op in ops)
+
+    frozen = deserialize_graph(serialize_graph([frozen], only_return_handle_ops=True))[0]
+    placeholder, = [op for op in ng.Op.all_op_references([frozen])
+                    if isinstance(op, ng.AssignableTensorOp) and op.is_placeholder]
+    with closing(ngt.make_transformer()) as transformer:
+        result = transformer.add_computation(ng.computation(frozen, placeholder))(x_value)
+    np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-6)
+
+
+def test_fold_constant_subgraphs():
+    A = ng.make_axis(length=3, name='A')
+    x = ng.placeholder([A])
+    c = ng.constant(np.arange(3, dtype=np.float32), axes=[A])
+    out = x * ng.exp(c + 1) + 2 * ng.sqrt(c)
+
+    assert fold_constant_subgraphs([out]) == 2
+    out = out.forwarded
+    assert not any(isinstance(op, (ng.ExpOp, ng.SqrtOp)) for op in ng.Op.ordered_ops([out]))
+
+    with closing(ngt.make_transformer()) as transformer:
+        result = transformer.computation(out, x)(np.ones(3, dtype=np.float32))
+    expected = np.exp(np.arange(3) + 1) + 2 * np.sqrt(np.arange(3))
+    np.testing.assert_allclose(result, expected, rtol=1e-5)
@@ -13,9 +13,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ******************************************************************************
+from contextlib import closing
+
+import numpy as np
+
 import ngraph as ng
+import ngraph.transformers as ngt
 from ngraph.op_graph.op_graph import as_op
+from ngraph.transformers.passes.cse import CommonSubexpressionElimination
 from ngraph.transformers.passes.passes import SimplePrune
+from ngraph.transformers.passes.simplification import AlgebraicSimplification
 from orderedset import OrderedSet
 
 
@@ -37,3 +44,78 @@ def test_simpleprune_graph_pass():
     base_op, simple_graph = get_simple_graph()
     SimplePrune().do_pass(ops=[simple_graph])
     assert simple_graph.forwarded is base_op
+
+
+def test_cse_graph_pass():
+    A = ng.make_axis(length=4, name='A')
+    B = ng.make_axis(length=3, name='B')
+    x = ng.placeholder([A, B])
+    w = ng.variable([A, B], initial_value=1.0)
+    total = ng.exp(x) * ng.sum(x, out_axes=[A]) + ng.sum(x, out_axes=[A]) * ng.exp(x)
+    cse = CommonSubexpressionElimination()
+    cse.do_pass(ops=[total])
+    left, right = total.forwarded.args
+    assert left.forwarded is right.forwarded
+    ops = ng.Op.ordered_ops([total])
+    assert sum(isinstance(op, ng.ExpOp) for op in ops) == 1
+    assert sum(isinstance(op, ng.Sum) for op in ops) == 1
+    assert sum(isinstance(op, ng.TensorValueOp) for op in ops) == 1
+
+    # reads of a variable are not merged in the op-graph, others may write it
+    update = ng.sequential([ng.assign(w, w + x), w * x])
+    CommonSubexpressionElimination().do_pass(ops=[update])
+    reads = [op for op in ng.Op.ordered_ops([update])
+             if isinstance(op, ng.TensorValueOp) and op.tensor is w]
+    assert len(reads) == 3
+
+
+def test_cse_execution_graph():
+    A = ng.make_axis(length=4, name='A')
+    x = ng.placeholder([A])
+    y = ng.placeholder([A])
+    result = ng.tanh(x * y) + ng.tanh(y * x)
+    with closing(ngt.make_transformer()) as transformer:
+        computation = transformer.add_computation(ng.computation(result, x, y))
+        x_value = np.arange(4, dtype=np.float32)
+        np.testing.assert_allclose(computation(x_value, x_value + 1),
+                                   2 * np.tanh(x_value * (x_value + 1)), rtol=1e-6)
+        ops = [exop.op for exop in computation.computation_decl.exop_block]
+        assert sum(isinstance(op, ng.TanhOp) for op in ops) == 1
+
+
+def test_algebraic_simplification():
+    A = ng.make_axis(length=4, name='A')
+    B = ng.make_axis(length=3, name='B')
+    C = ng.make_axis(length=5, name='C')
+    x = ng.placeholder([A, B])
+    reordered = ng.ReorderAxes(ng.ReorderAxes(x, [B, A]), [A, B])
+    summed = ng.sum(ng.broadcast(x, [A, C, B]), reduction_axes=[C])
+    total = -(-(reordered * ng.constant(1.0))) + summed / ng.constant(1.0, axes=[A, B])
+
+    simplification = AlgebraicSimplification()
+    simplification.do_pass(ops=[total])
+    assert simplification.rewrites == {'reorder_reorder': 1, 'sum_broadcast': 1,
+                                       'multiply_one': 1, 'divide_one': 1,
+                                       'negative_negative': 1}
+    assert simplification.copies_removed == 4
+    total = total.forwarded
+    ops = ng.Op.ordered_ops([total])
+    assert not any(isinstance(op, (ng.ReorderAxes, ng.NegativeOp, ng.Divide, ng.Sum))
+                   for op in ops)
+
+    with closing(ngt.make_transformer()) as transformer:
+        x_value = np.arange(12, dtype=np.float32).reshape(4, 3)
+        np.testing.assert_allclose(transformer.computation(total, x)(x_value), 6 * x_value)
+
+
+def test_algebraic_simplification_execution_graph():
+    A = ng.make_axis(length=4, name='A')
+    C = ng.make_axis(length=5, name='C')
+    x = ng.placeholder([A])
+    result = ng.sum(ng.broadcast(x, [A, C]) + 0, reduction_axes=[C])
+    with closing(ngt.make_transformer()) as transformer:
+        computation = transformer.add_computation(ng.computation(result, x))
+        x_value = np.arange(4, dtype=np.float32)
+        np.testing.assert_allclose(computation(x_value), 5 * x_value)
+        ops = [exop.op for exop in computation.computation_decl.exop_block]
+        assert not any(isinstance(op, (ng.ContiguousOp, ng.Sum)) for op in ops)
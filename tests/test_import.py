@@ -0,0 +1,67 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules that are only needed once a transformer runs or a frontend feature is used
+lazy_modules = [
+    'ngraph.transformers.cputransform',
+    'ngraph.transformers.gputransform',
+    'ngraph.transformers.hetrtransform',
+    'ngraph.op_graph.serde.serde',
+    'google.protobuf',
+    'h5py',
+    'parsel',
+    'requests',
+]
+
+# Generous bound on a cold import, which catches backends or heavy optional dependencies
+# becoming eager imports again
+max_import_seconds = 5.0
+
+
+def run_import(statement):
+    script = """
+import json, sys, time
+start = time.time()
+{}
+print(json.dumps(dict(seconds=time.time() - start, modules=sorted(sys.modules))))
+""".format(statement)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([root, env.get('PYTHONPATH', '')])
+    output = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize('statement', ['import ngraph', 'import ngraph.frontends.neon'])
+def test_import_is_lazy(statement):
+    result = run_import(statement)
+    assert [name for name in lazy_modules if name in result['modules']] == []
+    assert result['seconds'] < max_import_seconds
+
+
+def test_transformer_loaded_on_first_use():
+    result = run_import("""
+import ngraph.transformers as ngt
+ngt.make_transformer().close()
+""")
+    assert 'ngraph.transformers.cputransform' in result['modules']
+    assert 'ngraph.transformers.hetrtransform' not in result['modules']
@@ -0,0 +1,70 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from contextlib import closing
+import json
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.op_graph.serde.serde import serialize_graph
+from ngraph.transformers import memreport
+
+
+def make_graph():
+    A = ng.make_axis(length=64, name='A')
+    B = ng.make_axis(length=32, name='B')
+    x = ng.placeholder([A, B])
+    w = ng.variable([A, B], initial_value=1.0)
+    h = ng.tanh(x * w)
+    return ng.sum(h * h + x, out_axes=())
+
+
+def test_memory_report():
+    with closing(ngt.make_transformer()) as transformer:
+        computation = transformer.add_computation(ng.computation(make_graph(), 'all'))
+        report = computation.memory_report(top=2)
+
+    assert report.temporary_bytes > 0
+    assert report.persistent_bytes >= 64 * 32 * 4
+    assert report.worst_case_bytes >= report.temporary_bytes
+
+    assert report.peak['usage'] == max(entry['usage'] for entry in report.timeline)
+    assert all(entry['usage'] <= entry['footprint'] <= report.temporary_bytes
+               for entry in report.timeline)
+    assert 0 <= report.fragmentation < 1
+
+    assert 0 < len(report.peak_tensors) <= 2
+    sizes = [tensor['bytes'] for tensor in report.peak_tensors]
+    assert sizes == sorted(sizes, reverse=True)
+    assert all(tensor['offset'] + tensor['bytes'] <= report.temporary_bytes
+               for tensor in report.peak_tensors)
+
+    result = json.loads(report.to_json())
+    assert result['temporary_bytes'] == report.temporary_bytes
+    assert len(result['timeline']) == len(report.timeline)
+    assert 'fragmentation' in str(report)
+
+
+def test_memory_report_cli(tmpdir, capsys):
+    graph = tmpdir.join('graph.pb')
+    graph.write(serialize_graph([make_graph()], only_return_handle_ops=True), mode='wb')
+
+    memreport.main([str(graph), '--format', 'json', '--top', '1'])
+    result = json.loads(capsys.readouterr()[0])
+    assert result['temporary_bytes'] > 0
+    assert len(result['peak_tensors']) == 1
+
+    memreport.main([str(graph)])
+    assert 'temporary pool' in capsys.readouterr()[0]
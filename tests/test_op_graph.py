@@ -115,3 +115,24 @@ def test_tensor_slice():
     assert x[:5].axes.full_lengths == (5, 20, 5)
     assert x[:, 2:7].axes.full_lengths == (10, 5, 5)
     assert x[:5, :, :-1].axes.full_lengths == (5, 20, 4)
+
+
+def test_ordered_ops_cache(N):
+    x = ng.placeholder([N])
+    y = ng.exp(x) + x
+    ops = ng.Op.ordered_ops([y])
+    assert ng.Op.ordered_ops([y]) is ops
+    assert ng.Op.ordered_ops([x]) is not ops
+
+    # changes to the graph discard cached orderings
+    version = ng.Op.graph_version
+    z = ng.log(x)
+    y.args[0].replace_self(z)
+    assert ng.Op.graph_version > version
+    new_ops = ng.Op.ordered_ops([y])
+    assert new_ops is not ops
+    assert z in new_ops
+
+    w = ng.placeholder([N])
+    y.add_control_dep(w)
+    assert w in ng.Op.ordered_ops([y])
@@ -17,6 +17,8 @@ import os
 from copy import deepcopy
 
 import numpy as np
+import pytest
+
 import ngraph as ng
 from ngraph.op_graph.op_graph import Op
 import ngraph.op_graph.serde.serde as ser
@@ -93,6 +95,55 @@ def test_scalar_to_protobuf():
     np.testing.assert_allclose(orig_tensor, py_tensor)
 
 
+def get_constant_graph(length):
+    ax = ng.make_axes([ng.make_axis(name='C', length=length)])
+    value = np.arange(length, dtype=np.float32)
+    # two constants with equal values
+    return ng.log(ng.constant(value, ax)) + ng.exp(ng.constant(value, ax)), value
+
+
+def constant_values(ops):
+    return [op.const for op in ops if op.__class__.__name__ == 'AssignableTensorOp']
+
+
+def test_blob_store_serialization():
+    graph, value = get_constant_graph(512)
+    blob_store = ser.BlobStore()
+    ser_string = ser.serialize_graph([graph], blob_store=blob_store)
+    # equal tensors are stored once, out of line
+    assert len(blob_store) == 1
+    assert len(ser_string) < len(ser.serialize_graph([graph])) - value.nbytes
+
+    values = constant_values(ser.deserialize_graph(ser_string, blob_store))
+    assert len(values) == 2
+    for py_value in values:
+        np.testing.assert_array_equal(py_value, value)
+    with pytest.raises(ValueError):
+        ser.deserialize_graph(ser_string)
+
+
+def test_directory_blob_store(tmpdir):
+    graph, value = get_constant_graph(512)
+    ser_string = ser.serialize_graph([graph], blob_store=ser.DirectoryBlobStore(str(tmpdir)))
+    assert len(os.listdir(str(tmpdir))) == 1
+
+    values = constant_values(ser.deserialize_graph(ser_string,
+                                                   ser.DirectoryBlobStore(str(tmpdir))))
+    for py_value in values:
+        np.testing.assert_array_equal(py_value, value)
+        # the values are read-only views of the memory-mapped blob
+        assert not py_value.flags.writeable
+
+
+def test_deterministic_edge_ids():
+    base_op, simple_graph = get_simple_graph()
+    edge_ids = [edge.uuid.uuid for edge in ser._serialize_graph([simple_graph]).edges]
+    assert edge_ids == [ser.edge_id(index) for index in range(len(edge_ids))]
+    assert edge_ids == [edge.uuid.uuid for edge in ser._serialize_graph([simple_graph]).edges]
+    assert ser.edge_id(0) == b''
+    assert ser.edge_id(258) == b'\x02\x01'
+
+
 def test_op_to_protobuf():
     axis = ng.make_axis(name='C', length=2)
     axes = ng.make_axes([axis])
@@ -200,3 +251,32 @@ def test_all_op_references():
     base_all_ops = Op.all_op_references([base_op])
     assert base_op in base_all_ops
     assert simple_graph not in base_all_ops
+
+
+def test_registered_op_references():
+    base_op, simple_graph = get_simple_graph()
+    other_op = ng.placeholder(())
+    listed_op = ng.placeholder(())
+    assert simple_graph.op_reference_keys()[:2] == ('_args', '_control_deps')
+
+    # ops assigned to undeclared attributes are registered on assignment
+    simple_graph.op_ref = other_op
+    simple_graph.many_op_refs = [listed_op]
+    simple_graph.not_op_ref = [1, 2]
+    assert simple_graph.op_reference_keys()[-2:] == ('op_ref', 'many_op_refs')
+    all_ops = Op.all_op_references([simple_graph])
+    assert other_op in all_ops
+    assert listed_op in all_ops
+
+
+class LegacyOp(Op):
+    _op_references = None
+
+
+def test_legacy_op_references():
+    other_op = ng.placeholder(())
+    legacy_op = LegacyOp()
+    # bypasses registration, so is only found by scanning all attributes
+    legacy_op.__dict__['op_ref'] = other_op
+    assert 'op_ref' in legacy_op.op_reference_keys()
+    assert other_op in Op.all_op_references([legacy_op])
@@ -0,0 +1,115 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+from ngraph.transformers.passes.memlayout import MemLayoutPass
+from ngraph.transformers.passes.memoptimize import InPlaceBufferSharing
+
+pytestmark = [pytest.mark.transformer_dependent,
+              pytest.config.cpu_enabled_only]
+
+
+def make_mlp(depth, batch_size):
+    F = ng.make_axis(length=16, name='F')
+    G = ng.make_axis(length=16, name='G')
+    N = ng.make_axis(length=batch_size, name='N')
+    rng = np.random.RandomState(0)
+    x = ng.placeholder([F, N])
+    weights = [ng.variable([G, F], initial_value=rng.uniform(-0.5, 0.5, (16, 16)))
+               for _ in range(depth)]
+    h = x
+    for W in weights:
+        h = ng.tanh(ng.cast_axes(ng.dot(W, h), [F, N]) * 2 + 1)
+    cost = ng.sum(h * h, out_axes=())
+    return x, [cost] + [ng.deriv(cost, W) for W in weights]
+
+
+def get_pass(transformer, pass_type):
+    return [graph_pass for graph_pass in transformer.graph_passes
+            if isinstance(graph_pass, pass_type)][0]
+
+
+def run_mlp(share_buffers):
+    x, results = make_mlp(depth=4, batch_size=64)
+    x_value = np.random.RandomState(1).uniform(-1, 1, x.axes.lengths)
+    with closing(ng.transformers.make_transformer()) as transformer:
+        if not share_buffers:
+            transformer.graph_passes.remove(get_pass(transformer, InPlaceBufferSharing))
+        computation = transformer.add_computation(ng.computation(results, x))
+        values = [value.copy() for value in computation(x_value)]
+        get_pass(transformer, MemLayoutPass).test_memory_overlap()
+        return values, computation.computation_decl.temporary_max_allocated
+
+
+def test_inplace_elementwise():
+    """
+    Elementwise outputs reuse the buffers of inputs that die, which shrinks the temporary
+    pool without changing results
+    """
+    expected, expected_bytes = run_mlp(False)
+    values, allocated_bytes = run_mlp(True)
+    for value, expected_value in zip(values, expected):
+        ng.testing.assert_allclose(value, expected_value, rtol=1e-6)
+    assert allocated_bytes < expected_bytes
+
+
+def test_inplace_assignment():
+    A = ng.make_axis(length=8, name='A')
+    x = ng.placeholder([A])
+    w = ng.variable([A], initial_value=1.0)
+    h = ng.tanh(x * w)
+    update = ng.sequential([ng.assign(w, w - 0.5 * h), ng.sum(h * h, out_axes=())])
+
+    x_value = np.linspace(-1, 1, 8).astype(np.float32)
+    w_value = np.ones(8, dtype=np.float32)
+    with closing(ng.transformers.make_transformer()) as transformer:
+        computation = transformer.add_computation(ng.computation(update, x))
+        # the update is computed directly into w
+        assert get_pass(transformer, InPlaceBufferSharing).assignments_shared == 1
+        get_pass(transformer, MemLayoutPass).test_memory_overlap()
+        get_w = transformer.add_computation(ng.computation(w))
+        for _ in range(3):
+            h_value = np.tanh(x_value * w_value)
+            w_value = w_value - 0.5 * h_value
+            np.testing.assert_allclose(computation(x_value), np.sum(h_value * h_value),
+                                       rtol=1e-5)
+            np.testing.assert_allclose(get_w(), w_value, rtol=1e-6)
+
+
+def test_inplace_partial_assignments():
+    A = ng.make_axis(length=12, name='A')
+    B = ng.make_axis(length=3, name='B')
+    x = ng.placeholder([B])
+    arena = ng.variable([A], initial_value=0.0)
+    writes = [ng.assign(ng.tensor_slice(arena, [slice(3 * i, 3 * i + 3)], axes=[B]),
+                        x * (i + 1)) for i in range(4)]
+    update = ng.sequential(writes + [ng.sum(arena, out_axes=())])
+
+    x_value = np.arange(3, dtype=np.float32)
+    with closing(ng.transformers.make_transformer()) as transformer:
+        computation = transformer.add_computation(ng.computation(update, x))
+        # the assignments between the first, which copies the variable, and the last, which
+        # writes to it, write over the value left by the previous one
+        assert get_pass(transformer, InPlaceBufferSharing).previous_values_shared == 2
+        get_pass(transformer, MemLayoutPass).test_memory_overlap()
+        get_arena = transformer.add_computation(ng.computation(arena))
+        np.testing.assert_allclose(computation(x_value), 10 * np.sum(x_value))
+        np.testing.assert_allclose(get_arena(), np.concatenate([x_value * (i + 1)
+                                                                for i in range(4)]))
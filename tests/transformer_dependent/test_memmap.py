@@ -0,0 +1,91 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from contextlib import closing
+import gc
+import os
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+from ngraph.frontends.neon import GradientDescentMomentum, LookupTable, UniformInit, ax
+
+pytestmark = [pytest.mark.transformer_dependent,
+              pytest.config.cpu_enabled_only]
+
+
+def train_lookup_table(memmap, **kwargs):
+    ax.N.length = 8
+    x = ng.placeholder([ax.N])
+    np.random.seed(0)
+    lut = LookupTable(100, 8, UniformInit(-0.5, 0.5), memmap=memmap)
+    cost = ng.sum(lut(x), out_axes=())
+    update = ng.sequential([GradientDescentMomentum(0.1)(cost), cost])
+
+    x_value = np.random.RandomState(1).randint(0, 100, x.axes.lengths)
+    transformer = ng.transformers.make_transformer_factory('cpu', **kwargs)()
+    with closing(transformer):
+        train = transformer.add_computation(ng.computation(update, x))
+        get_w = transformer.add_computation(ng.computation(lut.W))
+        costs = [float(train(x_value)) for _ in range(3)]
+        w = get_w().copy()
+        files = transformer.sync_memmapped_tensors()
+        stored = [np.fromfile(filename, dtype=np.float32) for filename in files.values()]
+        persistent_bytes = train.computation_decl.persistent_max_allocated
+    return costs, w, stored, persistent_bytes
+
+
+def test_memmap_lookup_table(tmpdir):
+    expected_costs, expected_w, stored, expected_bytes = train_lookup_table(False)
+    assert stored == []
+
+    costs, w, stored, persistent_bytes = train_lookup_table(True, memmap_dir=str(tmpdir))
+    np.testing.assert_allclose(costs, expected_costs, rtol=1e-6)
+    np.testing.assert_allclose(w, expected_w, rtol=1e-6)
+    # the table is only in its file, which holds its values after a sync
+    assert len(os.listdir(str(tmpdir))) == 1
+    assert len(stored) == 1
+    np.testing.assert_allclose(stored[0], w.ravel(), rtol=1e-6)
+    assert persistent_bytes <= expected_bytes - w.nbytes
+
+
+def test_memmap_threshold():
+    A = ng.make_axis(length=1024, name='A')
+    B = ng.make_axis(length=4, name='B')
+    large = ng.variable([A], initial_value=1.0)
+    small = ng.variable([B], initial_value=2.0)
+    update = ng.sequential([ng.assign(large, large * 2), ng.assign(small, small + 1),
+                            ng.sum(large, out_axes=()) + ng.sum(small, out_axes=())])
+
+    transformer = ng.transformers.make_transformer_factory('cpu', memmap_threshold=1024)()
+    with closing(transformer):
+        computation = transformer.add_computation(ng.computation(update))
+        assert computation() == 2048 + 12
+        assert computation() == 4096 + 16
+        files = transformer.sync_memmapped_tensors()
+        assert len(files) == 1
+        filename, = files.values()
+        np.testing.assert_equal(np.fromfile(filename, dtype=np.float32), 4)
+    # the temporary directory holding the file is removed on close
+    assert not os.path.exists(filename)
+
+
+def test_close_after_failed_init(capsys):
+    with pytest.raises(ValueError):
+        ng.transformers.make_transformer_factory('cpu', remat_strategy='bogus')()
+    # closing the partly initialized transformer on collection does not fail
+    gc.collect()
+    assert 'AttributeError' not in capsys.readouterr().err
@@ -0,0 +1,82 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+import numpy as np
+import pytest
+
+import ngraph as ng
+from ngraph.transformers.cpu.precision import to_storage, from_storage
+
+pytestmark = [pytest.mark.transformer_dependent,
+              pytest.config.cpu_enabled_only]
+
+
+def make_mlp(depth, batch_size):
+    F = ng.make_axis(length=16, name='F')
+    G = ng.make_axis(length=16, name='G')
+    N = ng.make_axis(length=batch_size, name='N')
+    rng = np.random.RandomState(0)
+    x = ng.placeholder([F, N])
+    weights = [ng.variable([G, F], initial_value=rng.uniform(-0.5, 0.5, (16, 16)))
+               for _ in range(depth)]
+    h = x
+    for W in weights:
+        h = ng.tanh(ng.cast_axes(ng.dot(W, h), [F, N]))
+    cost = ng.sum(h * h, out_axes=())
+    return x, [cost] + [ng.deriv(cost, W) for W in weights]
+
+
+def run_mlp(storage_dtype):
+    x, results = make_mlp(depth=4, batch_size=256)
+    x_value = np.random.RandomState(1).uniform(-1, 1, x.axes.lengths)
+    transformer = ng.transformers.make_transformer_factory('cpu', storage_dtype=storage_dtype)()
+    try:
+        computation = transformer.add_computation(ng.computation(results, x))
+        values = [value.copy() for value in computation(x_value)]
+        return values, computation.computation_decl.temporary_max_allocated
+    finally:
+        transformer.close()
+
+
+@pytest.mark.parametrize("storage_dtype,rtol", [('float16', 1e-3), ('bfloat16', 1e-2)])
+def test_reduced_storage(storage_dtype, rtol):
+    """
+    Storing long-lived temporaries in reduced precision shrinks the temporary pool, with
+    results close to float32
+    """
+    expected, expected_bytes = run_mlp(None)
+    values, allocated_bytes = run_mlp(storage_dtype)
+    for value, expected_value in zip(values, expected):
+        ng.testing.assert_allclose(value, expected_value, rtol=rtol,
+                                   atol=rtol * np.abs(expected_value).max())
+    assert allocated_bytes < expected_bytes
+
+
+def test_unknown_storage_dtype():
+    with pytest.raises(ValueError):
+        ng.transformers.make_transformer_factory('cpu', storage_dtype='int8')()
+
+
+def test_bfloat16_round_trip():
+    x = np.array([1.0, -2.5, 1 + 2 ** -8, 1 + 3 * 2 ** -8, 1e-30, np.inf, np.nan],
+                 dtype=np.float32)
+    stored = np.empty(x.shape, dtype=np.uint16)
+    to_storage(x, stored)
+    result = np.empty_like(x)
+    from_storage(stored, result)
+    # Ties round to even
+    np.testing.assert_array_equal(result[:4], [1.0, -2.5, 1.0, 1 + 2 ** -6])
+    ng.testing.assert_allclose(result[4], 1e-30, rtol=2 ** -8)
+    assert np.isposinf(result[5]) and np.isnan(result[6])
@@ -0,0 +1,87 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+from ngraph.transformers.passes.memlayout import MemLayoutPass
+from ngraph.transformers.passes.rematerialization import Rematerialization
+
+pytestmark = [pytest.mark.transformer_dependent,
+              pytest.config.cpu_enabled_only]
+
+
+def make_mlp(depth, batch_size):
+    F = ng.make_axis(length=16, name='F')
+    G = ng.make_axis(length=16, name='G')
+    N = ng.make_axis(length=batch_size, name='N')
+    rng = np.random.RandomState(0)
+    x = ng.placeholder([F, N])
+    weights = [ng.variable([G, F], initial_value=rng.uniform(-0.5, 0.5, (16, 16)))
+               for _ in range(depth)]
+    h = x
+    for W in weights:
+        h = ng.tanh(ng.cast_axes(ng.dot(W, h), [F, N]) * 2 + 1)
+    cost = ng.sum(h * h, out_axes=())
+    updates = [ng.assign(W, W - 0.1 * ng.deriv(cost, W)) for W in weights]
+    return x, ng.sequential(updates + [cost])
+
+
+def get_pass(transformer, pass_type):
+    return [graph_pass for graph_pass in transformer.graph_passes
+            if isinstance(graph_pass, pass_type)][0]
+
+
+def train_mlp(**kwargs):
+    x, update = make_mlp(depth=8, batch_size=64)
+    x_value = np.random.RandomState(1).uniform(-1, 1, x.axes.lengths)
+    transformer = ng.transformers.make_transformer_factory('cpu', **kwargs)()
+    with closing(transformer):
+        computation = transformer.add_computation(ng.computation(update, x))
+        costs = [computation(x_value).copy() for _ in range(3)]
+        get_pass(transformer, MemLayoutPass).test_memory_overlap()
+        remat = None
+        if transformer.rematerialization is not None:
+            remat = get_pass(transformer, Rematerialization)
+        return costs, computation.computation_decl.temporary_max_allocated, remat
+
+
+@pytest.mark.parametrize("kwargs", [{'remat_strategy': 'sqrt'}, {'memory_budget': 32768}])
+def test_rematerialization(kwargs):
+    """
+    Recomputing activations for the backward pass trains the same way in less memory
+    """
+    expected, expected_bytes, _ = train_mlp()
+    costs, allocated_bytes, remat = train_mlp(**kwargs)
+    for cost, expected_cost in zip(costs, expected):
+        ng.testing.assert_allclose(cost, expected_cost, rtol=1e-6)
+    assert allocated_bytes < expected_bytes
+    assert remat.rematerialized > 0
+    assert remat.recompute_exops >= remat.rematerialized
+    assert remat.recompute_bytes > 0
+    assert 0 < remat.recompute_fraction < 1
+    assert remat.peak_after < remat.peak_before
+
+
+def test_rematerialization_arguments():
+    assert Rematerialization().strategy == 'sqrt'
+    assert Rematerialization(memory_budget=1024).strategy == 'greedy'
+    with pytest.raises(ValueError):
+        Rematerialization(strategy='greedy')
+    with pytest.raises(ValueError):
+        Rematerialization(strategy='random')
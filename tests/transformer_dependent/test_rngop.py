@@ -99,3 +99,41 @@ def test_normal_negative_mean():
     assert np.allclose(np.std(result), std, rtol=0.1, atol=0.02)
     assert not np.all(result >= 0.0)
     assert not np.all(result < 0.0)
+
+
+@pytest.config.cpu_enabled_only
+def test_rng_seed_reproducible():
+    """
+    Computations of transformers with the same rng_seed draw the same values
+    """
+    axes = ng.make_axes([ng.make_axis(3), ng.make_axis(4)])
+    x = ng.constant(0., axes=axes)
+    results = []
+    for _ in range(2):
+        trans = ng.transformers.make_transformer_factory('cpu', rng_seed=7)()
+        comp = trans.computation([ng.uniform(x), ng.normal(x)])
+        results.append([[val.copy() for val in comp()] for _ in range(2)])
+        trans.close()
+
+    for first, second in zip(*results):
+        for val1, val2 in zip(first, second):
+            np.testing.assert_array_equal(val1, val2)
+    assert not np.array_equal(results[0][0][0], results[0][1][0])
+
+
+def test_counter_rng_chunks():
+    """
+    Any part of a draw can be generated on its own
+    """
+    from ngraph.transformers.cpu.rng import CounterRng
+
+    rng = CounterRng(0)
+    key = rng.key(stream=0, counter=0)
+    whole = rng.unit(key, np.empty(100))
+    parts = [rng.unit(key, np.empty(30), start=start) for start in (0, 30, 60)]
+    np.testing.assert_array_equal(whole[:90], np.concatenate(parts))
+
+    out = np.empty((200, 300), dtype=np.float32)
+    rng.normal(0, out, loc=1.0, scale=2.0)
+    assert abs(out.mean() - 1.0) < 0.05
+    assert abs(out.std() - 2.0) < 0.05
@@ -0,0 +1,114 @@
+# ******************************************************************************
+# Copyright 2017-2018 Intel Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ******************************************************************************
+import numpy as np
+
+import ngraph as ng
+from ngraph.op_graph.op_graph import Op
+from ngraph.testing import ExecutorFactory, RandomTensorGenerator
+import pytest
+
+pytestmark = [pytest.mark.transformer_dependent,
+              pytest.config.cpu_enabled_only]
+
+rng = RandomTensorGenerator(0, np.float32)
+
+delta = 1e-3
+rtol = atol = 1e-2
+
+
+def make_rnn(sequence_length, backward=False):
+    F = ng.make_axis(length=4, name='F')
+    H = ng.make_axis(length=4, name='H')
+    REC = ng.make_axis(length=sequence_length, name='REC')
+    N = ng.make_axis(length=2, name='N')
+
+    x = ng.placeholder([H, REC, N])
+    h0 = ng.placeholder([H, N])
+    b = ng.placeholder([H])
+    W_value = rng.uniform(-1, 1, [F, H])
+    W = ng.variable([F, H], initial_value=W_value)
+
+    def step(inputs, states):
+        h_rec = ng.cast_axes(ng.dot(W, states[0]), [H, N])
+        return [ng.tanh(h_rec + inputs[0] + b)]
+
+    h, = ng.scan(step, [x], [h0], backward=backward, pos=1)
+    return h, (x, h0, b), W_value
+
+
+def rnn_ref(x, h0, b, W, backward=False):
+    steps = range(x.shape[1])
+    h = h0
+    out = np.empty_like(x)
+    for t in (reversed(steps) if backward else steps):
+        h = np.tanh(W.dot(h) + x[:, t] + b[:, np.newaxis])
+        out[:, t] = h
+    return out
+
+
+@pytest.mark.parametrize("backward", [False, True])
+def test_scan_fprop(backward):
+    h, params, W_value = make_rnn(5, backward)
+    values = [rng.uniform(-1, 1, p.axes) for p in params]
+
+    with ExecutorFactory() as ex:
+        result = ex.executor(h, *params)(*values)
+    ng.testing.assert_allclose(result, rnn_ref(*values, W=W_value, backward=backward),
+                               rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("backward", [False, True])
+def test_scan_deriv(backward):
+    h, params, _ = make_rnn(3, backward)
+    values = [rng.uniform(-1, 1, p.axes) for p in params]
+
+    with ExecutorFactory() as ex:
+        for i, p in enumerate(params):
+            others = params[:i] + params[i + 1:]
+            other_values = values[:i] + values[i + 1:]
+            d_s = ex.derivative(h, p, *others)(values[i], *other_values)
+            d_n = ex.numeric_derivative(h, p, delta, *others)(values[i], *other_values)
+            ng.testing.assert_allclose(d_s, d_n, rtol=rtol, atol=atol)
+
+
+def test_scan_multiple_states():
+    H = ng.make_axis(length=3, name='H')
+    REC = ng.make_axis(length=4, name='REC')
+    x = ng.placeholder([REC, H])
+    a0 = ng.placeholder([H])
+    b0 = ng.placeholder([H])
+
+    # Each step swaps the states and adds the input to one of them
+    a, b = ng.scan(lambda inputs, states: [states[1] + inputs[0], states[0]],
+                   [x], [a0, b0])
+
+    values = [rng.uniform(-1, 1, p.axes) for p in (x, a0, b0)]
+    x_value, a_value, b_value = values
+    a_ref, b_ref = [], []
+    for t in range(REC.length):
+        a_value, b_value = b_value + x_value[t], a_value
+        a_ref.append(a_value)
+        b_ref.append(b_value)
+
+    with ExecutorFactory() as ex:
+        a_ng, b_ng = ex.executor([a, b], x, a0, b0)(*values)
+    ng.testing.assert_allclose(a_ng, np.stack(a_ref), rtol=1e-6, atol=1e-6)
+    ng.testing.assert_allclose(b_ng, np.stack(b_ref), rtol=1e-6, atol=1e-6)
+
+
+def test_scan_graph_size_independent_of_length():
+    sizes = [len(Op.ordered_ops([make_rnn(length)[0]])) for length in (2, 20)]
+    assert sizes[0] == sizes[1]